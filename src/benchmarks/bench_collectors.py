@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import argparse
+import glob
+import json
+import os
+import resource
+import sys
+
+import hms
+from bench_procfs import bench_collector, collectors
+
+# benchmark results compared with the baseline
+result_keys = [
+    "time_per_cycle",
+    "read_syscalls_per_cycle",
+    "open_syscalls_per_cycle",
+    "peak_traced_bytes",
+]
+# results compared by default, times depend on the host and are compared with
+# baselines taken on the same host only
+default_keys = [key for key in result_keys if key != "time_per_cycle"]
+
+
+def compare_results(results, baseline, threshold, keys=default_keys):
+    """
+    compare results with the baseline and return regressions - [message]
+
+    a result regresses if it's above the baseline by more than threshold (fraction),
+    collectors of the baseline which were skipped in a benchmarked scenario regress too
+    """
+    regressions = []
+
+    for scenario, scenario_results in results.items():
+        for name in baseline.get(scenario, {}).keys() - scenario_results.keys():
+            regressions.append(f"{scenario} {name}: skipped")
+
+        for name, result in scenario_results.items():
+            baseline_result = baseline.get(scenario, {}).get(name)
+            if baseline_result is None:
+                continue
+
+            for key in keys:
+                if key not in baseline_result:
+                    continue
+                if result[key] > baseline_result[key] * (1 + threshold):
+                    regressions.append(
+                        f"{scenario} {name} {key}: {result[key]:.6g} (baseline: {baseline_result[key]:.6g})"
+                    )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    # set up args
+    parser = argparse.ArgumentParser(
+        description="Host Monitoring Station Collectors Benchmark"
+    )
+    parser.add_argument(
+        "--fixtures",
+        type=str,
+        required=True,
+        help="fixtures directory generated by gen_procfs_fixture.py",
+    )
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        required=False,
+        default=None,
+        help="comma separated scenarios to be benchmarked (default: all scenarios in fixtures directory)",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        required=False,
+        default=10,
+        help="number of collections per collector and scenario (default: 10)",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        required=False,
+        default=None,
+        help="baseline results file to compare with",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        required=False,
+        default=0.2,
+        help="regression threshold as a fraction of the baseline (default: 0.2)",
+    )
+    parser.add_argument(
+        "--keys",
+        type=str,
+        required=False,
+        default=",".join(default_keys),
+        help=f"comma separated results compared with the baseline, {','.join(result_keys)} (default: {','.join(default_keys)})",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        type=str,
+        required=False,
+        default=None,
+        help="save results into baseline results file",
+    )
+    args = parser.parse_args()
+
+    if args.scenario:
+        scenarios = args.scenario.split(",")
+    else:
+        scenarios = sorted(
+            os.path.basename(os.path.dirname(scenario_file))
+            for scenario_file in glob.glob(args.fixtures + "/*/scenario.json")
+        )
+
+    # the pool keeps one file descriptor per file, the sysfs network backend opens 7
+    # files per interface in the large scenario
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+
+    results = {}
+    for scenario in scenarios:
+        scenario_dir = args.fixtures + f"/{scenario}"
+        if not os.path.isdir(scenario_dir):
+            print(
+                f"ERROR: scenario {scenario} not found in {args.fixtures}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+        hms.procfs.set_root(scenario_dir + "/proc", scenario_dir + "/sys")
+        results[scenario] = {}
+
+        for name, collector in collectors.items():
+            # file descriptors are kept open as the poller does
+            fdpool = hms.procfs.FDPool()
+            try:
+                result = bench_collector(collector, fdpool, args.iterations)
+            except OSError as e:
+                print(
+                    f"WARNING: {scenario} {name} skipped, "
+                    f"please raise the open files limit (ulimit -n): {e}",
+                    file=sys.stderr,
+                )
+                continue
+            finally:
+                fdpool.close_all()
+            results[scenario][name] = result
+            print(
+                f"{scenario:<8} {name:<16} "
+                f"time: {result['time_per_cycle'] * 1000:10.3f} ms/cycle "
+                f"read syscalls: {result['read_syscalls_per_cycle']:10.1f}/cycle "
+                f"open syscalls: {result['open_syscalls_per_cycle']:10.1f}/cycle "
+                f"peak traced: {result['peak_traced_bytes']:12d} bytes"
+            )
+
+    hms.procfs.set_root()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "wt") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline saved into {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "rt") as f:
+            baseline = json.load(f)
+
+        regressions = compare_results(
+            results, baseline, args.threshold, args.keys.split(",")
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+
+        if regressions:
+            sys.exit(1)
+
+        print(f"no regression against {args.baseline}")
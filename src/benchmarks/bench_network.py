@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+
+import hms
+
+
+def bench_network(backend, iterations):
+    """
+    collect network stats with a backend and return timing and read counters
+    """
+    files_read = 0
+    bytes_read = 0
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        snapshot = hms.procfs.Snapshot()
+        network_obj = hms.network.Network(snapshot, backend)
+        files_read += snapshot.files_read
+        bytes_read += snapshot.bytes_read
+    elapsed = time.perf_counter() - start
+
+    return {
+        "interfaces": len(network_obj.interfaces),
+        "time_per_cycle": elapsed / iterations,
+        "files_per_cycle": files_read / iterations,
+        "bytes_per_cycle": bytes_read / iterations,
+    }
+
+
+if __name__ == "__main__":
+    # set up args
+    parser = argparse.ArgumentParser(
+        description="Host Monitoring Station Network Backends Benchmark"
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        required=False,
+        default=100,
+        help="number of collections per backend (default: 100)",
+    )
+    args = parser.parse_args()
+
+    for backend in ["sysfs", "procfs"]:
+        result = bench_network(backend, args.iterations)
+        print(
+            f"{backend:<8} interfaces: {result['interfaces']:<6} "
+            f"time: {result['time_per_cycle'] * 1000:10.3f} ms/cycle "
+            f"files: {result['files_per_cycle']:8.1f}/cycle "
+            f"bytes: {result['bytes_per_cycle']:10.1f}/cycle"
+        )
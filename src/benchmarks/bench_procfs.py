@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+import tracemalloc
+
+import hms
+
+# collectors to be benchmarked, TCP is read from procfs as netlink is not in fixtures
+collectors = {
+    "cpu": lambda snapshot: hms.cpu.CPU(snapshot),
+    "disk": lambda snapshot: hms.disk.Disk(snapshot),
+    "memory": lambda snapshot: hms.memory.Memory(snapshot),
+    "network(sysfs)": lambda snapshot: hms.network.Network(snapshot, "sysfs"),
+    "network(procfs)": lambda snapshot: hms.network.Network(snapshot, "procfs"),
+    "os": lambda snapshot: hms.os.OS(snapshot),
+    "tcp(procfs)": lambda snapshot: hms.tcp.TCP(snapshot, "procfs"),
+    "udp": lambda snapshot: hms.udp.UDP(snapshot),
+    "arp": lambda snapshot: hms.arp.ARP(snapshot),
+    "sockstat": lambda snapshot: hms.sockstat.Sockstat(snapshot),
+}
+
+
+def get_read_syscalls():
+    """
+    get number of read syscalls issued by the current process
+    """
+    with open("/proc/self/io", "rt") as f:
+        for line in f.readlines():
+            if line.startswith("syscr"):
+                return int(line.split()[1])
+
+    return 0
+
+
+def get_read_syscalls_overhead(samples=10):
+    """
+    get number of read syscalls issued by get_read_syscalls itself
+    """
+    overheads = []
+    for _ in range(samples):
+        syscr = get_read_syscalls()
+        overheads.append(get_read_syscalls() - syscr)
+
+    return min(overheads)
+
+
+# read syscalls of get_read_syscalls, excluded from read syscalls of collectors
+read_syscalls_overhead = get_read_syscalls_overhead()
+
+
+def bench_collector(collector, fdpool, iterations):
+    """
+    run a collector with a fresh snapshot in each iteration and return timing, read
+    and open syscalls per collection and peak bytes allocated by one collection
+
+    files are opened by the snapshot if fdpool is None, otherwise file descriptors are
+    kept open in the pool as the poller does. opens are counted by the pool and the
+    snapshots, so they include /proc/<pid>/stat files opened by the process scan
+    """
+    # warm up file descriptors and buffers in the pool
+    collector(hms.procfs.Snapshot(fdpool))
+
+    fdpool_files_opened = fdpool.files_opened if fdpool is not None else 0
+    files_opened = 0
+    syscr = get_read_syscalls()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        snapshot = hms.procfs.Snapshot(fdpool)
+        collector(snapshot)
+        files_opened += snapshot.files_opened
+    elapsed = time.perf_counter() - start
+    syscr = get_read_syscalls() - syscr - read_syscalls_overhead
+    if fdpool is not None:
+        files_opened += fdpool.files_opened - fdpool_files_opened
+
+    tracemalloc.start()
+    collector(hms.procfs.Snapshot(fdpool))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "time_per_cycle": elapsed / iterations,
+        "read_syscalls_per_cycle": syscr / iterations,
+        "open_syscalls_per_cycle": files_opened / iterations,
+        "peak_traced_bytes": peak,
+    }
+
+
+if __name__ == "__main__":
+    # set up args
+    parser = argparse.ArgumentParser(
+        description="Host Monitoring Station procfs / sysfs Readers Benchmark"
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        required=False,
+        default=100,
+        help="number of collections per collector and reader (default: 100)",
+    )
+    args = parser.parse_args()
+
+    for name, collector in collectors.items():
+        fdpool = hms.procfs.FDPool()
+        readers = {
+            "open": None,
+            "pread": fdpool,
+        }
+
+        for reader, reader_fdpool in readers.items():
+            result = bench_collector(collector, reader_fdpool, args.iterations)
+            print(
+                f"{name:<16} {reader:<6} "
+                f"time: {result['time_per_cycle'] * 1000:10.3f} ms/cycle "
+                f"read syscalls: {result['read_syscalls_per_cycle']:8.1f}/cycle "
+                f"open syscalls: {result['open_syscalls_per_cycle']:8.1f}/cycle "
+                f"peak traced: {result['peak_traced_bytes']:10d} bytes"
+            )
+
+        fdpool.close_all()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import rrdtool
+import shutil
+import tempfile
+import time
+
+import hms
+
+# disk metrics are used for the benchmark, network metrics are stored in the same way
+metrics = {
+    "read_io": "COUNTER",
+    "read_merge": "COUNTER",
+    "read_sector": "COUNTER",
+    "write_io": "COUNTER",
+    "write_merge": "COUNTER",
+    "write_sector": "COUNTER",
+    "in_flight": "GAUGE",
+    "read_ticks": "COUNTER",
+    "write_ticks": "COUNTER",
+    "io_ticks": "COUNTER",
+    "time_in_queue": "COUNTER",
+    "discard_io": "COUNTER",
+    "discard_merge": "COUNTER",
+    "discard_sector": "COUNTER",
+    "discard_ticks": "COUNTER",
+    "flush_io": "COUNTER",
+    "flush_ticks": "COUNTER",
+}
+
+
+def get_rrd_updates(layout, rrd_dir, devices, timestamp):
+    """
+    build RRD updates of one polling cycle - [(RRD database filename, template, values)]
+    """
+    rrd_updates = []
+
+    if layout == "device":
+        for count in range(len(devices)):
+            values = ":".join(str(timestamp * (count + 1)) for metric in metrics)
+            rrd_updates.append(
+                (
+                    rrd_dir + f"/disk/{devices[count]}.rrd",
+                    ":".join(metrics),
+                    f"{timestamp}:{values}",
+                )
+            )
+    else:
+        for metric in metrics:
+            values = ":".join(
+                str(timestamp * (count + 1)) for count in range(len(devices))
+            )
+            rrd_updates.append(
+                (
+                    rrd_dir + f"/disk-{metric}.rrd",
+                    ":".join(devices),
+                    f"{timestamp}:{values}",
+                )
+            )
+
+    return rrd_updates
+
+
+def bench_rrd_layout(layout, num_devices, iterations, step, rows):
+    """
+    create disk RRD databases in a layout and return update and render timing
+    """
+    rrd_dir = tempfile.mkdtemp(prefix="hms-bench-")
+    devices = [f"d{count}" for count in range(num_devices)]
+    start = int(time.time()) - (iterations + 1) * step
+
+    try:
+        # create RRD databases
+        if layout == "device":
+            os.makedirs(rrd_dir + "/disk")
+            for device in devices:
+                rrdtool.create(
+                    rrd_dir + f"/disk/{device}.rrd",
+                    "--start",
+                    str(start),
+                    "--step",
+                    str(step),
+                    [
+                        f"DS:{metric}:{compute}:{step * 5}:0:U"
+                        for metric, compute in metrics.items()
+                    ],
+                    f"RRA:AVERAGE:0.5:1:{rows}",
+                )
+        else:
+            for metric, compute in metrics.items():
+                rrdtool.create(
+                    rrd_dir + f"/disk-{metric}.rrd",
+                    "--start",
+                    str(start),
+                    "--step",
+                    str(step),
+                    [f"DS:{device}:{compute}:{step * 5}:0:U" for device in devices],
+                    f"RRA:AVERAGE:0.5:1:{rows}",
+                )
+
+        # update RRD databases, one polling cycle per iteration
+        update_time = 0
+        updates = 0
+        for count in range(iterations):
+            timestamp = start + (count + 1) * step
+            rrd_updates = get_rrd_updates(layout, rrd_dir, devices, timestamp)
+            updates += len(rrd_updates)
+
+            update_start = time.perf_counter()
+            for rrd_filename, template, values in rrd_updates:
+                rrdtool.update(rrd_filename, "--template", template, values)
+            update_time += time.perf_counter() - update_start
+
+        # render all disk graphs
+        hms_graph = hms.graph.Graph(
+            rrd_dir,
+            rrd_dir,
+            "medium",
+            str(start),
+            str(start + (iterations + 1) * step),
+            "bench",
+            None,
+            layout,
+        )
+        render_start = time.perf_counter()
+        hms_graph.plot_disk_graph()
+        render_time = time.perf_counter() - render_start
+    finally:
+        shutil.rmtree(rrd_dir, ignore_errors=True)
+
+    return {
+        "files_per_cycle": updates / iterations,
+        "update_time_per_cycle": update_time / iterations,
+        "render_time": render_time,
+    }
+
+
+if __name__ == "__main__":
+    # set up args
+    parser = argparse.ArgumentParser(
+        description="Host Monitoring Station RRD Databases Layout Benchmark"
+    )
+    parser.add_argument(
+        "--devices",
+        type=str,
+        required=False,
+        default="10,100,1000",
+        help="comma separated numbers of devices (default: 10,100,1000)",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        required=False,
+        default=60,
+        help="number of polling cycles written per layout (default: 60)",
+    )
+    parser.add_argument(
+        "--step",
+        type=int,
+        required=False,
+        default=60,
+        help="RRD database step in seconds (default: 60)",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        required=False,
+        default=1440,
+        help="number of RRA rows (default: 1440)",
+    )
+    args = parser.parse_args()
+
+    for num_devices in [int(num) for num in args.devices.split(",")]:
+        for layout in ["metric", "device"]:
+            result = bench_rrd_layout(
+                layout, num_devices, args.iterations, args.step, args.rows
+            )
+            print(
+                f"{layout:<8} devices: {num_devices:<6} "
+                f"files: {result['files_per_cycle']:8.1f}/cycle "
+                f"update: {result['update_time_per_cycle'] * 1000:10.3f} ms/cycle "
+                f"render: {result['render_time'] * 1000:10.3f} ms"
+            )
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# entry points of host monitoring station
+entry_points = [
+    "hms_metrics_poller",
+    "hms_web",
+    "hms_bootstrap_rrd",
+    "hms_migrate_rrd",
+    "hms_export",
+]
+
+# benchmark results compared with the baseline
+result_keys = ["wall_time", "import_time"]
+
+
+def parse_importtime(output):
+    """
+    parse output of python -X importtime - {module: (self time, cumulative time)} in
+    microseconds
+    """
+    imports = {}
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, cumulative_time, module = line[len("import time:") :].split("|")
+        imports[module.strip()] = (int(self_time), int(cumulative_time))
+
+    return imports
+
+
+def bench_entry_point(entry_point, iterations):
+    """
+    import an entry point in new interpreters and return median wall time and import
+    time in seconds, number of imported modules and imported hms submodules
+    """
+    # entry points and hms package are imported from the current directory
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.getcwd()] + [path for path in [env.get("PYTHONPATH")] if path]
+    )
+
+    wall_times = []
+    import_times = []
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {entry_point}"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        wall_times.append(time.perf_counter() - start)
+
+        imports = parse_importtime(process.stderr)
+        if process.returncode != 0 or entry_point not in imports:
+            raise RuntimeError(process.stderr.strip().splitlines()[-1])
+        import_times.append(imports[entry_point][1] / 1000000)
+
+    return {
+        "wall_time": statistics.median(wall_times),
+        "import_time": statistics.median(import_times),
+        "modules": len(imports),
+        "hms_modules": sorted(
+            module[len("hms.") :] for module in imports if module.startswith("hms.")
+        ),
+    }
+
+
+def compare_results(results, baseline, threshold):
+    """
+    compare results with the baseline and return regressions - [message]
+
+    a result regresses if it's above the baseline by more than threshold (fraction)
+    """
+    regressions = []
+
+    for entry_point, result in results.items():
+        baseline_result = baseline.get(entry_point)
+        if baseline_result is None:
+            continue
+
+        for key in result_keys:
+            if key not in baseline_result:
+                continue
+            if result[key] > baseline_result[key] * (1 + threshold):
+                regressions.append(
+                    f"{entry_point} {key}: {result[key]:.6g} (baseline: {baseline_result[key]:.6g})"
+                )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    # set up args
+    parser = argparse.ArgumentParser(
+        description="Host Monitoring Station Start-up Benchmark"
+    )
+    parser.add_argument(
+        "--entry-point",
+        type=str,
+        required=False,
+        default=",".join(entry_points),
+        help=f"comma separated entry points to be benchmarked (default: {','.join(entry_points)})",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        required=False,
+        default=10,
+        help="number of interpreter starts per entry point (default: 10)",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        required=False,
+        default=None,
+        help="baseline results file to compare with",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        required=False,
+        default=0.2,
+        help="regression threshold as a fraction of the baseline (default: 0.2)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        type=str,
+        required=False,
+        default=None,
+        help="save results into baseline results file",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for entry_point in args.entry_point.split(","):
+        try:
+            result = bench_entry_point(entry_point, args.iterations)
+        except Exception as e:
+            print(f"ERROR: failed to import {entry_point}: {str(e)}", file=sys.stderr)
+            continue
+
+        results[entry_point] = result
+        print(
+            f"{entry_point:<20} wall time: {result['wall_time'] * 1000:8.1f} ms "
+            f"import time: {result['import_time'] * 1000:8.1f} ms "
+            f"modules: {result['modules']:4d} "
+            f"hms modules: {','.join(result['hms_modules']) or '-'}"
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "wt") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline saved into {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "rt") as f:
+            baseline = json.load(f)
+
+        regressions = compare_results(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+
+        if regressions:
+            sys.exit(1)
+
+        print(f"no regression against {args.baseline}")
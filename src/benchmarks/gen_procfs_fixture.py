@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import random
+import shutil
+import time
+
+# scenario presets - {scenario: {parameter: count}}
+scenarios = {
+    "small": {
+        "cpus": 4,
+        "disks": 4,
+        "interfaces": 4,
+        "tcp_sockets": 1000,
+        "pids": 300,
+        "arp_entries": 100,
+    },
+    "large": {
+        "cpus": 256,
+        "disks": 1000,
+        "interfaces": 5000,
+        "tcp_sockets": 1000000,
+        "pids": 100000,
+        "arp_entries": 200000,
+    },
+}
+
+net_dev_header = (
+    "Inter-|   Receive                                                |  Transmit\n"
+    + " face |bytes    packets errs drop fifo frame compressed multicast"
+    + "|bytes    packets errs drop fifo colls carrier compressed\n"
+)
+tcp_header = (
+    "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt"
+    + "   uid  timeout inode\n"
+)
+arp_header = (
+    "IP address       HW type     Flags       HW address            Mask     Device\n"
+)
+snmp_udp_fields = [
+    "InDatagrams",
+    "NoPorts",
+    "InErrors",
+    "OutDatagrams",
+    "RcvbufErrors",
+    "SndbufErrors",
+    "InCsumErrors",
+    "IgnoredMulti",
+    "MemErrors",
+]
+net_statistics = [
+    "rx_bytes",
+    "rx_packets",
+    "rx_errors",
+    "rx_dropped",
+    "tx_bytes",
+    "tx_packets",
+    "tx_errors",
+    "tx_dropped",
+    "collisions",
+]
+
+
+def write_file(path, content):
+    """
+    write file content, parent directories are created
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wt") as f:
+        f.write(content)
+
+
+class Fixture:
+    def __init__(self, root_dir, counts, seed=0):
+        self.proc_dir = root_dir + "/proc"
+        self.sys_dir = root_dir + "/sys"
+        self.counts = counts
+        self.random = random.Random(seed)
+
+    def _value(self, limit=1 << 40):
+        return self.random.randrange(limit)
+
+    def generate_cpu(self):
+        """
+        generate CPU frequency files and /proc/stat
+        """
+        for cpu in range(self.counts["cpus"]):
+            write_file(
+                self.sys_dir + f"/devices/system/cpu/cpu{cpu}/cpufreq/scaling_cur_freq",
+                f"{self.random.randrange(800000, 3600000)}\n",
+            )
+
+        lines = [
+            "cpu  " + " ".join(str(self._value()) for _ in range(10)) + "\n",
+        ]
+        for cpu in range(self.counts["cpus"]):
+            lines.append(
+                f"cpu{cpu} " + " ".join(str(self._value()) for _ in range(10)) + "\n"
+            )
+        lines += [
+            f"ctxt {self._value()}\n",
+            f"btime {int(time.time())}\n",
+            f"processes {self._value()}\n",
+            f"procs_running {self.random.randrange(1, self.counts['cpus'] + 1)}\n",
+            f"procs_blocked {self.random.randrange(0, 10)}\n",
+        ]
+        write_file(self.proc_dir + "/stat", "".join(lines))
+
+    def generate_os(self):
+        """
+        generate load average, file descriptors and process table
+        """
+        write_file(
+            self.proc_dir + "/loadavg",
+            f"1.23 0.98 0.76 3/{self.counts['pids']} {self.counts['pids'] + 1}\n",
+        )
+        write_file(
+            self.proc_dir + "/sys/fs/file-nr",
+            f"{self._value(1 << 20)}\t0\t9223372036854775807\n",
+        )
+
+        states = "SSSSSSSSRDZI"
+        for pid in range(1, self.counts["pids"] + 1):
+            write_file(
+                self.proc_dir + f"/{pid}/stat",
+                f"{pid} (proc {pid}) {self.random.choice(states)} 1 {pid} {pid} 0 -1 "
+                + " ".join("0" for _ in range(44))
+                + "\n",
+            )
+
+    def generate_memory(self):
+        """
+        generate /proc/meminfo and /proc/vmstat
+        """
+        # usages are below totals
+        memory_total = self._value(1 << 30) + (1 << 20)
+        swap_total = self._value(1 << 24)
+        meminfo = {
+            "MemTotal": memory_total,
+            "MemFree": self._value(memory_total),
+            "MemAvailable": self._value(memory_total),
+            "Buffers": self._value(memory_total >> 4),
+            "Cached": self._value(memory_total >> 2),
+            "SwapCached": 0,
+            "SwapTotal": swap_total,
+            "SwapFree": self._value(swap_total + 1),
+            "PageTables": self._value(memory_total >> 8),
+        }
+        write_file(
+            self.proc_dir + "/meminfo",
+            "".join(f"{entry}: {value:>15} kB\n" for entry, value in meminfo.items()),
+        )
+
+        # major page faults are part of page faults
+        major_page_faults = self._value(1 << 20)
+        write_file(
+            self.proc_dir + "/vmstat",
+            f"nr_free_pages {meminfo['MemFree'] >> 2}\n"
+            + f"pgpgin {self._value()}\n"
+            + f"pgfault {major_page_faults + self._value()}\n"
+            + f"pgmajfault {major_page_faults}\n",
+        )
+
+    def generate_disk(self):
+        """
+        generate block devices in sysfs and /proc/diskstats
+        """
+        lines = []
+        for disk in range(self.counts["disks"]):
+            disk_device = f"sd{disk}"
+            values = " ".join(str(self._value(1 << 32)) for _ in range(17))
+            write_file(self.sys_dir + f"/class/block/{disk_device}/stat", values + "\n")
+            lines.append(f"   8 {disk:7d} {disk_device} {values}\n")
+        write_file(self.proc_dir + "/diskstats", "".join(lines))
+
+    def generate_network(self):
+        """
+        generate network interfaces in sysfs and /proc/net/dev
+        """
+        lines = [net_dev_header]
+        for interface in range(self.counts["interfaces"]):
+            interface_name = f"eth{interface}"
+            values = [self._value() for _ in range(16)]
+            lines.append(
+                f"{interface_name:>6}: "
+                + " ".join(str(value) for value in values)
+                + "\n"
+            )
+            for metric in net_statistics:
+                write_file(
+                    self.sys_dir + f"/class/net/{interface_name}/statistics/{metric}",
+                    f"{self._value()}\n",
+                )
+        write_file(self.proc_dir + "/net/dev", "".join(lines))
+
+    def generate_tcp(self):
+        """
+        generate /proc/net/tcp and /proc/net/tcp6
+        """
+        os.makedirs(self.proc_dir + "/net", exist_ok=True)
+        with open(self.proc_dir + "/net/tcp", "wt") as f:
+            f.write(tcp_header)
+            for count in range(self.counts["tcp_sockets"]):
+                f.write(
+                    f"{count:6d}: 0100007F:{self.random.randrange(65536):04X} "
+                    + f"0100007F:{self.random.randrange(65536):04X} "
+                    + f"{self.random.randrange(1, 13):02X} 00000000:00000000 "
+                    + f"00:00000000 00000000     0        0 {count} 1 "
+                    + "0000000000000000 20 4 30 10 -1\n"
+                )
+        write_file(self.proc_dir + "/net/tcp6", tcp_header)
+
+    def generate_udp(self):
+        """
+        generate /proc/net/snmp
+        """
+        write_file(
+            self.proc_dir + "/net/snmp",
+            "Udp: "
+            + " ".join(snmp_udp_fields)
+            + "\nUdp: "
+            + " ".join(str(self._value()) for _ in snmp_udp_fields)
+            + "\n",
+        )
+
+    def generate_arp(self):
+        """
+        generate /proc/net/arp
+        """
+        os.makedirs(self.proc_dir + "/net", exist_ok=True)
+        with open(self.proc_dir + "/net/arp", "wt") as f:
+            f.write(arp_header)
+            for count in range(self.counts["arp_entries"]):
+                f.write(
+                    f"10.{count >> 16 & 255}.{count >> 8 & 255}.{count & 255}"
+                    + f"        0x1         0x2         02:00:00:{count >> 16 & 255:02x}"
+                    + f":{count >> 8 & 255:02x}:{count & 255:02x}     *        eth0\n"
+                )
+
+    def generate_sockstat(self):
+        """
+        generate /proc/net/sockstat and /proc/net/sockstat6
+        """
+        write_file(
+            self.proc_dir + "/net/sockstat",
+            f"sockets: used {self._value(1 << 20)}\n"
+            + f"TCP: inuse {self._value(1 << 20)} orphan 0 tw {self._value(1 << 16)} "
+            + f"alloc {self._value(1 << 20)} mem {self._value(1 << 16)}\n"
+            + f"UDP: inuse {self._value(1 << 10)} mem {self._value(1 << 10)}\n"
+            + "UDPLITE: inuse 0\nRAW: inuse 0\nFRAG: inuse 0 memory 0\n",
+        )
+        write_file(
+            self.proc_dir + "/net/sockstat6",
+            f"TCP6: inuse {self._value(1 << 16)}\nUDP6: inuse {self._value(1 << 10)}\n"
+            + "UDPLITE6: inuse 0\nRAW6: inuse 0\nFRAG6: inuse 0 memory 0\n",
+        )
+
+    def generate(self):
+        """
+        generate procfs and sysfs trees of all collectors
+        """
+        self.generate_cpu()
+        self.generate_os()
+        self.generate_memory()
+        self.generate_disk()
+        self.generate_network()
+        self.generate_tcp()
+        self.generate_udp()
+        self.generate_arp()
+        self.generate_sockstat()
+
+
+if __name__ == "__main__":
+    # set up args
+    parser = argparse.ArgumentParser(
+        description="Host Monitoring Station Synthetic procfs / sysfs Fixture Generator"
+    )
+    parser.add_argument("--dir", type=str, required=True, help="fixtures directory")
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        required=False,
+        default="small,large",
+        help=f"scenarios to be generated, {','.join(scenarios)} or a custom name (default: small,large)",
+    )
+    for parameter, count in scenarios["large"].items():
+        parser.add_argument(
+            f"--{parameter.replace('_', '-')}",
+            type=int,
+            required=False,
+            default=None,
+            help=f"number of {parameter.replace('_', ' ')} (default: scenario preset, {count} in large scenario)",
+        )
+    args = parser.parse_args()
+
+    for scenario in args.scenario.split(","):
+        counts = dict(scenarios.get(scenario, scenarios["small"]))
+        for parameter in counts:
+            if getattr(args, parameter) is not None:
+                counts[parameter] = getattr(args, parameter)
+
+        # each scenario has its own proc and sys directories
+        scenario_dir = args.dir + f"/{scenario}"
+        shutil.rmtree(scenario_dir, ignore_errors=True)
+        os.makedirs(scenario_dir)
+
+        start = time.perf_counter()
+        Fixture(scenario_dir, counts).generate()
+        with open(scenario_dir + "/scenario.json", "wt") as f:
+            json.dump(counts, f, indent=2, sort_keys=True)
+
+        print(
+            f"scenario {scenario} generated in {time.perf_counter() - start:.1f}s: "
+            + ", ".join(f"{parameter} {count}" for parameter, count in counts.items())
+        )
@@ -1,14 +1,43 @@
 #!/usr/bin/env python3
 
-__version__ = "0.0.13"
-
-from . import arp
-from . import cpu
-from . import disk
-from . import memory
-from . import network
-from . import os
-from . import tcp
-from . import udp
-from . import graph
-from . import utils
+__version__ = "0.0.14"
+
+# submodules are imported on first access (e.g. hms.graph), so the metrics poller does
+# not load graphing code and the web application does not load collectors
+__all__ = [
+    "arp",
+    "cache",
+    "cpu",
+    "disk",
+    "export",
+    "graph",
+    "memory",
+    "network",
+    "os",
+    "procfs",
+    "ring",
+    "rrdcached",
+    "sampler",
+    "series",
+    "sockstat",
+    "tcp",
+    "timespec",
+    "udp",
+    "utils",
+]
+
+
+def __getattr__(name):
+    """
+    import submodule on first access
+    """
+    if name in __all__:
+        # __import__ is used so lazy imports are reported by python -X importtime
+        __import__(f"{__name__}.{name}")
+        return globals()[name]
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
+from . import procfs
+
 
 class ARP:
-    def __init__(self):
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
         self.arp = self._get_arp()
 
     def _get_arp(self):
@@ -13,15 +16,11 @@ class ARP:
             "arp_cache_entries": 0,
         }
 
-        try:
-            with open("/proc/net/arp", "rt") as f:
-                arp_lines = f.readlines()
-        except:
-            pass
-        else:
+        arp_lines = self.snapshot.readlines("/proc/net/arp")
+        if arp_lines:
             arp_cache_entries_counter = 0
             for line in arp_lines:
-                if not line.startswith("IP address"):
+                if not line.startswith(b"IP address"):
                     arp_cache_entries_counter += 1
 
             arp["arp_cache_entries"] = arp_cache_entries_counter
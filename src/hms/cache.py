@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import glob
+import hashlib
+import os
+import threading
+
+
+class RenderCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # counters of the current process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # estimated cache size, it's recalculated from cache directory on eviction
+        self.cache_bytes = None
+        self.lock = threading.Lock()
+
+    def get_key(self, size, start, end):
+        """
+        get cache key of graph size and resolved time range
+
+        start and end are timestamps snapped to the RRD step, so graphs of relative time
+        range (e.g. end-8h, now) are reused until the next RRD update
+        """
+        return hashlib.sha1(
+            f"{size}|{start}|{end}".encode(), usedforsecurity=False
+        ).hexdigest()[:16]
+
+    def lookup(self, graph_filename):
+        """
+        check whether graph is cached, modification time of cached graph is updated for LRU
+        """
+        try:
+            os.utime(graph_filename)
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return False
+
+        with self.lock:
+            self.hits += 1
+
+        return True
+
+    def add(self, graph_filename):
+        """
+        account new cached graph and evict least recently used graphs if cache is full
+        """
+        try:
+            graph_size = os.path.getsize(graph_filename)
+        except OSError:
+            return
+
+        with self.lock:
+            if self.cache_bytes is not None:
+                self.cache_bytes += graph_size
+            if self.cache_bytes is None or self.cache_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        remove least recently used graphs until cache size is under the limit
+
+        cached graphs are scanned from the cache directory, so graphs cached by other
+        processes are included.
+        """
+        cached_graphs = []
+        for graph_filename in glob.glob(self.cache_dir + "/*.png"):
+            try:
+                graph_stat = os.stat(graph_filename)
+            except OSError:
+                continue
+            cached_graphs.append(
+                (graph_stat.st_mtime, graph_stat.st_size, graph_filename)
+            )
+
+        self.cache_bytes = sum(graph_size for _, graph_size, _ in cached_graphs)
+
+        for _, graph_size, graph_filename in sorted(cached_graphs):
+            if self.cache_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(graph_filename)
+            except OSError:
+                continue
+            self.cache_bytes -= graph_size
+            self.evictions += 1
+
+    def stats(self):
+        """
+        get cache counters
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "cache_bytes": self.cache_bytes,
+                "max_bytes": self.max_bytes,
+            }
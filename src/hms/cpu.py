@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 
+from . import procfs
 from . import utils
 
 
 class CPU:
-    def __init__(self):
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
         self.cpus = utils.get_cpu()
         self.cpu = self._get_cpu()
 
@@ -14,13 +16,9 @@ class CPU:
         """
         value = None
 
-        try:
-            with open(f"{metric_file_path}", "rt") as f:
-                metric_lines = f.readlines()
-        except:
-            pass
-        else:
-            value = metric_lines[0].strip()
+        metric_lines = self.snapshot.readlines(metric_file_path)
+        if metric_lines:
+            value = metric_lines[0].strip().decode()
 
         return value
 
@@ -1,10 +1,35 @@
 #!/usr/bin/env python3
 
+from . import procfs
 from . import utils
 
+# ref.: https://www.kernel.org/doc/Documentation/ABI/testing/procfs-diskstats
+# format: [metric name: field index after device name]
+# discard fields are available since kernel 4.18 and flush fields since kernel 5.5
+disk_stats_fields = {
+    "read_io": 0,
+    "read_merge": 1,
+    "read_sector": 2,
+    "read_ticks": 3,
+    "write_io": 4,
+    "write_merge": 5,
+    "write_sector": 6,
+    "write_ticks": 7,
+    "in_flight": 8,
+    "io_ticks": 9,
+    "time_in_queue": 10,
+    "discard_io": 11,
+    "discard_merge": 12,
+    "discard_sector": 13,
+    "discard_ticks": 14,
+    "flush_io": 15,
+    "flush_ticks": 16,
+}
+
 
 class Disk:
-    def __init__(self):
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
         self.disk_devices = utils.get_disk_devices()
         self.disk = self._get_disk()
 
@@ -21,38 +46,48 @@ class Disk:
         """
         values = []
 
-        try:
-            with open(f"/sys/class/block/{disk_device}/stat", "rt") as f:
-                metric_lines = f.readlines()
-        except:
-            pass
-        else:
-            values = metric_lines[0].strip().split()
+        metric_lines = self.snapshot.readlines(f"/sys/class/block/{disk_device}/stat")
+        if metric_lines:
+            values = metric_lines[0].decode().split()
 
         return values
 
+    def _read_diskstats(self):
+        """
+        read stats values of all disk devices from /proc/diskstats in one read
+        format: {disk device: [stats values]}
+        """
+        diskstats = {}
+
+        for line in self.snapshot.readlines("/proc/diskstats"):
+            cols = line.decode().split()
+            if len(cols) > 3:
+                diskstats[cols[2]] = cols[3:]
+
+        return diskstats
+
     def _get_disk(self):
         """
         get disk devices stats data
         ref.: https://www.kernel.org/doc/Documentation/block/stat.txt
         """
         disk = {}
-        # format: [metric name: metric index on stat]
-        metrics = {
-            "read_io": 0,
-            "read_merge": 1,
-            "read_sector": 2,
-            "write_io": 4,
-            "write_merge": 5,
-            "write_sector": 6,
-            "in_flight": 8,
-        }
-
-        for metric, index in metrics.items():
-            for disk_device in self.disk_devices:
-                if metric not in disk:
-                    disk[metric] = {}
-
-                disk[metric][disk_device] = self._read_stats(disk_device)[index]
+        for metric in disk_stats_fields:
+            disk[metric] = {}
+
+        # use /proc/diskstats and fall back to sysfs stat files if it's not readable
+        diskstats = self._read_diskstats()
+
+        for disk_device in self.disk_devices:
+            if diskstats:
+                values = diskstats.get(disk_device, [])
+            else:
+                values = self._read_stats(disk_device)
+
+            for metric, index in disk_stats_fields.items():
+                if index < len(values):
+                    disk[metric][disk_device] = values[index]
+                else:
+                    disk[metric][disk_device] = None
 
         return disk
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+import jinja2
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from . import graph
+from . import utils
+
+# default export views - {view name: {start, end, size}}
+default_views = {
+    "default": {"start": "end-8h", "end": "now", "size": "medium"},
+}
+
+
+class Export:
+    def __init__(
+        self,
+        export_dir,
+        rrd_db_dir,
+        views=None,
+        template_dir=utils.template_dir,
+        rrdcached_address=None,
+        rrd_layout="metric",
+        keep_releases=3,
+    ):
+        # export directory is a symlink to the current release, releases are kept in a
+        # sibling directory so the symlink can be swapped atomically
+        self.export_dir = os.path.abspath(export_dir)
+        self.releases_dir = self.export_dir + ".releases"
+        self.rrd_db_dir = rrd_db_dir
+        self.views = views or default_views
+        self.template_dir = template_dir
+        self.rrdcached_address = rrdcached_address
+        self.rrd_layout = rrd_layout
+        # the current and the previous releases are always kept, so pages being read
+        # from the previous release can still load their graphs
+        self.keep_releases = max(int(keep_releases), 2)
+        # manifest of the release being exported
+        self.manifest = {}
+        self.rendered = 0
+        self.reused = 0
+
+    def _get_current_release(self):
+        """
+        get directory of the current release, None is returned if nothing is exported
+        """
+        if os.path.islink(self.export_dir):
+            return os.path.realpath(self.export_dir)
+
+        return None
+
+    def _load_manifest(self, release_dir):
+        """
+        load manifest of a release - {view/subsystem/graph name: graph entry}
+        """
+        try:
+            with open(release_dir + "/manifest.json", "rt") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _link_graph(self, source_filename, graph_filename):
+        """
+        reuse graph of the previous release, hard link is used if possible
+        """
+        try:
+            os.link(source_filename, graph_filename)
+        except OSError:
+            shutil.copy2(source_filename, graph_filename)
+
+    def _export_view(self, release_dir, view_name, view, current_release, manifest):
+        """
+        export graphs of a view into release directory and return graph URL mappings
+
+        graphs are only rendered if RRD databases are updated or the view is changed
+        since the previous release, otherwise graphs of the previous release are reused
+        """
+        view_dir = release_dir + f"/{view_name}"
+        os.makedirs(view_dir)
+
+        hms_graph = graph.Graph(
+            self.rrd_db_dir,
+            view_dir,
+            view["size"],
+            view["start"],
+            view["end"],
+            view_name,
+            self.rrdcached_address,
+            self.rrd_layout,
+        )
+
+        graph_urls = {}
+        for subsystem, graph_names in graph.graph_definitions.items():
+            for graph_name in graph_names:
+                graph_urls[f"{subsystem}_{graph_name}"] = None
+                if not hms_graph.is_bootstrapped(subsystem, graph_name):
+                    continue
+
+                manifest_key = f"{view_name}/{subsystem}/{graph_name}"
+                try:
+                    entry = {
+                        "start": view["start"],
+                        "end": view["end"],
+                        "size": view["size"],
+                        "last_update": hms_graph.get_last_update(subsystem, graph_name),
+                    }
+                    previous_entry = dict(manifest.get(manifest_key, {}))
+                    graph_basename = previous_entry.pop("filename", None)
+
+                    if (
+                        current_release is not None
+                        and previous_entry == entry
+                        and os.path.exists(
+                            current_release + f"/{view_name}/{graph_basename}"
+                        )
+                    ):
+                        self._link_graph(
+                            current_release + f"/{view_name}/{graph_basename}",
+                            view_dir + f"/{graph_basename}",
+                        )
+                        self.reused += 1
+                    else:
+                        graph_basename = hms_graph.plot_graph(subsystem, graph_name)
+                        self.rendered += 1
+                except Exception as e:
+                    print(
+                        f"ERROR: failed to export {subsystem} {graph_name} graph of {view_name} view: {str(e)}",
+                        file=sys.stderr,
+                    )
+                    continue
+
+                self.manifest[manifest_key] = {**entry, "filename": graph_basename}
+                graph_urls[f"{subsystem}_{graph_name}"] = (
+                    f"{view_name}/{graph_basename}"
+                )
+
+        return graph_urls
+
+    def export(self):
+        """
+        export HTML pages and graphs of all views into a new release, then switch the
+        export directory to the new release
+
+        each view is exported into <view>.html and <view>/ directory of the release,
+        index.html is the page of the first view
+        """
+        if os.path.exists(self.export_dir) and not os.path.islink(self.export_dir):
+            raise RuntimeError(f"{self.export_dir} exists and is not a symlink")
+
+        os.makedirs(self.releases_dir, exist_ok=True)
+        current_release = self._get_current_release()
+        manifest = self._load_manifest(current_release) if current_release else {}
+
+        # release directory names start with the export time in nanoseconds, so they're
+        # sorted by age
+        now = time.time_ns()
+        release_dir = tempfile.mkdtemp(
+            prefix=time.strftime("%Y%m%d%H%M%S", time.localtime(now // 1000000000))
+            + f".{now % 1000000000:09d}-",
+            dir=self.releases_dir,
+        )
+        os.chmod(release_dir, 0o755)
+
+        self.manifest = {}
+        self.rendered = 0
+        self.reused = 0
+
+        try:
+            template = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(self.template_dir), autoescape=True
+            ).get_template("hms.html")
+            hostname = utils.get_hostname_fqdn()
+
+            pages = []
+            for view_name, view in self.views.items():
+                if not utils.test_rrd_time_range(view["start"], view["end"]):
+                    print(
+                        f"ERROR: {view_name} view has invalid time range, skipped",
+                        file=sys.stderr,
+                    )
+                    continue
+
+                graph_urls = self._export_view(
+                    release_dir, view_name, view, current_release, manifest
+                )
+                page = template.render(hostname=hostname, **graph_urls)
+                with open(release_dir + f"/{view_name}.html", "wt") as f:
+                    f.write(page)
+                pages.append(page)
+
+            if pages:
+                with open(release_dir + "/index.html", "wt") as f:
+                    f.write(pages[0])
+
+            with open(release_dir + "/manifest.json", "wt") as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+            # switch the symlink in one rename, readers see either the previous or the
+            # new release
+            temp_link = self.export_dir + ".tmp"
+            if os.path.lexists(temp_link):
+                os.remove(temp_link)
+            os.symlink(release_dir, temp_link)
+            os.replace(temp_link, self.export_dir)
+        except Exception:
+            shutil.rmtree(release_dir, ignore_errors=True)
+            raise
+
+        self._remove_old_releases([release_dir, current_release])
+
+    def _remove_old_releases(self, kept_releases):
+        """
+        remove old releases, the newest keep_releases releases and kept_releases are
+        kept
+        """
+        kept_names = {os.path.basename(release) for release in kept_releases if release}
+        releases = sorted(os.listdir(self.releases_dir))
+
+        for release in releases[: -self.keep_releases]:
+            if release not in kept_names:
+                shutil.rmtree(
+                    os.path.join(self.releases_dir, release), ignore_errors=True
+                )
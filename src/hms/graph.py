@@ -1,35 +1,597 @@
 #!/usr/bin/env python3
 
-import collections
+import concurrent.futures
+import functools
+import glob
 import os
 import rrdtool
+import threading
+from . import sampler
 from . import utils
 
+color_plate = [
+    "#191970",
+    "#FF0000",
+    "#00FF00",
+    "#0000FF",
+    "#FF8C00",
+    "#00FFFF",
+    "#FF00FF",
+    "#800000",
+    "#808000",
+    "#008000",
+    "#800080",
+    "#008080",
+    "#000080",
+]
+
+tcp_states = [
+    "ESTABLISHED",
+    "SYN_SENT",
+    "SYN_RECV",
+    "FIN_WAIT1",
+    "FIN_WAIT2",
+    "TIME_WAIT",
+    "CLOSE",
+    "CLOSE_WAIT",
+    "LAST_ACK",
+    "LISTEN",
+    "CLOSING",
+    "NEW_SYN_RECV",
+]
+
+# graph definitions of each subsystem - {subsystem: {graph name: graph definition}}
+#
+# graph definition keys:
+#   graph_filename: graph filename prefix
+#   title / vertical_label / format: graph title, vertical label and GPRINT format
+#   args: extra rrdtool graph arguments
+#   optional: graph is skipped if RRD databases are not bootstrapped
+#
+# metric graphs plot data sources of one RRD database:
+#   rrd_filename: RRD database filename
+#   metrics: {data source: (legend, style, color)}, color plate is used if color is None
+#
+# device graphs plot one line per CPU, disk device or network interface:
+#   devices: subsystem of the devices
+#   rrd_metrics: metrics of each device, the first one is plotted if cdef is not set
+#   cdef: CDEF of each device, {device} is replaced with the device name
+#
+# high frequency sampled metrics (see sampler.sampled_metrics) are plotted with the
+# min/max envelope of the step if the aggregation data sources exist
+graph_definitions = {
+    "os": {
+        "loadavg": {
+            "graph_filename": "os-loadavg",
+            "title": "Load Average 1min/5min/15min",
+            "vertical_label": None,
+            "format": "%6.2lf",
+            "args": ["-X", "0"],
+            "rrd_filename": "os.rrd",
+            "metrics": {
+                "loadavg_1min": ("LoadAvg 1min", "LINE1", "#FF0000"),
+                "loadavg_5min": ("LoadAvg 5min", "LINE1", "#00FF00"),
+                "loadavg_15min": ("LoadAvg 15min", "LINE1", "#0000FF"),
+            },
+        },
+        "fd": {
+            "graph_filename": "os-fd",
+            "title": "File Descriptors Usage",
+            "vertical_label": "count",
+            "format": "%20.1lf",
+            "rrd_filename": "os.rrd",
+            "metrics": {
+                "num_used_fd": ("Number of Used FDs", "LINE1", "#FF0000"),
+            },
+        },
+        "procs": {
+            "graph_filename": "os-procs",
+            "title": "Processes States",
+            "vertical_label": "count",
+            "format": "%20.1lf",
+            "rrd_filename": "os.rrd",
+            "metrics": {
+                "num_total_procs": ("Number of Total Processes", "LINE1", "#FF0000"),
+                "num_running_procs": (
+                    "Number of Running Processes",
+                    "LINE1",
+                    "#00FF00",
+                ),
+                "num_blocked_procs": (
+                    "Number of Blocked Processes",
+                    "LINE1",
+                    "#0000FF",
+                ),
+                "num_zombie_procs": ("Number of Zombie Processes", "LINE1", "#FF00FF"),
+            },
+        },
+        "context_switch": {
+            "graph_filename": "os-context_switch",
+            "title": "Context Switches States (per second)",
+            "vertical_label": "count/second",
+            "format": "%12.1lf",
+            "rrd_filename": "os.rrd",
+            "metrics": {
+                "num_context_switch": (
+                    "Number of Context Switches",
+                    "LINE1",
+                    "#FF0000",
+                ),
+            },
+        },
+    },
+    "cpu": {
+        "cpu_freq": {
+            "graph_filename": "cpu-cpu_freq",
+            "title": "CPU Running Frequency",
+            "vertical_label": "kHz",
+            "format": "%10.1lf",
+            "devices": "cpu",
+            "rrd_metrics": ["cpu_freq"],
+        },
+    },
+    "memory": {
+        "memory": {
+            "graph_filename": "memory-memory",
+            "title": "Memory Usage (kB)",
+            "vertical_label": "kB",
+            "format": "%12.1lf",
+            "rrd_filename": "memory.rrd",
+            "metrics": {
+                "memory_total": ("Total Memory", "AREA", "#00FF7F"),
+                "memory_free": ("Free Memory", "LINE1", "#800080"),
+                "memory_avail": ("Available Memory", "LINE1", "#FF0000"),
+                "buffer": ("Buffer", "LINE1", "#FF00FF"),
+                "cache": ("Cache", "LINE1", "#0000FF"),
+                "page_tables": ("Page Tables", "LINE1", "#CE7E00"),
+            },
+        },
+        "swap": {
+            "graph_filename": "memory-swap",
+            "title": "Swap Usage (kB)",
+            "vertical_label": "kB",
+            "format": "%12.1lf",
+            "rrd_filename": "memory.rrd",
+            "metrics": {
+                "swap_total": ("Total Swap", "AREA", "#00FF7F"),
+                "swap_free": ("Free Swap", "LINE1", "#800080"),
+            },
+        },
+        "virtual": {
+            "graph_filename": "memory-virtual",
+            "title": "Page Faults (per second)",
+            "vertical_label": "count/second",
+            "format": "%12.1lf",
+            "rrd_filename": "memory.rrd",
+            "metrics": {
+                "minor_page_faults": ("Minor Page Faults", "LINE1", "#FF0000"),
+                "major_page_faults": ("Major Page Faults", "LINE1", "#00FF00"),
+            },
+        },
+    },
+    "disk": {
+        "read_io": {
+            "graph_filename": "disk-read_io",
+            "title": "Number of Read I/Os (per second)",
+            "vertical_label": "count/second",
+            "format": "%10.1lf",
+            "devices": "disk",
+            "rrd_metrics": ["read_io"],
+        },
+        "read_merge": {
+            "graph_filename": "disk-read_merge",
+            "title": "Number of Read I/Os Merged (per second)",
+            "vertical_label": "count/second",
+            "format": "%10.1lf",
+            "devices": "disk",
+            "rrd_metrics": ["read_merge"],
+        },
+        "read_sector": {
+            "graph_filename": "disk-read_sector",
+            "title": "Number of Sectors Read (per second)",
+            "vertical_label": "sector/second",
+            "format": "%10.1lf",
+            "devices": "disk",
+            "rrd_metrics": ["read_sector"],
+        },
+        "write_io": {
+            "graph_filename": "disk-write_io",
+            "title": "Number of Write I/Os (per second)",
+            "vertical_label": "count/second",
+            "format": "%10.1lf",
+            "devices": "disk",
+            "rrd_metrics": ["write_io"],
+        },
+        "write_merge": {
+            "graph_filename": "disk-write_merge",
+            "title": "Number of Write I/Os Merged (per second)",
+            "vertical_label": "count/second",
+            "format": "%10.1lf",
+            "devices": "disk",
+            "rrd_metrics": ["write_merge"],
+        },
+        "write_sector": {
+            "graph_filename": "disk-write_sector",
+            "title": "Number of Sectors Written (per second)",
+            "vertical_label": "sector/second",
+            "format": "%10.1lf",
+            "devices": "disk",
+            "rrd_metrics": ["write_sector"],
+        },
+        "in_flight": {
+            "graph_filename": "disk-in_flight",
+            "title": "Number of I/Os In Flight (per second)",
+            "vertical_label": "count/second",
+            "format": "%10.1lf",
+            "devices": "disk",
+            "rrd_metrics": ["in_flight"],
+        },
+        "await": {
+            "graph_filename": "disk-await",
+            "title": "Average I/O Wait Time (ms)",
+            "vertical_label": "ms",
+            "format": "%10.1lf",
+            "optional": True,
+            "devices": "disk",
+            "rrd_metrics": ["read_io", "write_io", "read_ticks", "write_ticks"],
+            "cdef": "{device}_read_io,{device}_write_io,+,0,EQ,0,"
+            + "{device}_read_ticks,{device}_write_ticks,+,"
+            + "{device}_read_io,{device}_write_io,+,/,IF",
+        },
+        "util": {
+            "graph_filename": "disk-util",
+            "title": "Disk Utilization (%)",
+            "vertical_label": "percent",
+            "format": "%10.1lf",
+            "optional": True,
+            "devices": "disk",
+            "rrd_metrics": ["io_ticks"],
+            "cdef": "{device}_io_ticks,10,/",
+        },
+        "queue": {
+            "graph_filename": "disk-queue",
+            "title": "Average Queue Size",
+            "vertical_label": "count",
+            "format": "%10.1lf",
+            "optional": True,
+            "devices": "disk",
+            "rrd_metrics": ["time_in_queue"],
+            "cdef": "{device}_time_in_queue,1000,/",
+        },
+    },
+    "network": {
+        "rx_bytes": {
+            "graph_filename": "network-rx_bytes",
+            "title": "Number of Good Received Bytes (per second)",
+            "vertical_label": "byte/second",
+            "format": "%10.1lf",
+            "devices": "network",
+            "rrd_metrics": ["rx_bytes"],
+        },
+        "rx_errors": {
+            "graph_filename": "network-rx_errors",
+            "title": "Number of Bad Packets Received (per second)",
+            "vertical_label": "packet/second",
+            "format": "%10.1lf",
+            "devices": "network",
+            "rrd_metrics": ["rx_errors"],
+        },
+        "rx_dropped": {
+            "graph_filename": "network-rx_dropped",
+            "title": "Number of Packets Received But Dropped (per second)",
+            "vertical_label": "packet/second",
+            "format": "%10.1lf",
+            "devices": "network",
+            "rrd_metrics": ["rx_dropped"],
+        },
+        "tx_bytes": {
+            "graph_filename": "network-tx_bytes",
+            "title": "Number of Good Transmitted Bytes (per second)",
+            "vertical_label": "byte/second",
+            "format": "%10.1lf",
+            "devices": "network",
+            "rrd_metrics": ["tx_bytes"],
+        },
+        "tx_errors": {
+            "graph_filename": "network-tx_errors",
+            "title": "Number of Bad Packets Transmitted (per second)",
+            "vertical_label": "packet/second",
+            "format": "%10.1lf",
+            "devices": "network",
+            "rrd_metrics": ["tx_errors"],
+        },
+        "tx_dropped": {
+            "graph_filename": "network-tx_dropped",
+            "title": "Number of Packets Dropped In Transmission (per second)",
+            "vertical_label": "packet/second",
+            "format": "%10.1lf",
+            "devices": "network",
+            "rrd_metrics": ["tx_dropped"],
+        },
+        "collisions": {
+            "graph_filename": "network-collisions",
+            "title": "Number of Collisions (per second)",
+            "vertical_label": "count/second",
+            "format": "%10.1lf",
+            "devices": "network",
+            "rrd_metrics": ["collisions"],
+        },
+    },
+    "tcp": {
+        "tcp": {
+            "graph_filename": "tcp",
+            "title": "IPv4 TCP Connection States (count)",
+            "vertical_label": "count",
+            "format": "%8.1lf",
+            "rrd_filename": "tcp.rrd",
+            "metrics": {state: (state, "LINE1", None) for state in tcp_states},
+        },
+        "tcp6": {
+            "graph_filename": "tcp6",
+            "title": "IPv6 TCP Connection States (count)",
+            "vertical_label": "count",
+            "format": "%8.1lf",
+            "rrd_filename": "tcp6.rrd",
+            "metrics": {state: (state, "LINE1", None) for state in tcp_states},
+        },
+    },
+    "udp": {
+        "udp": {
+            "graph_filename": "udp",
+            "title": "UDP Datagrams States (per second)",
+            "vertical_label": "datagram/second",
+            "format": "%8.2lf",
+            "rrd_filename": "udp.rrd",
+            "metrics": {
+                "InDatagrams": ("In Datagrams", "LINE1", "#FF0000"),
+                "OutDatagrams": ("Out Datagrams", "LINE1", "#00FF00"),
+                "InErrors": ("In Errors", "LINE1", "#0000FF"),
+                "NoPorts": ("No Ports", "LINE1", "#FF00FF"),
+            },
+        },
+    },
+    "arp": {
+        "arp": {
+            "graph_filename": "arp",
+            "title": "ARP Cache Entries (count)",
+            "vertical_label": "count",
+            "format": "%8.2lf",
+            "rrd_filename": "arp.rrd",
+            "metrics": {
+                "arp_cache_entries": ("ARP Cache Entries", "LINE1", "#FF0000"),
+            },
+        },
+    },
+    "sockstat": {
+        "sockstat": {
+            "graph_filename": "sockstat",
+            "title": "IPv4 Sockets Summary (count)",
+            "vertical_label": "count",
+            "format": "%10.1lf",
+            "optional": True,
+            "rrd_filename": "sockstat.rrd",
+            "metrics": {
+                "sockets_used": ("Sockets Used", "LINE1", None),
+                "tcp_inuse": ("TCP In Use", "LINE1", None),
+                "tcp_orphan": ("TCP Orphan", "LINE1", None),
+                "tcp_tw": ("TCP TIME_WAIT", "LINE1", None),
+                "tcp_alloc": ("TCP Allocated", "LINE1", None),
+                "udp_inuse": ("UDP In Use", "LINE1", None),
+                "udplite_inuse": ("UDPLITE In Use", "LINE1", None),
+                "raw_inuse": ("RAW In Use", "LINE1", None),
+                "frag_inuse": ("FRAG In Use", "LINE1", None),
+            },
+        },
+        "sockstat6": {
+            "graph_filename": "sockstat6",
+            "title": "IPv6 Sockets Summary (count)",
+            "vertical_label": "count",
+            "format": "%10.1lf",
+            "optional": True,
+            "rrd_filename": "sockstat6.rrd",
+            "metrics": {
+                "tcp6_inuse": ("TCP6 In Use", "LINE1", None),
+                "udp6_inuse": ("UDP6 In Use", "LINE1", None),
+                "udplite6_inuse": ("UDPLITE6 In Use", "LINE1", None),
+                "raw6_inuse": ("RAW6 In Use", "LINE1", None),
+                "frag6_inuse": ("FRAG6 In Use", "LINE1", None),
+            },
+        },
+        "memory": {
+            "graph_filename": "sockstat-memory",
+            "title": "Sockets Memory Usage (page)",
+            "vertical_label": "page",
+            "format": "%10.1lf",
+            "optional": True,
+            "rrd_filename": "sockstat.rrd",
+            "metrics": {
+                "tcp_mem": ("TCP Memory", "LINE1", None),
+                "udp_mem": ("UDP Memory", "LINE1", None),
+            },
+        },
+    },
+    "hms": {
+        "collectors": {
+            "graph_filename": "hms-collectors",
+            "title": "HMS Poller Collectors Time (seconds)",
+            "vertical_label": "seconds",
+            "format": "%8.3lf",
+            "optional": True,
+            "rrd_filename": "hms_self.rrd",
+            "metrics": {
+                f"poll_{collector}": (collector, "LINE1", None)
+                for collector in [
+                    "cpu",
+                    "disk",
+                    "memory",
+                    "os",
+                    "network",
+                    "tcp",
+                    "udp",
+                    "arp",
+                    "sockstat",
+                ]
+            },
+        },
+        "cycle": {
+            "graph_filename": "hms-cycle",
+            "title": "HMS Poller Cycle Time (seconds)",
+            "vertical_label": "seconds",
+            "format": "%8.3lf",
+            "optional": True,
+            "rrd_filename": "hms_self.rrd",
+            "metrics": {
+                "cycle_time": ("Cycle Time", "LINE1", "#FF0000"),
+                "process_cpu_time": ("Process CPU Time", "LINE1", "#00FF00"),
+                "rrd_update_time": ("RRD Update Time", "LINE1", "#0000FF"),
+                "schedule_lateness": ("Schedule Lateness", "LINE1", "#FF00FF"),
+            },
+        },
+        "memory": {
+            "graph_filename": "hms-memory",
+            "title": "HMS Poller Peak RSS (bytes)",
+            "vertical_label": "bytes",
+            "format": "%20.1lf",
+            "optional": True,
+            "rrd_filename": "hms_self.rrd",
+            "metrics": {
+                "peak_rss": ("Peak RSS", "LINE1", "#FF0000"),
+            },
+        },
+        "files": {
+            "graph_filename": "hms-files",
+            "title": "HMS Poller procfs / sysfs Files (count)",
+            "vertical_label": "count",
+            "format": "%8.1lf",
+            "optional": True,
+            "rrd_filename": "hms_self.rrd",
+            "metrics": {
+                "files_read": ("Files Read", "LINE1", "#FF0000"),
+                "files_opened": ("Files Opened", "LINE1", "#00FF00"),
+            },
+        },
+    },
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_graph_commands(
+    subsystem, graph_name, rrd_db_dir, device_sources=(), envelope_sources=()
+):
+    """
+    compile DEF / CDEF / LINE / GPRINT commands of a graph
+
+    device_sources is ((device name, ((RRD database filename, data source), ...)), ...)
+    with one data source per rrd_metrics of device graphs. envelope_sources is
+    ((vname, ((aggregation, RRD database filename, data source), ...)), ...) with the min
+    and max aggregations of high frequency sampling. compiled commands are cached by
+    arguments, so the commands are only built once for the same RRD databases.
+    """
+    graph_definition = graph_definitions[subsystem][graph_name]
+    number_format = graph_definition["format"]
+
+    # lines of the graph - (vname, legend, style, color, data sources)
+    if "devices" in graph_definition:
+        lines = [
+            (device, device, "LINE1", None, sources)
+            for device, sources in device_sources
+        ]
+    else:
+        rrd_filename = rrd_db_dir + "/" + graph_definition["rrd_filename"]
+        lines = [
+            (metric, legend, style, color, ((rrd_filename, metric),))
+            for metric, (legend, style, color) in graph_definition["metrics"].items()
+        ]
+
+    # get color plate list
+    line_color_plate = utils.rotate_color_plate(lines, color_plate)
+    envelopes = dict(envelope_sources)
+
+    graph_commands = []
+    for count in range(len(lines)):
+        vname, legend, style, color, sources = lines[count]
+        color = color or line_color_plate[count]
+        if "cdef" in graph_definition:
+            for rrd_metric, (rrd_filename, rrd_ds) in zip(
+                graph_definition["rrd_metrics"], sources
+            ):
+                graph_commands.append(
+                    f"DEF:{vname}_{rrd_metric}={rrd_filename}:{rrd_ds}:AVERAGE"
+                )
+            graph_commands.append(
+                f"CDEF:{vname}={graph_definition['cdef'].format(device=vname)}"
+            )
+        else:
+            rrd_filename, rrd_ds = sources[0]
+            graph_commands.append(f"DEF:{vname}={rrd_filename}:{rrd_ds}:AVERAGE")
+
+        # envelope is drawn below the line, MIN and MAX consolidations keep the extremes
+        # of the sampled values in consolidated RRAs
+        aggregations = set()
+        for aggregation, rrd_filename, rrd_ds in envelopes.get(vname, ()):
+            graph_commands.append(
+                f"DEF:{vname}_{aggregation}={rrd_filename}:{rrd_ds}:{aggregation.upper()}"
+            )
+            aggregations.add(aggregation)
+        if aggregations == {"min", "max"}:
+            graph_commands.append(f"CDEF:{vname}_range={vname}_max,{vname}_min,-")
+            graph_commands.append(f"LINE1:{vname}_min")
+            graph_commands.append(
+                f"AREA:{vname}_range{color}40:{legend} min/max envelope:STACK"
+            )
+        elif "max" in aggregations:
+            graph_commands.append(f"LINE1:{vname}_max{color}80:{legend} max:dashes")
+
+        graph_commands.append(f"{style}:{vname}{color}:{legend}")
+        graph_commands.append(f"GPRINT:{vname}:MAX:max\\: {number_format}")
+        graph_commands.append(f"GPRINT:{vname}:MIN:min\\: {number_format}")
+        graph_commands.append(f"GPRINT:{vname}:LAST:last\\: {number_format} \\j")
+
+    return tuple(graph_commands)
+
+
+def render_graph(render_filename, graph_args):
+    """
+    render RRD graph into file
+
+    it's a module function, so graphs can be rendered in render pool worker processes
+    """
+    rrdtool.graph(render_filename, graph_args)
+
 
 class Graph:
-    def __init__(self, rrd_db_dir, rrd_graph_dir, size, start, end, uuid):
+    def __init__(
+        self,
+        rrd_db_dir,
+        rrd_graph_dir,
+        size,
+        start,
+        end,
+        uuid,
+        rrdcached_address=None,
+        rrd_layout="metric",
+        render_cache=None,
+        render_pool=None,
+    ):
         self.rrd_db_dir = rrd_db_dir
+        # RRD databases layout of disk and network metrics - metric or device
+        self.rrd_layout = rrd_layout
         self.rrd_graph_dir = rrd_graph_dir
         self.rrd_graph_format = "PNG"
+        # rrdtool flushes pending updates of RRD databases in rrdcached before graphing
+        self.rrdcached_address = rrdcached_address
+        self.rrdcached_args = (
+            ["--daemon", rrdcached_address] if rrdcached_address else []
+        )
         self.size = self._set_size(size)
         self.start = start
         self.end = end
         self.uuid = uuid
-        self.color_plate = [
-            "#191970",
-            "#FF0000",
-            "#00FF00",
-            "#0000FF",
-            "#FF8C00",
-            "#00FFFF",
-            "#FF00FF",
-            "#800000",
-            "#808000",
-            "#008000",
-            "#800080",
-            "#008080",
-            "#000080",
-        ]
+        self.color_plate = color_plate
+        # graphs are reused if they are in the render cache, uuid is the cache key
+        self.render_cache = render_cache
+        # graphs are rendered concurrently in the render pool if it's set
+        self.render_pool = render_pool
 
     def _set_size(self, size):
         """
@@ -45,188 +607,168 @@ class Graph:
         else:
             return sizes["medium"]
 
-    def plot_cpu_graph(self):
+    def _get_device_sources(self, subsystem, metric):
         """
-        plot CPU RRD graphs
+        get device data sources of a metric - [(device name, RRD database filename, data source)]
+
+        metric layout has one RRD database per metric with one data source per device,
+        device layout has one RRD database per device with one data source per metric.
+        CPU metrics are always in metric layout.
         """
-        # CPU graph filename mappings
-        cpu_graph_filename = {}
+        if self.rrd_layout == "device" and subsystem in ["disk", "network"]:
+            return [
+                (os.path.basename(rrd_filename)[: -len(".rrd")], rrd_filename, metric)
+                for rrd_filename in sorted(
+                    glob.glob(self.rrd_db_dir + f"/{subsystem}/*.rrd")
+                )
+            ]
 
-        # set up graph attributes
-        cpu_metric_mappings = {
-            "cpu_freq": {
-                "rrd_filename": self.rrd_db_dir + "/cpu-cpu_freq.rrd",
-                "graph_title": "CPU Running Frequency",
-                "graph_vertical_label": "kHz",
-                "graph_filename": self.rrd_graph_dir + f"/cpu-cpu_freq.{self.uuid}.png",
-            },
-        }
+        rrd_filename = self.rrd_db_dir + f"/{subsystem}-{metric}.rrd"
+        devices = utils.get_rrd_ds(rrd_filename, self.rrdcached_address)
+
+        # data sources of high frequency sampling aggregations are not devices
+        sampled_devices = sampler.get_sampled_ds(f"{subsystem}-{metric}", devices)
+        if sampled_devices:
+            devices = [device for device in devices if device in sampled_devices]
+
+        return [(device, rrd_filename, device) for device in devices]
+
+    def _device_sources_exist(self, subsystem, metrics):
+        """
+        check whether RRD databases of device metrics are bootstrapped
+        """
+        if self.rrd_layout == "device" and subsystem in ["disk", "network"]:
+            return len(glob.glob(self.rrd_db_dir + f"/{subsystem}/*.rrd")) > 0
+
+        return all(
+            os.path.exists(self.rrd_db_dir + f"/{subsystem}-{metric}.rrd")
+            for metric in metrics
+        )
 
-        for metric, graph_meta in cpu_metric_mappings.items():
-            # metric mapping variables
-            rrd_filename = graph_meta["rrd_filename"]
-            graph_title = graph_meta["graph_title"]
-            graph_vertical_label = graph_meta["graph_vertical_label"]
-            graph_filename = graph_meta["graph_filename"]
-
-            # get CPU names
-            cpus = utils.get_rrd_ds(rrd_filename)
-
-            # get color plate list
-            cpu_color_plate = utils.rotate_color_plate(cpus, self.color_plate)
-
-            # plot CPU graphs
-            cpu = collections.OrderedDict()
-            for count in range(len(cpus)):
-                cpu_name = cpus[count]
-                cpu[cpu_name] = {
-                    "color": cpu_color_plate[count],
-                    "legend": cpu_name,
-                    "style": "LINE1",
-                }
-
-            # CPU graph variables
-            cpu_graph_commands = []
-            for cpu_name, meta in cpu.items():
-                color = meta["color"]
-                legend = meta["legend"]
-                style = meta["style"]
-                cpu_graph_commands.append(
-                    f"DEF:{cpu_name}={rrd_filename}:{cpu_name}:LAST"
+    def _get_graph_device_sources(self, graph_definition):
+        """
+        get device data sources of a device graph for compile_graph_commands()
+        """
+        subsystem = graph_definition["devices"]
+        metric_sources = [
+            {
+                device: (rrd_filename, rrd_ds)
+                for device, rrd_filename, rrd_ds in self._get_device_sources(
+                    subsystem, rrd_metric
                 )
-                cpu_graph_commands.append(f"{style}:{cpu_name}{color}:{legend}")
-                cpu_graph_commands.append(f"GPRINT:{cpu_name}:MAX:max\: %10.1lf")
-                cpu_graph_commands.append(f"GPRINT:{cpu_name}:MIN:min\: %10.1lf")
-                cpu_graph_commands.append(f"GPRINT:{cpu_name}:LAST:last\: %10.1lf \j")
-
-            # generate graph
-            rrdtool.graph(
-                graph_filename,
-                "-a",
-                self.rrd_graph_format,
-                "--width",
-                str(self.size[0]),
-                "--height",
-                str(self.size[1]),
-                "--end",
-                str(self.end),
-                "--start",
-                str(self.start),
-                "--title",
-                graph_title,
-                "--vertical-label",
-                graph_vertical_label,
-                cpu_graph_commands,
-            )
+            }
+            for rrd_metric in graph_definition["rrd_metrics"]
+        ]
+
+        return tuple(
+            (device, tuple(sources[device] for sources in metric_sources))
+            for device in metric_sources[0]
+            if all(device in sources for sources in metric_sources)
+        )
+
+    def is_bootstrapped(self, subsystem, graph_name):
+        """
+        check whether RRD databases of a graph are bootstrapped, it's only checked for
+        optional graphs
+        """
+        graph_definition = graph_definitions[subsystem][graph_name]
 
-            # populate graph filenames
-            cpu_graph_filename[metric] = os.path.basename(graph_filename)
+        if not graph_definition.get("optional"):
+            return True
 
-        return cpu_graph_filename
+        if "devices" in graph_definition:
+            return self._device_sources_exist(
+                graph_definition["devices"], graph_definition["rrd_metrics"]
+            )
 
-    def plot_disk_graph(self):
+        return os.path.exists(self.rrd_db_dir + "/" + graph_definition["rrd_filename"])
+
+    def _get_graph_sources(self, subsystem, graph_name):
         """
-        plot disk RRD graphs
+        get data sources of a graph for compile_graph_commands()
         """
-        # disk graph filename mappings
-        disk_graph_filename = {}
+        graph_definition = graph_definitions[subsystem][graph_name]
 
-        # set up graph attributes
-        disk_metric_mappings = {
-            "read_io": {
-                "rrd_filename": self.rrd_db_dir + "/disk-read_io.rrd",
-                "graph_title": "Number of Read I/Os (per second)",
-                "graph_vertical_label": "count/second",
-                "graph_filename": self.rrd_graph_dir + f"/disk-read_io.{self.uuid}.png",
-            },
-            "read_merge": {
-                "rrd_filename": self.rrd_db_dir + "/disk-read_merge.rrd",
-                "graph_title": "Number of Read I/Os Merged (per second)",
-                "graph_vertical_label": "count/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/disk-read_merge.{self.uuid}.png",
-            },
-            "read_sector": {
-                "rrd_filename": self.rrd_db_dir + "/disk-read_sector.rrd",
-                "graph_title": "Number of Sectors Read (per second)",
-                "graph_vertical_label": "sector/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/disk-read_sector.{self.uuid}.png",
-            },
-            "write_io": {
-                "rrd_filename": self.rrd_db_dir + "/disk-write_io.rrd",
-                "graph_title": "Number of Write I/Os (per second)",
-                "graph_vertical_label": "count/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/disk-write_io.{self.uuid}.png",
-            },
-            "write_merge": {
-                "rrd_filename": self.rrd_db_dir + "/disk-write_merge.rrd",
-                "graph_title": "Number of Write I/Os Merged (per second)",
-                "graph_vertical_label": "count/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/disk-write_merge.{self.uuid}.png",
-            },
-            "write_sector": {
-                "rrd_filename": self.rrd_db_dir + "/disk-write_sector.rrd",
-                "graph_title": "Number of Sectors Written (per second)",
-                "graph_vertical_label": "sector/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/disk-write_sector.{self.uuid}.png",
-            },
-            "in_flight": {
-                "rrd_filename": self.rrd_db_dir + "/disk-in_flight.rrd",
-                "graph_title": "Number of I/Os In Flight (per second)",
-                "graph_vertical_label": "count/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/disk-in_flight.{self.uuid}.png",
-            },
-        }
+        if "devices" in graph_definition:
+            return self._get_graph_device_sources(graph_definition)
 
-        for metric, graph_meta in disk_metric_mappings.items():
-            # metric mapping variables
-            rrd_filename = graph_meta["rrd_filename"]
-            graph_title = graph_meta["graph_title"]
-            graph_vertical_label = graph_meta["graph_vertical_label"]
-            graph_filename = graph_meta["graph_filename"]
-
-            # get disk device names
-            disk_devices = utils.get_rrd_ds(rrd_filename)
-
-            # get color plate list
-            disk_color_plate = utils.rotate_color_plate(disk_devices, self.color_plate)
-
-            # plot disk graphs
-            disk = collections.OrderedDict()
-            for count in range(len(disk_devices)):
-                disk_device = disk_devices[count]
-                disk[disk_device] = {
-                    "color": disk_color_plate[count],
-                    "legend": disk_device,
-                    "style": "LINE1",
-                }
-
-            # disk graph variables
-            disk_graph_commands = []
-            for disk_device, meta in disk.items():
-                color = meta["color"]
-                legend = meta["legend"]
-                style = meta["style"]
-                disk_graph_commands.append(
-                    f"DEF:{disk_device}={rrd_filename}:{disk_device}:LAST"
-                )
-                disk_graph_commands.append(f"{style}:{disk_device}{color}:{legend}")
-                disk_graph_commands.append(f"GPRINT:{disk_device}:MAX:max\: %10.1lf")
-                disk_graph_commands.append(f"GPRINT:{disk_device}:MIN:min\: %10.1lf")
-                disk_graph_commands.append(
-                    f"GPRINT:{disk_device}:LAST:last\: %10.1lf \j"
+        return ()
+
+    def _get_graph_envelope_sources(self, subsystem, graph_name, graph_sources):
+        """
+        get min/max aggregation data sources of high frequency sampled metrics of a graph
+        for compile_graph_commands()
+        """
+        graph_definition = graph_definitions[subsystem][graph_name]
+
+        # lines of the graph - [(vname, data source type, RRD database filename, data source)]
+        if "devices" in graph_definition:
+            if "cdef" in graph_definition:
+                return ()
+            ds_type = sampler.sampled_metrics.get(graph_definition["devices"], {}).get(
+                graph_definition["rrd_metrics"][0]
+            )
+            if ds_type is None:
+                return ()
+            lines = [
+                (device, ds_type, *sources[0]) for device, sources in graph_sources
+            ]
+        else:
+            rrd_filename = self.rrd_db_dir + "/" + graph_definition["rrd_filename"]
+            lines = [
+                (
+                    metric,
+                    sampler.sampled_metrics[subsystem][metric],
+                    rrd_filename,
+                    metric,
                 )
+                for metric in graph_definition["metrics"]
+                if metric in sampler.sampled_metrics.get(subsystem, {})
+            ]
+
+        envelope_sources = []
+        for vname, ds_type, rrd_filename, rrd_ds in lines:
+            ds_names = utils.get_rrd_ds(rrd_filename, self.rrdcached_address)
+            sources = tuple(
+                (aggregation, rrd_filename, sampler.get_hf_ds_name(rrd_ds, aggregation))
+                for aggregation in ["min", "max"]
+                if aggregation in sampler.aggregations[ds_type]
+                and sampler.get_hf_ds_name(rrd_ds, aggregation) in ds_names
+            )
+            if sources:
+                envelope_sources.append((vname, sources))
+
+        return tuple(envelope_sources)
+
+    def _get_graph_args(self, subsystem, graph_name):
+        """
+        get rrdtool graph arguments of a graph
+        """
+        graph_definition = graph_definitions[subsystem][graph_name]
+        graph_sources = self._get_graph_sources(subsystem, graph_name)
+        graph_commands = compile_graph_commands(
+            subsystem,
+            graph_name,
+            self.rrd_db_dir,
+            graph_sources,
+            self._get_graph_envelope_sources(subsystem, graph_name, graph_sources),
+        )
+
+        graph_vertical_label = []
+        if graph_definition["vertical_label"]:
+            graph_vertical_label = [
+                "--vertical-label",
+                graph_definition["vertical_label"],
+            ]
 
-            # generate graph
-            rrdtool.graph(
-                graph_filename,
+        return (
+            [
                 "-a",
                 self.rrd_graph_format,
+            ]
+            + self.rrdcached_args
+            + graph_definition.get("args", [])
+            + [
                 "--width",
                 str(self.size[0]),
                 "--height",
@@ -236,787 +778,219 @@ class Graph:
                 "--start",
                 str(self.start),
                 "--title",
-                graph_title,
-                "--vertical-label",
-                graph_vertical_label,
-                disk_graph_commands,
-            )
-
-            # populate graph filenames
-            disk_graph_filename[metric] = os.path.basename(graph_filename)
-
-        return disk_graph_filename
+                graph_definition["title"],
+            ]
+            + graph_vertical_label
+            + list(graph_commands)
+        )
 
-    def plot_memory_graph(self):
+    def get_last_update(self, subsystem, graph_name):
         """
-        plot memory RRD graphs
+        get the latest last update timestamp of RRD databases of a graph
         """
-        # set up RRD DB filename
-        rrd_filename = self.rrd_db_dir + "/memory.rrd"
+        graph_definition = graph_definitions[subsystem][graph_name]
+
+        if "devices" in graph_definition:
+            rrd_filenames = {
+                rrd_filename
+                for _, sources in self._get_graph_sources(subsystem, graph_name)
+                for rrd_filename, _ in sources
+            }
+        else:
+            rrd_filenames = {self.rrd_db_dir + "/" + graph_definition["rrd_filename"]}
+
+        return max(
+            (
+                int(rrdtool.last(self.rrdcached_args, rrd_filename))
+                for rrd_filename in rrd_filenames
+            ),
+            default=0,
+        )
 
-        # memory graph filename mappings
-        memory_swap_graph_filename = {}
+    def render_graph_image(self, subsystem, graph_name):
+        """
+        render one RRD graph in memory and return the image
+        """
+        return rrdtool.graphv("-", self._get_graph_args(subsystem, graph_name))["image"]
 
-        # plot memory graphs
-        memory = collections.OrderedDict()
-        memory = {
-            "memory_total": {
-                "color": "#00FF7F",
-                "legend": "Total Memory",
-                "style": "AREA",
-            },
-            "memory_free": {
-                "color": "#800080",
-                "legend": "Free Memory",
-                "style": "LINE1",
-            },
-            "memory_avail": {
-                "color": "#FF0000",
-                "legend": "Available Memory",
-                "style": "LINE1",
-            },
-            "buffer": {
-                "color": "#FF00FF",
-                "legend": "Buffer",
-                "style": "LINE1",
-            },
-            "cache": {
-                "color": "#0000FF",
-                "legend": "Cache",
-                "style": "LINE1",
-            },
-            "page_tables": {
-                "color": "#CE7E00",
-                "legend": "Page Tables",
-                "style": "LINE1",
-            },
-        }
+    def _get_render_job(self, subsystem, graph_name):
+        """
+        get render job of a graph - (graph filename, render filename, rrdtool graph arguments)
 
-        # set up graph attributes
-        memory_graph_title = "Memory Usage (kB)"
-        memory_graph_vertical_label = "kB"
-        memory_graph_filename = self.rrd_graph_dir + f"/memory-memory.{self.uuid}.png"
-        memory_graph_commands = []
-        for metric, meta in memory.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            memory_graph_commands.append(f"DEF:{metric}={rrd_filename}:{metric}:LAST")
-            memory_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            memory_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %12.1lf")
-            memory_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %12.1lf")
-            memory_graph_commands.append(f"GPRINT:{metric}:LAST:last\: %12.1lf \j")
-
-        # generate graph
-        rrdtool.graph(
-            memory_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            memory_graph_title,
-            "--vertical-label",
-            memory_graph_vertical_label,
-            memory_graph_commands,
+        graph filename is None if the graph is optional and RRD databases are not
+        bootstrapped. render filename is None if the graph is reused from render cache
+        """
+        graph_definition = graph_definitions[subsystem][graph_name]
+        graph_filename = (
+            self.rrd_graph_dir
+            + f"/{graph_definition['graph_filename']}.{self.uuid}.png"
         )
 
-        # plot swap graph
-        swap = collections.OrderedDict()
-        swap = {
-            "swap_total": {
-                "color": "#00FF7F",
-                "legend": "Total Swap",
-                "style": "AREA",
-            },
-            "swap_free": {
-                "color": "#800080",
-                "legend": "Free Swap",
-                "style": "LINE1",
-            },
-        }
+        # skip the graph if RRD databases are not bootstrapped
+        if not self.is_bootstrapped(subsystem, graph_name):
+            return None, None, None
 
-        # set up graph attributes
-        swap_graph_title = "Swap Usage (kB)"
-        swap_graph_vertical_label = "kB"
-        swap_graph_filename = self.rrd_graph_dir + f"/memory-swap.{self.uuid}.png"
-        swap_graph_commands = []
-        for metric, meta in swap.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            swap_graph_commands.append(f"DEF:{metric}={rrd_filename}:{metric}:LAST")
-            swap_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            swap_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %12.1lf")
-            swap_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %12.1lf")
-            swap_graph_commands.append(f"GPRINT:{metric}:LAST:last\: %12.1lf \j")
-
-        # generate graph
-        rrdtool.graph(
-            swap_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            swap_graph_title,
-            "--vertical-label",
-            swap_graph_vertical_label,
-            swap_graph_commands,
-        )
+        # reuse the cached graph
+        if self.render_cache is not None and self.render_cache.lookup(graph_filename):
+            return graph_filename, None, None
 
-        # plot virtual memory graph
-        virtual = collections.OrderedDict()
-        virtual = {
-            "minor_page_faults": {
-                "color": "#FF0000",
-                "legend": "Minor Page Faults",
-                "style": "LINE1",
-            },
-            "major_page_faults": {
-                "color": "#00FF00",
-                "legend": "Major Page Faults",
-                "style": "LINE1",
-            },
-        }
+        # cached graph is rendered into a temporary file and renamed, so it's never read
+        # while it's being written
+        render_filename = graph_filename
+        if self.render_cache is not None:
+            render_filename = (
+                f"{graph_filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
 
-        # set up graph attributes
-        virtual_graph_title = "Page Faults (per second)"
-        virtual_graph_vertical_label = "count/second"
-        virtual_graph_filename = self.rrd_graph_dir + f"/memory-virtual.{self.uuid}.png"
-        virtual_graph_commands = []
-        for metric, meta in virtual.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            virtual_graph_commands.append(f"DEF:{metric}={rrd_filename}:{metric}:LAST")
-            virtual_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            virtual_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %12.1lf")
-            virtual_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %12.1lf")
-            virtual_graph_commands.append(f"GPRINT:{metric}:LAST:last\: %12.1lf \j")
-
-        # generate graph
-        rrdtool.graph(
-            virtual_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            virtual_graph_title,
-            "--vertical-label",
-            virtual_graph_vertical_label,
-            virtual_graph_commands,
+        return (
+            graph_filename,
+            render_filename,
+            self._get_graph_args(subsystem, graph_name),
         )
 
-        # populate graph filenames
-        memory_swap_graph_filename["memory"] = os.path.basename(memory_graph_filename)
-        memory_swap_graph_filename["swap"] = os.path.basename(swap_graph_filename)
-        memory_swap_graph_filename["virtual"] = os.path.basename(virtual_graph_filename)
-
-        return memory_swap_graph_filename
-
-    def plot_os_graph(self):
+    def _plot(self, graphs):
         """
-        plot OS RRD graphs
+        plot RRD graphs and return graph filename mappings - {(subsystem, graph name): graph filename}
+
+        graphs are rendered concurrently in the render pool if it's set, otherwise
+        graphs are rendered one after another
         """
-        # set up RRD DB filename
-        rrd_filename = self.rrd_db_dir + "/os.rrd"
+        graph_filenames = {}
+        render_jobs = {}
 
-        # OS graph filename mappings
-        os_graph_filename = {}
+        for graph in graphs:
+            graph_filename, render_filename, graph_args = self._get_render_job(*graph)
+            graph_filenames[graph] = (
+                os.path.basename(graph_filename) if graph_filename else None
+            )
+            if render_filename:
+                render_jobs[graph] = (graph_filename, render_filename, graph_args)
+
+        # graph rendering errors are raised once all graphs are rendered
+        render_errors = []
+        if self.render_pool is not None and len(render_jobs) > 1:
+            futures = {
+                graph: self.render_pool.submit(
+                    render_graph, render_filename, graph_args
+                )
+                for graph, (_, render_filename, graph_args) in render_jobs.items()
+            }
+            concurrent.futures.wait(futures.values())
+            for graph, future in futures.items():
+                if future.exception() is not None:
+                    render_errors.append(future.exception())
+                    del render_jobs[graph]
+        else:
+            for graph, (_, render_filename, graph_args) in list(render_jobs.items()):
+                try:
+                    render_graph(render_filename, graph_args)
+                except Exception as e:
+                    render_errors.append(e)
+                    del render_jobs[graph]
 
-        # plot loadavg graph
-        loadavg = collections.OrderedDict()
-        loadavg = {
-            "loadavg_1min": {
-                "color": "#FF0000",
-                "legend": "LoadAvg 1min",
-                "style": "LINE1",
-            },
-            "loadavg_5min": {
-                "color": "#00FF00",
-                "legend": "LoadAvg 5min",
-                "style": "LINE1",
-            },
-            "loadavg_15min": {
-                "color": "#0000FF",
-                "legend": "LoadAvg 15min",
-                "style": "LINE1",
-            },
-        }
+        if self.render_cache is not None:
+            for graph_filename, render_filename, _ in render_jobs.values():
+                os.replace(render_filename, graph_filename)
+                self.render_cache.add(graph_filename)
 
-        # set up graph attributes
-        loadavg_graph_title = "Load Average 1min/5min/15min"
-        loadavg_graph_filename = self.rrd_graph_dir + f"/os-loadavg.{self.uuid}.png"
-        loadavg_graph_commands = []
-        for metric, meta in loadavg.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            loadavg_graph_commands.append(f"DEF:{metric}={rrd_filename}:{metric}:LAST")
-            loadavg_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            loadavg_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %6.2lf")
-            loadavg_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %6.2lf")
-            loadavg_graph_commands.append(f"GPRINT:{metric}:LAST:last\: %6.2lf \j")
-
-        # generate graph
-        rrdtool.graph(
-            loadavg_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "-X",
-            str(0),
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            loadavg_graph_title,
-            loadavg_graph_commands,
-        )
+        if render_errors:
+            raise render_errors[0]
 
-        # plot fd graph
-        fd = collections.OrderedDict()
-        fd = {
-            "num_used_fd": {
-                "color": "#FF0000",
-                "legend": "Number of Used FDs",
-                "style": "LINE1",
-            },
-        }
+        return graph_filenames
 
-        # set up graph attributes
-        fd_graph_title = "File Descriptors Usage"
-        fd_graph_vertical_label = "count"
-        fd_graph_filename = self.rrd_graph_dir + f"/os-fd.{self.uuid}.png"
-        fd_graph_commands = []
-        for metric, meta in fd.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            fd_graph_commands.append(f"DEF:{metric}={rrd_filename}:{metric}:LAST")
-            fd_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            fd_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %20.1lf")
-            fd_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %20.1lf")
-            fd_graph_commands.append(f"GPRINT:{metric}:LAST:last\: %20.1lf \j")
-
-        # generate graph
-        rrdtool.graph(
-            fd_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            fd_graph_title,
-            "--vertical-label",
-            fd_graph_vertical_label,
-            fd_graph_commands,
-        )
+    def plot_graph(self, subsystem, graph_name):
+        """
+        plot one RRD graph from graph definitions and return graph filename
 
-        # plot procs graph
-        procs = collections.OrderedDict()
-        procs = {
-            "num_total_procs": {
-                "color": "#FF0000",
-                "legend": "Number of Total Processes",
-                "style": "LINE1",
-            },
-            "num_running_procs": {
-                "color": "#00FF00",
-                "legend": "Number of Running Processes",
-                "style": "LINE1",
-            },
-            "num_blocked_procs": {
-                "color": "#0000FF",
-                "legend": "Number of Blocked Processes",
-                "style": "LINE1",
-            },
-            "num_zombie_procs": {
-                "color": "#FF00FF",
-                "legend": "Number of Zombie Processes",
-                "style": "LINE1",
-            },
-        }
+        None is returned if the graph is optional and RRD databases are not bootstrapped
+        """
+        return self._plot([(subsystem, graph_name)])[(subsystem, graph_name)]
 
-        # set up graph attributes
-        procs_graph_title = "Processes States"
-        procs_graph_vertical_count = "count"
-        procs_graph_filename = self.rrd_graph_dir + f"/os-procs.{self.uuid}.png"
-        procs_graph_commands = []
-        for metric, meta in procs.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            procs_graph_commands.append(f"DEF:{metric}={rrd_filename}:{metric}:LAST")
-            procs_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            procs_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %20.1lf")
-            procs_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %20.1lf")
-            procs_graph_commands.append(f"GPRINT:{metric}:LAST:last\: %20.1lf \j")
-
-        # generate graph
-        rrdtool.graph(
-            procs_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            procs_graph_title,
-            "--vertical-label",
-            procs_graph_vertical_count,
-            procs_graph_commands,
+    def plot_graphs(self, subsystem):
+        """
+        plot all RRD graphs of a subsystem and return graph filename mappings
+        """
+        return self.plot_all_graphs([subsystem])[subsystem]
+
+    def plot_all_graphs(self, subsystems):
+        """
+        plot all RRD graphs of subsystems and return graph filename mappings - {subsystem: {graph name: graph filename}}
+
+        graphs of all subsystems are rendered in one batch, so the render pool is used
+        across subsystems
+        """
+        graph_filenames = self._plot(
+            [
+                (subsystem, graph_name)
+                for subsystem in subsystems
+                for graph_name in graph_definitions[subsystem]
+            ]
         )
 
-        # plot context_switch graph
-        context_switch = collections.OrderedDict()
-        context_switch = {
-            "num_context_switch": {
-                "color": "#FF0000",
-                "legend": "Number of Context Switches",
-                "style": "LINE1",
-            },
+        return {
+            subsystem: {
+                graph_name: graph_filenames[(subsystem, graph_name)]
+                for graph_name in graph_definitions[subsystem]
+            }
+            for subsystem in subsystems
         }
 
-        # set up graph attributes
-        context_switch_graph_title = "Context Switches States (per second)"
-        context_switch_graph_vertical_label = "count/second"
-        context_switch_graph_filename = (
-            self.rrd_graph_dir + f"/os-context_switch.{self.uuid}.png"
-        )
-        context_switch_graph_commands = []
-        for metric, meta in context_switch.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            context_switch_graph_commands.append(
-                f"DEF:{metric}={rrd_filename}:{metric}:LAST"
-            )
-            context_switch_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            context_switch_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %12.1lf")
-            context_switch_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %12.1lf")
-            context_switch_graph_commands.append(
-                f"GPRINT:{metric}:LAST:last\: %12.1lf \j"
-            )
+    def plot_cpu_graph(self):
+        """
+        plot CPU RRD graphs
+        """
+        return self.plot_graphs("cpu")
 
-        # generate graph
-        rrdtool.graph(
-            context_switch_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            context_switch_graph_title,
-            "--vertical-label",
-            context_switch_graph_vertical_label,
-            context_switch_graph_commands,
-        )
+    def plot_disk_graph(self):
+        """
+        plot disk RRD graphs
+        """
+        return self.plot_graphs("disk")
 
-        # populate graph filenames
-        os_graph_filename["loadavg"] = os.path.basename(loadavg_graph_filename)
-        os_graph_filename["fd"] = os.path.basename(fd_graph_filename)
-        os_graph_filename["procs"] = os.path.basename(procs_graph_filename)
-        os_graph_filename["context_switch"] = os.path.basename(
-            context_switch_graph_filename
-        )
+    def plot_memory_graph(self):
+        """
+        plot memory RRD graphs
+        """
+        return self.plot_graphs("memory")
 
-        return os_graph_filename
+    def plot_os_graph(self):
+        """
+        plot OS RRD graphs
+        """
+        return self.plot_graphs("os")
 
     def plot_network_graph(self):
         """
         plot network RRD graphs
         """
-        # network graph filename mappings
-        network_graph_filename = {}
-
-        # set up graph attributes
-        network_metric_mappings = {
-            "rx_bytes": {
-                "rrd_filename": self.rrd_db_dir + "/network-rx_bytes.rrd",
-                "graph_title": "Number of Good Received Bytes (per second)",
-                "graph_vertical_label": "byte/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/network-rx_bytes.{self.uuid}.png",
-            },
-            "rx_errors": {
-                "rrd_filename": self.rrd_db_dir + "/network-rx_errors.rrd",
-                "graph_title": "Number of Bad Packets Received (per second)",
-                "graph_vertical_label": "packet/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/network-rx_errors.{self.uuid}.png",
-            },
-            "rx_dropped": {
-                "rrd_filename": self.rrd_db_dir + "/network-rx_dropped.rrd",
-                "graph_title": "Number of Packets Received But Dropped (per second)",
-                "graph_vertical_label": "packet/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/network-rx_dropped.{self.uuid}.png",
-            },
-            "tx_bytes": {
-                "rrd_filename": self.rrd_db_dir + "/network-tx_bytes.rrd",
-                "graph_title": "Number of Good Transmitted Bytes (per second)",
-                "graph_vertical_label": "byte/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/network-tx_bytes.{self.uuid}.png",
-            },
-            "tx_errors": {
-                "rrd_filename": self.rrd_db_dir + "/network-tx_errors.rrd",
-                "graph_title": "Number of Bad Packets Transmitted (per second)",
-                "graph_vertical_label": "packet/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/network-tx_errors.{self.uuid}.png",
-            },
-            "tx_dropped": {
-                "rrd_filename": self.rrd_db_dir + "/network-tx_dropped.rrd",
-                "graph_title": "Number of Packets Dropped In Transmission (per second)",
-                "graph_vertical_label": "packet/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/network-tx_dropped.{self.uuid}.png",
-            },
-            "collisions": {
-                "rrd_filename": self.rrd_db_dir + "/network-collisions.rrd",
-                "graph_title": "Number of Collisions (per second)",
-                "graph_vertical_label": "count/second",
-                "graph_filename": self.rrd_graph_dir
-                + f"/network-collisions.{self.uuid}.png",
-            },
-        }
-
-        for metric, graph_meta in network_metric_mappings.items():
-            # metric mapping variables
-            rrd_filename = graph_meta["rrd_filename"]
-            graph_title = graph_meta["graph_title"]
-            graph_vertical_label = graph_meta["graph_vertical_label"]
-            graph_filename = graph_meta["graph_filename"]
-
-            # get network interface names
-            interfaces = utils.get_rrd_ds(rrd_filename)
-
-            # get color plate list
-            interface_color_plate = utils.rotate_color_plate(
-                interfaces, self.color_plate
-            )
-
-            # plot network graphs
-            network = collections.OrderedDict()
-            for count in range(len(interfaces)):
-                interface = interfaces[count]
-                network[interface] = {
-                    "color": interface_color_plate[count],
-                    "legend": interface,
-                    "style": "LINE1",
-                }
-
-            # network graph variables
-            network_graph_commands = []
-            for interface, meta in network.items():
-                color = meta["color"]
-                legend = meta["legend"]
-                style = meta["style"]
-                network_graph_commands.append(
-                    f"DEF:{interface}={rrd_filename}:{interface}:LAST"
-                )
-                network_graph_commands.append(f"{style}:{interface}{color}:{legend}")
-                network_graph_commands.append(f"GPRINT:{interface}:MAX:max\: %10.1lf")
-                network_graph_commands.append(f"GPRINT:{interface}:MIN:min\: %10.1lf")
-                network_graph_commands.append(
-                    f"GPRINT:{interface}:LAST:last\: %10.1lf \j"
-                )
-
-            # generate graph
-            rrdtool.graph(
-                graph_filename,
-                "-a",
-                self.rrd_graph_format,
-                "--width",
-                str(self.size[0]),
-                "--height",
-                str(self.size[1]),
-                "--end",
-                str(self.end),
-                "--start",
-                str(self.start),
-                "--title",
-                graph_title,
-                "--vertical-label",
-                graph_vertical_label,
-                network_graph_commands,
-            )
-
-            # populate graph filenames
-            network_graph_filename[metric] = os.path.basename(graph_filename)
-
-        return network_graph_filename
+        return self.plot_graphs("network")
 
     def plot_tcp_graph(self):
         """
         plot TCP RRD graphs
         """
-        #  graph filename mappings
-        tcp_graph_filename = {}
-
-        # set up graph attributes
-        tcp_metric_mappings = {
-            "tcp": {
-                "rrd_filename": self.rrd_db_dir + "/tcp.rrd",
-                "graph_title": "IPv4 TCP Connection States (count)",
-                "graph_vertical_label": "count",
-                "graph_filename": self.rrd_graph_dir + f"/tcp.{self.uuid}.png",
-            },
-            "tcp6": {
-                "rrd_filename": self.rrd_db_dir + "/tcp6.rrd",
-                "graph_title": "IPv6 TCP Connection States (count)",
-                "graph_vertical_label": "count",
-                "graph_filename": self.rrd_graph_dir + f"/tcp6.{self.uuid}.png",
-            },
-        }
-
-        for metric, graph_meta in tcp_metric_mappings.items():
-            # metric mapping variables
-            rrd_filename = graph_meta["rrd_filename"]
-            graph_title = graph_meta["graph_title"]
-            graph_vertical_label = graph_meta["graph_vertical_label"]
-            graph_filename = graph_meta["graph_filename"]
-
-            # set up socket states
-            states = [
-                "ESTABLISHED",
-                "SYN_SENT",
-                "SYN_RECV",
-                "FIN_WAIT1",
-                "FIN_WAIT2",
-                "TIME_WAIT",
-                "CLOSE",
-                "CLOSE_WAIT",
-                "LAST_ACK",
-                "LISTEN",
-                "CLOSING",
-                "NEW_SYN_RECV",
-            ]
-
-            # get color plate list
-            state_color_plate = utils.rotate_color_plate(states, self.color_plate)
-
-            # plot TCP graphs
-            tcp = collections.OrderedDict()
-            for count in range(len(states)):
-                state = states[count]
-                tcp[state] = {
-                    "color": state_color_plate[count],
-                    "legend": state,
-                    "style": "LINE1",
-                }
-
-            # TCP graph variables
-            tcp_graph_commands = []
-            for state, meta in tcp.items():
-                color = meta["color"]
-                legend = meta["legend"]
-                style = meta["style"]
-                tcp_graph_commands.append(f"DEF:{state}={rrd_filename}:{state}:LAST")
-                tcp_graph_commands.append(f"{style}:{state}{color}:{legend}")
-                tcp_graph_commands.append(f"GPRINT:{state}:MAX:max\: %8.1lf")
-                tcp_graph_commands.append(f"GPRINT:{state}:MIN:min\: %8.1lf")
-                tcp_graph_commands.append(f"GPRINT:{state}:LAST:last\: %8.1lf \j")
-
-            # generate graph
-            rrdtool.graph(
-                graph_filename,
-                "-a",
-                self.rrd_graph_format,
-                "--width",
-                str(self.size[0]),
-                "--height",
-                str(self.size[1]),
-                "--end",
-                str(self.end),
-                "--start",
-                str(self.start),
-                "--title",
-                graph_title,
-                "--vertical-label",
-                graph_vertical_label,
-                tcp_graph_commands,
-            )
-
-            # populate graph filenames
-            tcp_graph_filename[metric] = os.path.basename(graph_filename)
-
-        return tcp_graph_filename
+        return self.plot_graphs("tcp")
 
     def plot_udp_graph(self):
         """
         plot UDP graphs
         """
-        # set up RRD DB filename
-        rrd_filename = self.rrd_db_dir + "/udp.rrd"
-
-        #  graph filename mappings
-        udp_graph_filename_dict = {}
-
-        # plot UDP graph
-        udp = collections.OrderedDict()
-        udp = {
-            "InDatagrams": {
-                "color": "#FF0000",
-                "legend": "In Datagrams",
-                "style": "LINE1",
-            },
-            "OutDatagrams": {
-                "color": "#00FF00",
-                "legend": "Out Datagrams",
-                "style": "LINE1",
-            },
-            "InErrors": {
-                "color": "#0000FF",
-                "legend": "In Errors",
-                "style": "LINE1",
-            },
-            "NoPorts": {
-                "color": "#FF00FF",
-                "legend": "No Ports",
-                "style": "LINE1",
-            },
-        }
-
-        # set up graph attributes
-        udp_graph_title = "UDP Datagrams States (per second)"
-        udp_graph_vertical_count = "datagram/second"
-        udp_graph_filename = self.rrd_graph_dir + f"/udp.{self.uuid}.png"
-        udp_graph_commands = []
-        for metric, meta in udp.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            udp_graph_commands.append(f"DEF:{metric}={rrd_filename}:{metric}:LAST")
-            udp_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            udp_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %8.2lf")
-            udp_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %8.2lf")
-            udp_graph_commands.append(f"GPRINT:{metric}:LAST:last\: %8.2lf \j")
-
-        # generate graph
-        rrdtool.graph(
-            udp_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            udp_graph_title,
-            "--vertical-label",
-            udp_graph_vertical_count,
-            udp_graph_commands,
-        )
-
-        # populate graph filenames
-        udp_graph_filename_dict["udp"] = os.path.basename(udp_graph_filename)
-
-        return udp_graph_filename_dict
+        return self.plot_graphs("udp")
 
     def plot_arp_graph(self):
         """
         plot ARP graphs
         """
-        # set up RRD DB filename
-        rrd_filename = self.rrd_db_dir + "/arp.rrd"
-
-        #  graph filename mappings
-        arp_graph_filename_dict = {}
-
-        # plot ARP graph
-        arp = collections.OrderedDict()
-        arp = {
-            "arp_cache_entries": {
-                "color": "#FF0000",
-                "legend": "ARP Cache Entries",
-                "style": "LINE1",
-            },
-        }
-
-        # set up graph attributes
-        arp_graph_title = "ARP Cache Entries (count)"
-        arp_graph_vertical_count = "count"
-        arp_graph_filename = self.rrd_graph_dir + f"/arp.{self.uuid}.png"
-        arp_graph_commands = []
-        for metric, meta in arp.items():
-            color = meta["color"]
-            legend = meta["legend"]
-            style = meta["style"]
-            arp_graph_commands.append(f"DEF:{metric}={rrd_filename}:{metric}:LAST")
-            arp_graph_commands.append(f"{style}:{metric}{color}:{legend}")
-            arp_graph_commands.append(f"GPRINT:{metric}:MAX:max\: %8.2lf")
-            arp_graph_commands.append(f"GPRINT:{metric}:MIN:min\: %8.2lf")
-            arp_graph_commands.append(f"GPRINT:{metric}:LAST:last\: %8.2lf \j")
-
-        # generate graph
-        rrdtool.graph(
-            arp_graph_filename,
-            "-a",
-            self.rrd_graph_format,
-            "--width",
-            str(self.size[0]),
-            "--height",
-            str(self.size[1]),
-            "--end",
-            str(self.end),
-            "--start",
-            str(self.start),
-            "--title",
-            arp_graph_title,
-            "--vertical-label",
-            arp_graph_vertical_count,
-            arp_graph_commands,
-        )
+        return self.plot_graphs("arp")
 
-        # populate graph filenames
-        arp_graph_filename_dict["arp"] = os.path.basename(arp_graph_filename)
+    def plot_sockstat_graph(self):
+        """
+        plot socket summary graphs
+        """
+        return self.plot_graphs("sockstat")
 
-        return arp_graph_filename_dict
+    def plot_hms_graph(self):
+        """
+        plot poller self metrics graphs
+        """
+        return self.plot_graphs("hms")
@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
+from . import procfs
+
 
 class Memory:
-    def __init__(self):
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
         self.memory = self._get_memory()
         self.virtual_memory = self._get_virtual_memory()
 
@@ -23,27 +26,21 @@ class Memory:
         }
 
         memory_metrics_mapping = {
-            "memory_total": "MemTotal",
-            "memory_free": "MemFree",
-            "memory_avail": "MemAvailable",
-            "buffer": "Buffer",
-            "cache": "Cached",
-            "swap_total": "SwapTotal",
-            "swap_free": "SwapFree",
-            "page_tables": "PageTables",
+            "memory_total": b"MemTotal",
+            "memory_free": b"MemFree",
+            "memory_avail": b"MemAvailable",
+            "buffer": b"Buffer",
+            "cache": b"Cached",
+            "swap_total": b"SwapTotal",
+            "swap_free": b"SwapFree",
+            "page_tables": b"PageTables",
         }
 
-        try:
-            with open("/proc/meminfo", "rt") as f:
-                memory_lines = f.readlines()
-        except:
-            pass
-        else:
-            for line in memory_lines:
-                for metric, entry in memory_metrics_mapping.items():
-                    if line.startswith(entry):
-                        memory[metric] = line.strip().split()[1]
-                        break
+        for line in self.snapshot.readlines("/proc/meminfo"):
+            for metric, entry in memory_metrics_mapping.items():
+                if line.startswith(entry):
+                    memory[metric] = line.split()[1].decode()
+                    break
 
         return memory
 
@@ -58,20 +55,16 @@ class Memory:
         }
 
         virtual_memory_metrics_mapping = {
-            "major_page_faults": "pgmajfault",
-            "total_page_faults": "pgfault",
+            "major_page_faults": b"pgmajfault",
+            "total_page_faults": b"pgfault",
         }
 
-        try:
-            with open("/proc/vmstat", "rt") as f:
-                memory_lines = f.readlines()
-        except:
-            pass
-        else:
+        memory_lines = self.snapshot.readlines("/proc/vmstat")
+        if memory_lines:
             for line in memory_lines:
                 for metric, entry in virtual_memory_metrics_mapping.items():
                     if line.startswith(entry):
-                        virtual_memory[metric] = line.strip().split()[1]
+                        virtual_memory[metric] = line.split()[1].decode()
                         break
 
             # calculate minor_page_faults
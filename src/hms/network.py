@@ -1,11 +1,33 @@
 #!/usr/bin/env python3
 
+from . import procfs
 from . import utils
 
+# ref.: https://docs.kernel.org/networking/statistics.html
+# format: [metric name: column index after interface name in /proc/net/dev]
+# rx_dropped in /proc/net/dev also includes rx_missed_errors
+net_dev_fields = {
+    "rx_bytes": 0,
+    "rx_errors": 2,
+    "rx_dropped": 3,
+    "tx_bytes": 8,
+    "tx_errors": 10,
+    "tx_dropped": 11,
+    "collisions": 13,
+}
+
 
 class Network:
-    def __init__(self):
-        self.interfaces = utils.get_network_interfaces()
+    def __init__(self, snapshot=None, backend="sysfs"):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
+        self.backend = backend
+
+        if self.backend == "procfs":
+            self.net_dev = self._read_net_dev()
+            self.interfaces = list(self.net_dev)
+        else:
+            self.interfaces = utils.get_network_interfaces()
+
         self.network = self._get_network()
 
     def _read_stats(self, interface, metric):
@@ -14,16 +36,28 @@ class Network:
         """
         value = None
 
-        try:
-            with open(f"/sys/class/net/{interface}/statistics/{metric}", "rt") as f:
-                metric_lines = f.readlines()
-        except:
-            pass
-        else:
-            value = metric_lines[0].strip()
+        metric_lines = self.snapshot.readlines(
+            f"/sys/class/net/{interface}/statistics/{metric}"
+        )
+        if metric_lines:
+            value = metric_lines[0].strip().decode()
 
         return value
 
+    def _read_net_dev(self):
+        """
+        read stats values of all network interfaces from /proc/net/dev in one read
+        format: {interface: [stats values]}
+        """
+        net_dev = {}
+
+        # skip 2 header lines
+        for line in self.snapshot.readlines("/proc/net/dev")[2:]:
+            interface, _, values = line.decode().partition(":")
+            net_dev[interface.strip()] = values.split()
+
+        return net_dev
+
     def _get_network(self):
         """
         get network interfaces stats data
@@ -45,6 +79,11 @@ class Network:
                 if metric not in network:
                     network[metric] = {}
 
-                network[metric][interface] = self._read_stats(interface, metric)
+                if self.backend == "procfs":
+                    network[metric][interface] = self.net_dev[interface][
+                        net_dev_fields[metric]
+                    ]
+                else:
+                    network[metric][interface] = self._read_stats(interface, metric)
 
         return network
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 
-import glob
-import subprocess
+import os
+from . import procfs
 
 
 class OS:
-    def __init__(self):
+    def __init__(self, snapshot=None, scan_procs=True):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
+        # process table scan is skipped by high frequency sampling
+        self.scan_procs = scan_procs
         self.loadavg = self._get_loadavg()
         self.fd = self._get_fd()
         self.procs = self._get_procs()
@@ -21,16 +24,12 @@ class OS:
             "loadavg_15min": None,
         }
 
-        try:
-            with open("/proc/loadavg", "rt") as f:
-                loadavg_lines = f.readlines()
-        except:
-            pass
-        else:
-            loadavg_values = loadavg_lines[0].strip().split()
-            loadavg["loadavg_1min"] = loadavg_values[0]
-            loadavg["loadavg_5min"] = loadavg_values[1]
-            loadavg["loadavg_15min"] = loadavg_values[2]
+        loadavg_lines = self.snapshot.readlines("/proc/loadavg")
+        if loadavg_lines:
+            loadavg_values = loadavg_lines[0].split()
+            loadavg["loadavg_1min"] = loadavg_values[0].decode()
+            loadavg["loadavg_5min"] = loadavg_values[1].decode()
+            loadavg["loadavg_15min"] = loadavg_values[2].decode()
 
         return loadavg
 
@@ -42,62 +41,113 @@ class OS:
             "num_used_fd": None,
         }
 
-        try:
-            with open("/proc/sys/fs/file-nr", "rt") as f:
-                fd_lines = f.readlines()
-        except:
-            pass
-        else:
-            fd_values = fd_lines[0].strip().split()
-            fd["num_used_fd"] = fd_values[0]
+        fd_lines = self.snapshot.readlines("/proc/sys/fs/file-nr")
+        if fd_lines:
+            fd_values = fd_lines[0].split()
+            fd["num_used_fd"] = fd_values[0].decode()
 
         return fd
 
+    def _scan_procs(self):
+        """
+        scan process table and count processes by state
+
+        the state is the field after the command name in /proc/<pid>/stat, states other
+        than running, blocked and zombie (e.g. sleeping, stopped or idle) are counted as
+        other. processes exited during the scan are skipped.
+        """
+        procs_states = {
+            "total": 0,
+            "running": 0,
+            "blocked": 0,
+            "zombie": 0,
+            "other": 0,
+        }
+
+        try:
+            entries = os.scandir(procfs.get_path("/proc"))
+        except:
+            return None
+
+        with entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+
+                try:
+                    fd = os.open(
+                        procfs.get_path(f"/proc/{entry.name}/stat"), os.O_RDONLY
+                    )
+                    try:
+                        stat = os.read(fd, 512)
+                    finally:
+                        os.close(fd)
+                except OSError:
+                    continue
+
+                self.snapshot.account(len(stat), opened=True)
+
+                # command name may contain spaces and brackets, so locate the last one
+                state_index = stat.rfind(b")") + 2
+                state = stat[state_index : state_index + 1]
+
+                procs_states["total"] += 1
+                if state == b"R":
+                    procs_states["running"] += 1
+                elif state == b"D":
+                    procs_states["blocked"] += 1
+                elif state == b"Z":
+                    procs_states["zombie"] += 1
+                else:
+                    procs_states["other"] += 1
+
+        return procs_states
+
     def _get_procs(self):
         """
         get processes running state
+
+        total, zombie and other processes are counted by the process table scan. running
+        and blocked tasks are read from /proc/stat. if the process table is not scanned,
+        total and running tasks are read from /proc/loadavg, where the total counts
+        threads instead of processes.
         """
         procs = {
             "num_total_procs": None,
             "num_running_procs": None,
             "num_blocked_procs": None,
             "num_zombie_procs": None,
+            "num_other_procs": None,
         }
 
-        # get total number of processes
-        procs["num_total_procs"] = len(glob.glob("/proc/[0-9]*"))
-
-        try:
-            with open("/proc/stat", "rt") as f:
-                procs_lines = f.readlines()
-        except:
-            pass
-        else:
-            for line in procs_lines:
-                if line.startswith("procs_running"):
-                    procs["num_running_procs"] = line.strip().split()[1]
-                if line.startswith("procs_blocked"):
-                    procs["num_blocked_procs"] = line.strip().split()[1]
-
-        # use ps command to get number of zombie processes
-        try:
-            ps_run = subprocess.run(
-                ["ps", "-eo", "state", "--no-headers"], capture_output=True
-            )
-        except:
-            pass
-        else:
-            if ps_run.returncode == 0:
-                zombie_count = 0
-
-                ps_run_lines = ps_run.stdout.decode().split("\n")
-                for line in ps_run_lines:
-                    if line.startswith("Z"):
-                        zombie_count += 1
-
-                procs["num_zombie_procs"] = str(zombie_count)
-            else:
-                pass
+        # get number of running and blocked tasks from kernel counters
+        for line in self.snapshot.readlines("/proc/stat"):
+            if line.startswith(b"procs_running"):
+                procs["num_running_procs"] = line.split()[1].decode()
+            if line.startswith(b"procs_blocked"):
+                procs["num_blocked_procs"] = line.split()[1].decode()
+
+        # scan process table to get total, zombie and other processes
+        procs_states = self._scan_procs() if self.scan_procs else None
+        if procs_states is not None:
+            procs["num_total_procs"] = procs_states["total"]
+            procs["num_zombie_procs"] = procs_states["zombie"]
+            procs["num_other_procs"] = procs_states["other"]
+
+            if procs["num_running_procs"] is None:
+                procs["num_running_procs"] = procs_states["running"]
+            if procs["num_blocked_procs"] is None:
+                procs["num_blocked_procs"] = procs_states["blocked"]
+
+            return procs
+
+        # get number of runnable and total tasks (threads) from loadavg
+        loadavg_lines = self.snapshot.readlines("/proc/loadavg")
+        if loadavg_lines:
+            running, total = loadavg_lines[0].split()[3].split(b"/")
+            procs["num_total_procs"] = total.decode()
+            if procs["num_running_procs"] is None:
+                procs["num_running_procs"] = running.decode()
 
         return procs
 
@@ -109,15 +159,9 @@ class OS:
             "num_context_switch": None,
         }
 
-        try:
-            with open("/proc/stat", "rt") as f:
-                context_switch_lines = f.readlines()
-        except:
-            pass
-        else:
-            for line in context_switch_lines:
-                if line.startswith("ctxt"):
-                    context_switch["num_context_switch"] = line.strip().split()[1]
-                    break
+        for line in self.snapshot.readlines("/proc/stat"):
+            if line.startswith(b"ctxt"):
+                context_switch["num_context_switch"] = line.split()[1].decode()
+                break
 
         return context_switch
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+
+# root directories of procfs and sysfs, collectors read files by their paths under
+# /proc and /sys, which are mapped to the root directories, e.g. synthetic fixtures
+proc_root = "/proc"
+sys_root = "/sys"
+
+
+def set_root(proc=None, sys=None):
+    """
+    set root directories of procfs and sysfs, the defaults are /proc and /sys
+    """
+    global proc_root, sys_root
+
+    proc_root = (proc or "/proc").rstrip("/")
+    sys_root = (sys or "/sys").rstrip("/")
+
+
+def get_path(path):
+    """
+    map path under /proc or /sys into the root directories
+    """
+    if path.startswith("/proc/") or path == "/proc":
+        return proc_root + path[5:]
+    if path.startswith("/sys/") or path == "/sys":
+        return sys_root + path[4:]
+
+    return path
+
+
+class FDPool:
+    def __init__(self, buffer_size=4096, max_buffer_size=1048576):
+        self.buffer_size = buffer_size
+        self.max_buffer_size = max_buffer_size
+        self.files_opened = 0
+        self.read_calls = 0
+        self._fds = {}
+        self._buffers = {}
+        self._locks = {}
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def _open(self, path):
+        """
+        get persistent file descriptor and lock of a file - (fd, lock), open the file if
+        it's not opened yet
+        """
+        with self._lock:
+            fd = self._fds.get(path)
+            if fd is None:
+                fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+                self._fds[path] = fd
+                self._locks[path] = threading.Lock()
+                self.files_opened += 1
+
+            self._used.add(path)
+
+            return fd, self._locks[path]
+
+    def read(self, path):
+        """
+        re-read file content from offset 0 with pread into a reusable buffer
+
+        each file has its own preallocated buffer which grows if the content does
+        not fit in. buffers larger than max_buffer_size are not kept between reads.
+        None is returned if the file cannot be read, the file descriptor is closed
+        and dropped in this case, e.g. the device disappeared.
+        """
+        while True:
+            try:
+                fd, path_lock = self._open(path)
+            except OSError:
+                return None
+
+            # the file descriptor and buffer of a file are only used by one thread at a
+            # time, the file is opened again if it was closed before the lock is taken
+            with path_lock:
+                with self._lock:
+                    if self._locks.get(path) is not path_lock:
+                        continue
+
+                buffer = self._buffers.get(path)
+                if buffer is None:
+                    buffer = bytearray(self.buffer_size)
+
+                size = 0
+                try:
+                    while True:
+                        if size == len(buffer):
+                            buffer = buffer + bytearray(len(buffer))
+
+                        count = os.preadv(fd, [memoryview(buffer)[size:]], size)
+                        self.read_calls += 1
+                        size += count
+
+                        # procfs / sysfs fill the whole buffer unless it's the end
+                        if size < len(buffer):
+                            break
+                except OSError:
+                    self._drop(path, path_lock)
+                    return None
+
+                if len(buffer) <= self.max_buffer_size:
+                    self._buffers[path] = buffer
+                else:
+                    self._buffers.pop(path, None)
+
+                return bytes(memoryview(buffer)[:size])
+
+    def _drop(self, path, path_lock):
+        """
+        close and drop the file descriptor and buffer of a file, the lock of the file
+        must be held by the caller
+        """
+        with self._lock:
+            if self._locks.get(path) is not path_lock:
+                return
+            fd = self._fds.pop(path)
+            self._buffers.pop(path, None)
+            self._locks.pop(path)
+            self._used.discard(path)
+
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+    def close(self, path):
+        """
+        close and drop the file descriptor and buffer of a file
+
+        the file descriptor is closed once the read in progress is completed, so its
+        number is never reused by another file during the read
+        """
+        with self._lock:
+            path_lock = self._locks.get(path)
+
+        if path_lock is not None:
+            with path_lock:
+                self._drop(path, path_lock)
+
+    def release_unused(self):
+        """
+        close file descriptors which are not read since the last call
+
+        this should be called once per polling cycle, so descriptors of removed
+        devices are released.
+        """
+        with self._lock:
+            unused_paths = set(self._fds) - self._used
+            self._used = set()
+
+        for path in unused_paths:
+            self.close(path)
+
+    def opened(self):
+        """
+        get number of opened file descriptors in the pool
+        """
+        return len(self._fds)
+
+    def close_all(self):
+        """
+        close all file descriptors
+        """
+        for path in list(self._fds):
+            self.close(path)
+
+
+class Snapshot:
+    def __init__(self, fdpool=None):
+        self.fdpool = fdpool
+        self.files_read = 0
+        # files opened outside of the file descriptor pool
+        self.files_opened = 0
+        self.bytes_read = 0
+        self._contents = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        """
+        read raw content of a procfs / sysfs file
+
+        each file is only read once during the lifetime of the snapshot, the cached
+        content is returned for subsequent reads. None is returned if the file
+        cannot be read. collectors running in multiple threads can share a snapshot.
+        """
+        if path in self._contents:
+            return self._contents[path]
+
+        with self._lock:
+            if path not in self._locks:
+                self._locks[path] = threading.Lock()
+            path_lock = self._locks[path]
+
+        with path_lock:
+            if path not in self._contents:
+                content = None
+
+                if self.fdpool is not None:
+                    content = self.fdpool.read(get_path(path))
+                else:
+                    try:
+                        with open(get_path(path), "rb") as f:
+                            content = f.read()
+                    except:
+                        pass
+
+                if content is not None:
+                    self.account(len(content), opened=self.fdpool is None)
+
+                self._contents[path] = content
+
+        return self._contents[path]
+
+    def account(self, bytes_read, opened=False):
+        """
+        account a file read outside of the snapshot cache
+
+        opened is set if the file is opened for the read instead of using the file
+        descriptor pool, e.g. /proc/<pid>/stat files of short-lived processes
+        """
+        with self._lock:
+            self.files_read += 1
+            self.bytes_read += bytes_read
+            if opened:
+                self.files_opened += 1
+
+    def readlines(self, path):
+        """
+        read procfs / sysfs file content as a list of byte lines
+        """
+        content = self.read(path)
+
+        if content is None:
+            return []
+        else:
+            return content.splitlines()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+# ring buffer layout in native byte order, all arrays are 8-byte aligned
+#
+# header: magic, number of metrics, capacity (samples), sequence, number of samples
+# written, last timestamp, step
+ring_header = struct.Struct("=8sIIQQdI20x")
+# metric table entry: metric name, metric type
+ring_metric = struct.Struct("=56sI4x")
+# sequence offset in the header, it's odd while a sample is being written
+ring_sequence = struct.Struct("=Q")
+ring_sequence_offset = 16
+ring_magic = b"HMSRING1"
+
+# metric types, counter metrics are converted into rates by readers
+metric_types = {
+    "GAUGE": 0,
+    "COUNTER": 1,
+    "DERIVE": 2,
+    "ABSOLUTE": 3,
+}
+
+
+def get_ring_size(num_metrics, capacity):
+    """
+    get ring buffer file size in bytes
+    """
+    return (
+        ring_header.size
+        + ring_metric.size * num_metrics
+        + 8 * capacity
+        + 8 * capacity * num_metrics
+    )
+
+
+class RingBufferWriter:
+    def __init__(self, path, capacity, step):
+        self.path = path
+        self.capacity = capacity
+        self.step = step
+        # metric names and types - {metric name: metric type}
+        self.metrics = {}
+        self.names = []
+        self.ring = None
+        self.writes = 0
+
+    def _create(self, metrics, samples):
+        """
+        create ring buffer file with metrics, existing samples are copied into the new
+        file which replaces the existing one, so readers never map a partial file
+        """
+        names = list(metrics)
+        size = get_ring_size(len(names), self.capacity)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+
+        with open(temp_path, "w+b") as f:
+            f.truncate(size)
+            ring = mmap.mmap(f.fileno(), size)
+
+        ring_header.pack_into(
+            ring, 0, ring_magic, len(names), self.capacity, 0, 0, 0.0, self.step
+        )
+        for count, name in enumerate(names):
+            ring_metric.pack_into(
+                ring,
+                ring_header.size + ring_metric.size * count,
+                name.encode()[:56],
+                metrics[name],
+            )
+
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, self.path)
+
+        if self.ring is not None:
+            self.ring.close()
+        self.ring = ring
+        self.metrics = dict(metrics)
+        self.names = names
+        self.writes = 0
+
+        for timestamp, values in samples:
+            self.write(timestamp, values)
+
+    def _get_samples(self):
+        """
+        get samples in the ring buffer - [(timestamp, {metric name: value})]
+        """
+        if self.ring is None:
+            return []
+
+        timestamps_offset = ring_header.size + ring_metric.size * len(self.names)
+        values_offset = timestamps_offset + 8 * self.capacity
+        row = struct.Struct(f"={len(self.names)}d")
+
+        samples = []
+        for write in range(max(0, self.writes - self.capacity), self.writes):
+            slot = write % self.capacity
+            (timestamp,) = struct.unpack_from(
+                "=d", self.ring, timestamps_offset + 8 * slot
+            )
+            values = row.unpack_from(self.ring, values_offset + row.size * slot)
+            samples.append((timestamp, dict(zip(self.names, values))))
+
+        return samples
+
+    def write(self, timestamp, values, metrics=None):
+        """
+        write one sample of metrics into the ring buffer
+
+        values is {metric name: value}, metrics is {metric name: metric type} of new
+        metrics. the ring buffer file is re-created if there are new metrics
+        """
+        if self.ring is None or (metrics and not metrics.keys() <= self.metrics.keys()):
+            self._create({**self.metrics, **(metrics or {})}, self._get_samples())
+
+        slot = self.writes % self.capacity
+        timestamps_offset = ring_header.size + ring_metric.size * len(self.names)
+        values_offset = (
+            timestamps_offset + 8 * self.capacity + 8 * len(self.names) * slot
+        )
+        row = [values.get(name, math.nan) for name in self.names]
+        (sequence,) = ring_sequence.unpack_from(self.ring, ring_sequence_offset)
+
+        # seqlock, sequence is odd while the sample is being written
+        ring_sequence.pack_into(self.ring, ring_sequence_offset, sequence + 1)
+        struct.pack_into("=d", self.ring, timestamps_offset + 8 * slot, timestamp)
+        struct.pack_into(f"={len(row)}d", self.ring, values_offset, *row)
+        self.writes += 1
+        struct.pack_into("=Qd", self.ring, 24, self.writes, timestamp)
+        ring_sequence.pack_into(self.ring, ring_sequence_offset, sequence + 2)
+
+
+class RingBufferMap:
+    def __init__(self, ring, inode):
+        """
+        read-only mapping of a ring buffer file and its metric table
+
+        mappings are never modified, a replaced file gets a new mapping
+        """
+        self.ring = ring
+        self.inode = inode
+        magic, num_metrics, self.capacity, _, _, _, self.step = ring_header.unpack_from(
+            ring, 0
+        )
+        self.valid = magic == ring_magic
+        self.names = []
+        self.types = []
+
+        if not self.valid:
+            return
+
+        for count in range(num_metrics):
+            name, metric_type = ring_metric.unpack_from(
+                ring, ring_header.size + ring_metric.size * count
+            )
+            self.names.append(name.rstrip(b"\0").decode())
+            self.types.append(metric_type)
+        self.index = {name: count for count, name in enumerate(self.names)}
+
+
+class RingBufferReader:
+    def __init__(self, path, retries=100):
+        self.path = path
+        self.retries = retries
+        # current mapping, readers keep a reference to the mapping they're reading, so
+        # the replaced mapping is unmapped when the last reader drops it
+        self.mapping = None
+        self.lock = threading.Lock()
+
+    @property
+    def names(self):
+        return self.mapping.names if self.mapping is not None else []
+
+    @property
+    def step(self):
+        return self.mapping.step if self.mapping is not None else 0
+
+    def _map(self):
+        """
+        map ring buffer file read-only, it's re-mapped if the file is replaced
+
+        the current mapping is returned, None is returned if the file cannot be mapped
+        """
+        try:
+            inode = os.stat(self.path).st_ino
+        except OSError:
+            return None
+
+        with self.lock:
+            mapping = self.mapping
+            if mapping is not None and mapping.inode == inode:
+                return mapping
+
+            try:
+                with open(self.path, "rb") as f:
+                    ring = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                mapping = RingBufferMap(ring, inode)
+            except (OSError, ValueError, struct.error):
+                return None
+
+            if not mapping.valid:
+                return None
+
+            # the replaced mapping is not closed as other threads may be reading it
+            self.mapping = mapping
+
+            return mapping
+
+    def read(self, names=None, window=None):
+        """
+        read recent samples of metrics - (timestamps, {metric name: values})
+
+        samples within window seconds before the last sample are returned, all samples
+        are returned if window is not set. counter metrics are converted into rates per
+        second, the first sample of counter metrics is unknown (NaN)
+        """
+        mapping = self._map()
+        if mapping is None:
+            return [], {}
+
+        ring = mapping.ring
+        capacity = mapping.capacity
+        names = (
+            mapping.names
+            if names is None
+            else [name for name in names if name in mapping.index]
+        )
+        num_metrics = len(mapping.names)
+        timestamps_offset = ring_header.size + ring_metric.size * num_metrics
+        values_offset = timestamps_offset + 8 * capacity
+
+        for _ in range(self.retries):
+            (sequence,) = ring_sequence.unpack_from(ring, ring_sequence_offset)
+            if sequence & 1:
+                time.sleep(0)
+                continue
+
+            writes, _ = struct.unpack_from("=Qd", ring, 24)
+            slots = [
+                write % capacity for write in range(max(0, writes - capacity), writes)
+            ]
+            timestamps = [
+                struct.unpack_from("=d", ring, timestamps_offset + 8 * slot)[0]
+                for slot in slots
+            ]
+            rows = [
+                struct.unpack_from(
+                    f"={num_metrics}d",
+                    ring,
+                    values_offset + 8 * num_metrics * slot,
+                )
+                for slot in slots
+            ]
+
+            # samples are consistent if no sample is written while they're copied
+            if ring_sequence.unpack_from(ring, ring_sequence_offset)[0] == sequence:
+                break
+        else:
+            return [], {}
+
+        # counter rates of the first sample in the window need the sample before it
+        first = 0
+        if window is not None:
+            while (
+                first < len(timestamps) and timestamps[first] < timestamps[-1] - window
+            ):
+                first += 1
+        rate_first = max(0, first - 1)
+
+        series = {}
+        for name in names:
+            index = mapping.index[name]
+            values = [row[index] for row in rows[rate_first:]]
+            if mapping.types[index] != metric_types["GAUGE"]:
+                values = self._get_rates(
+                    timestamps[rate_first:], values, mapping.types[index]
+                )
+            series[name] = values[first - rate_first :]
+        timestamps = timestamps[first:]
+
+        return timestamps, series
+
+    def _get_rates(self, timestamps, values, metric_type):
+        """
+        convert counter values into rates per second as rrdtool does
+        """
+        rates = [math.nan]
+        for count in range(1, len(values)):
+            interval = timestamps[count] - timestamps[count - 1]
+            if interval <= 0:
+                rates.append(math.nan)
+                continue
+            if metric_type == metric_types["ABSOLUTE"]:
+                rates.append(values[count] / interval)
+                continue
+            rate = (values[count] - values[count - 1]) / interval
+            # counter wraps or resets are unknown
+            if metric_type == metric_types["COUNTER"] and rate < 0:
+                rate = math.nan
+            rates.append(rate)
+
+        return rates
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import socket
+
+
+class RRDCachedError(Exception):
+    pass
+
+
+class RRDCached:
+    def __init__(self, address, timeout=10):
+        self.address = address
+        self.timeout = timeout
+        self.sock = None
+        self.sock_file = None
+
+    def _connect(self):
+        """
+        connect to rrdcached via unix socket (unix:<path> or <path>) or TCP (<host>:<port>)
+        ref.: https://oss.oetiker.ch/rrdtool/doc/rrdcached.en.html
+        """
+        if self.address.startswith("unix:"):
+            family, address = socket.AF_UNIX, self.address[5:]
+        elif self.address.startswith("/"):
+            family, address = socket.AF_UNIX, self.address
+        else:
+            host, _, port = self.address.rpartition(":")
+            family, address = socket.AF_INET, (host, int(port or 42217))
+
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+
+        self.sock = sock
+        self.sock_file = sock.makefile("rwb")
+
+    def close(self):
+        """
+        close connection to rrdcached
+        """
+        if self.sock is not None:
+            try:
+                self.sock_file.close()
+                self.sock.close()
+            except OSError:
+                pass
+
+        self.sock = None
+        self.sock_file = None
+
+    def _read_response(self):
+        """
+        read a response, return status code, message and additional lines
+
+        the first line of a response is "<status> <message>", a positive status is the
+        number of additional lines and a negative status is an error.
+        """
+        line = self.sock_file.readline().decode().rstrip("\n")
+        if not line:
+            raise RRDCachedError("connection closed by rrdcached")
+
+        status, _, message = line.partition(" ")
+        status = int(status)
+
+        lines = []
+        for _ in range(max(status, 0)):
+            lines.append(self.sock_file.readline().decode().rstrip("\n"))
+
+        return status, message, lines
+
+    def _command(self, command):
+        """
+        send a command and return the response, reconnect once if the connection is broken
+        """
+        for attempt in range(2):
+            try:
+                if self.sock is None:
+                    self._connect()
+
+                self.sock_file.write(command.encode() + b"\n")
+                self.sock_file.flush()
+
+                return self._read_response()
+            except (OSError, RRDCachedError):
+                self.close()
+                if attempt == 1:
+                    raise
+
+    def update(self, updates):
+        """
+        send updates in one batch, updates is a list of (RRD filename, values string)
+
+        return a list of (RRD filename, error message) of failed updates
+        """
+        if not updates:
+            return []
+
+        status, message, _ = self._command("BATCH")
+        if status != 0:
+            raise RRDCachedError(message)
+
+        commands = [
+            f"UPDATE {rrd_filename} {values}" for rrd_filename, values in updates
+        ]
+        self.sock_file.write("\n".join(commands + ["."]).encode() + b"\n")
+        self.sock_file.flush()
+
+        # batch errors have the format of "<command number> <error message>", command
+        # numbers start from 1 in the order of the batch
+        _, _, lines = self._read_response()
+
+        errors = []
+        for line in lines:
+            command_number, _, error_message = line.partition(" ")
+            try:
+                rrd_filename = updates[int(command_number) - 1][0]
+            except (ValueError, IndexError):
+                rrd_filename, error_message = None, line
+            errors.append((rrd_filename, error_message))
+
+        return errors
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+import math
+import sys
+import threading
+import time
+
+# sampled metrics of subsystems - {subsystem: {metric: data source type}}
+sampled_metrics = {
+    "cpu": {"cpu_freq": "GAUGE"},
+    "os": {"loadavg_1min": "GAUGE", "num_context_switch": "COUNTER"},
+    "network": {
+        "rx_bytes": "COUNTER",
+        "rx_dropped": "COUNTER",
+        "tx_bytes": "COUNTER",
+        "tx_dropped": "COUNTER",
+    },
+}
+
+# aggregations of data source types, counters are aggregated as maximum rate per second
+aggregations = {
+    "GAUGE": ["min", "max", "avg"],
+    "COUNTER": ["max"],
+    "DERIVE": ["max"],
+}
+
+
+def get_hf_ds_name(ds_name, aggregation):
+    """
+    get data source name of an aggregation, e.g. loadavg_1min_max
+
+    data source name is truncated as rrdtool limits data source names to 19 characters
+    """
+    return f"{ds_name[:18 - len(aggregation)]}_{aggregation}"
+
+
+def get_hf_ds_definitions(ds_name, ds_type):
+    """
+    get data source definitions of aggregations of a data source
+    """
+    return [
+        f"DS:{get_hf_ds_name(ds_name, aggregation)}:GAUGE:300:0:U"
+        for aggregation in aggregations[ds_type]
+    ]
+
+
+def get_sampled_ds(rrd_name, ds_names):
+    """
+    get sampled data sources of a RRD database - {data source: data source type}
+
+    RRD database name is relative to the RRD database directory without .rrd, e.g. os,
+    network-rx_bytes or network/eth0
+    """
+    if "/" in rrd_name:
+        # device layout, data sources are metrics
+        subsystem = rrd_name.split("/", 1)[0]
+    elif "-" in rrd_name:
+        # metric layout, data sources are devices
+        subsystem, metric = rrd_name.split("-", 1)
+        ds_type = sampled_metrics.get(subsystem, {}).get(metric)
+        if ds_type is None:
+            return {}
+        # data sources of aggregations are not devices
+        hf_ds_names = {
+            get_hf_ds_name(ds_name, aggregation)
+            for ds_name in ds_names
+            for aggregation in aggregations[ds_type]
+        }
+        return {ds_name: ds_type for ds_name in ds_names if ds_name not in hf_ds_names}
+    else:
+        subsystem = rrd_name
+
+    metrics = sampled_metrics.get(subsystem, {})
+
+    return {ds_name: metrics[ds_name] for ds_name in ds_names if ds_name in metrics}
+
+
+class Sampler:
+    def __init__(self, interval, cpu_budget=0.02, verbose=False):
+        # sampling interval in seconds, it's stretched if sampling costs more CPU time
+        # than the budget (fraction of one CPU)
+        self.interval = interval
+        self.cpu_budget = cpu_budget
+        self.verbose = verbose
+        self.current_interval = interval
+        # aggregations of the current step - {(RRD database filename, data source): [...]}
+        # gauges: [count, sum, min, max], counters: [timestamp, value, max rate]
+        self.gauges = {}
+        self.counters = {}
+        self.samples = 0
+        self.cpu_time = 0.0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def add(self, timestamp, rrd_filename, ds_names, values, ds_type):
+        """
+        add sampled values of data sources of a RRD database, unknown values are None
+        """
+        with self.lock:
+            for ds_name, value in zip(ds_names, values):
+                if value is None:
+                    continue
+                value = float(value)
+                key = (rrd_filename, ds_name)
+
+                if ds_type == "GAUGE":
+                    gauge = self.gauges.get(key)
+                    if gauge is None:
+                        self.gauges[key] = [1, value, value, value]
+                    else:
+                        gauge[0] += 1
+                        gauge[1] += value
+                        gauge[2] = min(gauge[2], value)
+                        gauge[3] = max(gauge[3], value)
+                    continue
+
+                counter = self.counters.get(key)
+                if counter is None:
+                    self.counters[key] = [timestamp, value, math.nan]
+                    continue
+                interval = timestamp - counter[0]
+                rate = (value - counter[1]) / interval if interval > 0 else math.nan
+                # counter wraps or resets are skipped
+                if rate >= 0 and (counter[2] != counter[2] or rate > counter[2]):
+                    counter[2] = rate
+                counter[0] = timestamp
+                counter[1] = value
+
+    def collect(self):
+        """
+        collect aggregations of the current step and start a new step
+        format: {RRD database filename: {data source: value}}
+
+        last values of counters are kept, so the first rate of the new step is
+        calculated from the last sample of the current step
+        """
+        values = {}
+
+        with self.lock:
+            for (rrd_filename, ds_name), (
+                count,
+                total,
+                low,
+                high,
+            ) in self.gauges.items():
+                rrd_values = values.setdefault(rrd_filename, {})
+                rrd_values[get_hf_ds_name(ds_name, "min")] = low
+                rrd_values[get_hf_ds_name(ds_name, "max")] = high
+                rrd_values[get_hf_ds_name(ds_name, "avg")] = total / count
+
+            for (rrd_filename, ds_name), counter in self.counters.items():
+                if counter[2] == counter[2]:
+                    values.setdefault(rrd_filename, {})[
+                        get_hf_ds_name(ds_name, "max")
+                    ] = counter[2]
+                counter[2] = math.nan
+
+            self.gauges = {}
+            samples = self.samples
+            cpu_time = self.cpu_time
+            self.samples = 0
+            self.cpu_time = 0.0
+
+        if self.verbose:
+            print(
+                f"INFO: high frequency sampler took {samples} samples every {self.current_interval:.3f}s, {cpu_time:.3f}s CPU time"
+            )
+
+        return values
+
+    def run(self, sample):
+        """
+        call sample(timestamp) on every sampling interval until stopped
+
+        CPU time of each sample is measured, the interval is stretched to average CPU
+        time per sample / CPU budget if the configured interval would exceed the budget
+        """
+        next_sample = time.monotonic()
+        sample_cpu_time = None
+        throttled = False
+
+        while not self.stop_event.is_set():
+            cpu_start = time.thread_time()
+            try:
+                sample(time.time())
+            except Exception as e:
+                print(
+                    f"ERROR: high frequency sampling failed: {str(e)}", file=sys.stderr
+                )
+            cpu_time = time.thread_time() - cpu_start
+
+            with self.lock:
+                self.samples += 1
+                self.cpu_time += cpu_time
+
+            # moving average of CPU time per sample
+            if sample_cpu_time is None:
+                sample_cpu_time = cpu_time
+            else:
+                sample_cpu_time = 0.9 * sample_cpu_time + 0.1 * cpu_time
+
+            self.current_interval = max(
+                self.interval, sample_cpu_time / self.cpu_budget
+            )
+            if self.current_interval > self.interval and not throttled:
+                print(
+                    f"WARNING: high frequency sampling takes {sample_cpu_time:.3f}s CPU time, interval is stretched to {self.current_interval:.3f}s",
+                    file=sys.stderr,
+                )
+            throttled = self.current_interval > self.interval
+
+            next_sample += self.current_interval
+            now = time.monotonic()
+            if next_sample < now:
+                next_sample = now
+            self.stop_event.wait(next_sample - now)
+
+    def start(self, sample):
+        """
+        start sampling in a background thread
+        """
+        self.thread = threading.Thread(
+            target=self.run, args=(sample,), name="hms-sampler", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        """
+        stop sampling and wait for the background thread
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
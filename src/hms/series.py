@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+import math
+import rrdtool
+import struct
+
+# numpy is optional, time series are downsampled in pure Python if it's not installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# downsampling algorithms
+algorithms = ["lttb", "minmax"]
+
+# consolidation functions of RRAs created by hms_bootstrap_rrd.py
+consolidation_functions = ["AVERAGE", "MIN", "MAX"]
+
+
+def fetch_series(
+    rrd_filename, ds_names, start, end, cf="AVERAGE", resolution=None, daemon=None
+):
+    """
+    fetch time series of data sources from RRD database - (step, {data source: (timestamps, values)})
+
+    unknown values are NaN. rrdtool picks the RRA which is closest to the resolution,
+    so long time ranges are read from consolidated RRAs
+    """
+    fetch_args = ["--start", str(start), "--end", str(end)]
+    if resolution:
+        fetch_args += ["--resolution", str(resolution)]
+    if daemon:
+        fetch_args += ["--daemon", daemon]
+
+    (fetch_start, _, step), rrd_ds_names, rows = rrdtool.fetch(
+        rrd_filename, cf, fetch_args
+    )
+
+    # timestamp of a row is the end of its interval
+    timestamps = [fetch_start + step * (count + 1) for count in range(len(rows))]
+
+    series = {}
+    if numpy is not None:
+        # unknown values (None) are converted into NaN
+        timestamps = numpy.asarray(timestamps, dtype=numpy.float64)
+        values = numpy.array(rows, dtype=numpy.float64).reshape(
+            len(rows), len(rrd_ds_names)
+        )
+        for ds_name in ds_names:
+            series[ds_name] = (timestamps, values[:, rrd_ds_names.index(ds_name)])
+        return step, series
+
+    for ds_name in ds_names:
+        index = rrd_ds_names.index(ds_name)
+        series[ds_name] = (
+            timestamps,
+            [math.nan if row[index] is None else float(row[index]) for row in rows],
+        )
+
+    return step, series
+
+
+def downsample_lttb(timestamps, values, max_points):
+    """
+    downsample time series with Largest-Triangle-Three-Buckets - (timestamps, values)
+
+    first and last points are kept, one point is selected from each bucket in between
+    which forms the largest triangle with the previous selected point and the average
+    of the next bucket. the selection depends on the point selected in the previous
+    bucket, so buckets are walked one by one even with numpy
+    """
+    length = len(values)
+    if max_points >= length or max_points < 2:
+        return timestamps, values
+
+    if max_points == 2:
+        return timestamps[:: length - 1], values[:: length - 1]
+
+    # bucket edges, the last bucket is the last point
+    bucket_size = (length - 2) / (max_points - 2)
+    edges = [int(bucket * bucket_size) + 1 for bucket in range(max_points - 1)]
+    edges.append(length)
+    selected = [0]
+
+    if numpy is not None:
+        x = numpy.asarray(timestamps, dtype=numpy.float64)
+        y = numpy.asarray(values, dtype=numpy.float64)
+        known = ~numpy.isnan(y)
+        # averages of all buckets are calculated at once, unknown values are excluded
+        counts = numpy.diff(edges)
+        average_x = numpy.add.reduceat(x, edges[:-1]) / counts
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            average_y = numpy.add.reduceat(
+                numpy.where(known, y, 0.0), edges[:-1]
+            ) / numpy.add.reduceat(known, edges[:-1])
+
+        for bucket in range(max_points - 2):
+            bucket_start, bucket_end = edges[bucket], edges[bucket + 1]
+            previous = selected[-1]
+            next_y = average_y[bucket + 1]
+            if next_y != next_y:
+                next_y = y[previous]
+            areas = numpy.abs(
+                (x[previous] - average_x[bucket + 1])
+                * (y[bucket_start:bucket_end] - y[previous])
+                - (x[previous] - x[bucket_start:bucket_end]) * (next_y - y[previous])
+            )
+            # unknown values are only selected if the whole bucket is unknown
+            selected.append(
+                bucket_start + int(numpy.nan_to_num(areas, nan=-1.0).argmax())
+            )
+        selected.append(length - 1)
+
+        return x[selected], y[selected]
+
+    for bucket in range(max_points - 2):
+        bucket_start, bucket_end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2]
+        previous = selected[-1]
+        average_x = sum(timestamps[bucket_end:next_end]) / (next_end - bucket_end)
+        next_y = [value for value in values[bucket_end:next_end] if value == value]
+        average_y = sum(next_y) / len(next_y) if next_y else values[previous]
+        max_area = -1.0
+        max_index = bucket_start
+        for index in range(bucket_start, bucket_end):
+            area = abs(
+                (timestamps[previous] - average_x) * (values[index] - values[previous])
+                - (timestamps[previous] - timestamps[index])
+                * (average_y - values[previous])
+            )
+            if area > max_area:
+                max_area = area
+                max_index = index
+        selected.append(max_index)
+    selected.append(length - 1)
+
+    return [timestamps[index] for index in selected], [
+        values[index] for index in selected
+    ]
+
+
+def downsample_minmax(timestamps, values, max_points):
+    """
+    downsample time series into min / max envelope - (timestamps, values)
+
+    first and last points are kept, time series is split into (max_points - 2) / 2
+    buckets and minimum and maximum points of each bucket are kept in time order
+    """
+    length = len(values)
+    buckets = (max_points - 2) // 2
+    if max_points >= length or max_points < 2:
+        return timestamps, values
+
+    if buckets < 1:
+        return timestamps[:: length - 1], values[:: length - 1]
+
+    bucket_size = -(-length // buckets)
+
+    if numpy is not None:
+        x = numpy.asarray(timestamps, dtype=numpy.float64)
+        y = numpy.full(buckets * bucket_size, numpy.nan)
+        y[:length] = values
+        y = y.reshape(buckets, bucket_size)
+        known = ~numpy.isnan(y)
+        # unknown values are only selected if the whole bucket is unknown
+        min_index = numpy.where(known, y, numpy.inf).argmin(axis=1)
+        max_index = numpy.where(known, y, -numpy.inf).argmax(axis=1)
+        offsets = numpy.arange(buckets) * bucket_size
+        selected = numpy.sort(
+            numpy.stack([min_index + offsets, max_index + offsets], axis=1), axis=1
+        ).ravel()
+        selected = numpy.unique(
+            numpy.concatenate([[0], selected[selected < length], [length - 1]])
+        )
+
+        return x[selected], y.ravel()[selected]
+
+    selected = {0, length - 1}
+    for bucket_start in range(0, length, bucket_size):
+        bucket = [
+            (value, index)
+            for index, value in enumerate(
+                values[bucket_start : bucket_start + bucket_size], bucket_start
+            )
+            if value == value
+        ]
+        if not bucket:
+            selected.add(bucket_start)
+            continue
+        # the first minimum and maximum points are kept as numpy does
+        selected.update([min(bucket)[1], max(bucket, key=lambda point: point[0])[1]])
+    selected = sorted(selected)
+
+    return [timestamps[index] for index in selected], [
+        values[index] for index in selected
+    ]
+
+
+def downsample(timestamps, values, max_points, algorithm="lttb"):
+    """
+    downsample time series with the algorithm - (timestamps, values)
+    """
+    if algorithm == "minmax":
+        return downsample_minmax(timestamps, values, max_points)
+
+    return downsample_lttb(timestamps, values, max_points)
+
+
+def to_list(values):
+    """
+    convert time series values into list, unknown values are None
+    """
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        values = values.tolist()
+
+    return [None if value != value else value for value in values]
+
+
+def pack_series(series):
+    """
+    pack time series into little-endian binary format
+
+    each time series is a uint32 number of points n, uint32 padding, n float64
+    timestamps and n float64 values. unknown values are NaN. all arrays are 8-byte
+    aligned, so they can be read as typed arrays without copying
+    """
+    packed = []
+    for timestamps, values in series:
+        length = len(values)
+        if numpy is not None:
+            packed.append(struct.pack("<II", length, 0))
+            packed.append(numpy.asarray(timestamps, dtype="<f8").tobytes())
+            packed.append(numpy.asarray(values, dtype="<f8").tobytes())
+            continue
+        packed.append(
+            struct.pack(f"<II{length}d{length}d", length, 0, *timestamps, *values)
+        )
+
+    return b"".join(packed)
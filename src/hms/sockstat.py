@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+from . import procfs
+
+
+class Sockstat:
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
+        self.sockstat = self._get_sockstat()
+        self.sockstat6 = self._get_sockstat6()
+
+    def _read_sockstat(self, proc_filename, sockstat_metrics_mapping):
+        """
+        read socket summary values from proc file
+
+        each line has the format of "<protocol>: <key> <value> [<key> <value> ...]"
+        """
+        sockstat = {}
+        for metric in sockstat_metrics_mapping:
+            sockstat[metric] = None
+
+        sockstat_values = {}
+        for line in self.snapshot.readlines(proc_filename):
+            protocol, _, values = line.decode().partition(":")
+            values = values.split()
+            for index in range(0, len(values) - 1, 2):
+                sockstat_values[(protocol, values[index])] = values[index + 1]
+
+        for metric, entry in sockstat_metrics_mapping.items():
+            if entry in sockstat_values:
+                sockstat[metric] = sockstat_values[entry]
+
+        return sockstat
+
+    def _get_sockstat(self):
+        """
+        get IPv4 socket summary information
+        unit: count except tcp_mem / udp_mem (page) and frag_memory (byte)
+        """
+        sockstat_metrics_mapping = {
+            "sockets_used": ("sockets", "used"),
+            "tcp_inuse": ("TCP", "inuse"),
+            "tcp_orphan": ("TCP", "orphan"),
+            "tcp_tw": ("TCP", "tw"),
+            "tcp_alloc": ("TCP", "alloc"),
+            "tcp_mem": ("TCP", "mem"),
+            "udp_inuse": ("UDP", "inuse"),
+            "udp_mem": ("UDP", "mem"),
+            "udplite_inuse": ("UDPLITE", "inuse"),
+            "raw_inuse": ("RAW", "inuse"),
+            "frag_inuse": ("FRAG", "inuse"),
+            "frag_memory": ("FRAG", "memory"),
+        }
+
+        return self._read_sockstat("/proc/net/sockstat", sockstat_metrics_mapping)
+
+    def _get_sockstat6(self):
+        """
+        get IPv6 socket summary information
+        unit: count except frag6_memory (byte)
+        """
+        sockstat6_metrics_mapping = {
+            "tcp6_inuse": ("TCP6", "inuse"),
+            "udp6_inuse": ("UDP6", "inuse"),
+            "udplite6_inuse": ("UDPLITE6", "inuse"),
+            "raw6_inuse": ("RAW6", "inuse"),
+            "frag6_inuse": ("FRAG6", "inuse"),
+            "frag6_memory": ("FRAG6", "memory"),
+        }
+
+        return self._read_sockstat("/proc/net/sockstat6", sockstat6_metrics_mapping)
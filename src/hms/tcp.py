@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 
+import socket
+import struct
+from . import procfs
 
 # ref.: https://github.com/torvalds/linux/blob/master/include/net/tcp_states.h
 tcp_states = {
@@ -17,30 +20,124 @@ tcp_states = {
     "0C": "NEW_SYN_RECV",
 }
 
+# ref.: https://github.com/torvalds/linux/blob/master/include/uapi/linux/netlink.h
+# ref.: https://github.com/torvalds/linux/blob/master/include/uapi/linux/inet_diag.h
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+# nlmsghdr: len, type, flags, seq, pid
+nlmsghdr = struct.Struct("=IHHII")
+# inet_diag_req_v2: family, protocol, ext, pad, states + 48 bytes inet_diag_sockid
+inet_diag_req_v2 = struct.Struct("=BBBBI48x")
+# offset of idiag_state in a dumped message, after nlmsghdr and idiag_family
+idiag_state_offset = nlmsghdr.size + 1
+
+
+def count_netlink_socket_states(buffer, received, state_counts):
+    """
+    count socket states of inet_diag messages received in buffer into state_counts
+
+    True is returned if the dump is done (NLMSG_DONE), OSError is raised on
+    NLMSG_ERROR or a truncated message
+    """
+    offset = 0
+    while offset < received:
+        msg_len, msg_type, _, _, _ = nlmsghdr.unpack_from(buffer, offset)
+        if msg_type == NLMSG_DONE:
+            return True
+        if msg_type == NLMSG_ERROR:
+            errno = -struct.unpack_from("=i", buffer, offset + nlmsghdr.size)[0]
+            raise OSError(errno, "NETLINK_SOCK_DIAG request failed")
+        if msg_len <= idiag_state_offset or offset + msg_len > received:
+            raise OSError("truncated NETLINK_SOCK_DIAG message")
+
+        state_counts[buffer[offset + idiag_state_offset]] += 1
+
+        # netlink messages are aligned to 4 bytes
+        offset += (msg_len + 3) & ~3
+
+    return False
+
 
 class TCP:
-    def __init__(self):
+    def __init__(self, snapshot=None, backend="netlink"):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
+        self.backend = backend
         self.tcp_proc_file = "/proc/net/tcp"
         self.tcp6_proc_file = "/proc/net/tcp6"
         self.tcp = self._get_tcp()
         self.tcp6 = self._get_tcp6()
 
+    def _get_netlink_socket_states(self, family):
+        """
+        get TCP socket state counts from kernel via NETLINK_SOCK_DIAG
+
+        dumped messages are parsed in a preallocated buffer, only the state byte
+        of each socket is read.
+        """
+        state_counts = [0] * 256
+
+        with socket.socket(
+            socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_SOCK_DIAG
+        ) as sock:
+            # request all TCP sockets in all states
+            request = inet_diag_req_v2.pack(
+                family, socket.IPPROTO_TCP, 0, 0, 0xFFFFFFFF
+            )
+            sock.sendto(
+                nlmsghdr.pack(
+                    nlmsghdr.size + len(request),
+                    SOCK_DIAG_BY_FAMILY,
+                    NLM_F_REQUEST | NLM_F_DUMP,
+                    1,
+                    0,
+                )
+                + request,
+                (0, 0),
+            )
+
+            buffer = bytearray(1048576)
+            done = False
+            while not done:
+                received = sock.recv_into(buffer)
+                if received == 0:
+                    break
+
+                done = count_netlink_socket_states(buffer, received, state_counts)
+
+        socket_states = {}
+        for state_code, state in tcp_states.items():
+            socket_states[state] = state_counts[int(state_code, 16)]
+
+        return socket_states
+
     def _get_socket_states(self, proc_filename):
         """
         get TCP socket state counts from proc file
         """
         socket_states = {}
+
+        socket_lines = self.snapshot.readlines(proc_filename)
+        if not socket_lines:
+            for _, state in tcp_states.items():
+                socket_states[state] = None
+
+            return socket_states
+
         for _, state in tcp_states.items():
             socket_states[state] = 0
 
-        with open(proc_filename, "rt") as f:
-            for line in f.readlines():
-                cols = line.split()
-                if cols:
-                    state = cols[3]
-                    if state in tcp_states:
-                        tcp_state = tcp_states[state]
-                        socket_states[tcp_state] += 1
+        for line in socket_lines:
+            cols = line.split()
+            if cols:
+                state = cols[3].decode()
+                if state in tcp_states:
+                    tcp_state = tcp_states[state]
+                    socket_states[tcp_state] += 1
 
         return socket_states
 
@@ -48,10 +145,22 @@ class TCP:
         """
         get IPv4 TCP socket state information
         """
+        if self.backend == "netlink":
+            try:
+                return self._get_netlink_socket_states(socket.AF_INET)
+            except (OSError, struct.error):
+                pass
+
         return self._get_socket_states(self.tcp_proc_file)
 
     def _get_tcp6(self):
         """
         get IPv6 TCP socket state information
         """
+        if self.backend == "netlink":
+            try:
+                return self._get_netlink_socket_states(socket.AF_INET6)
+            except (OSError, struct.error):
+                pass
+
         return self._get_socket_states(self.tcp6_proc_file)
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+
+import functools
+import re
+import time
+
+# AT-style time specification of rrdtool, see TIME SPECIFICATION in rrdfetch manual
+
+# time references
+references = ["now", "start", "end", "epoch"]
+
+# abbreviations of time references
+reference_abbreviations = {
+    "n": "now",
+    "s": "start",
+    "e": "end",
+}
+
+# time of day keywords - (hour, minute)
+time_of_day = {
+    "midnight": (0, 0),
+    "noon": (12, 0),
+    "teatime": (16, 0),
+}
+
+# day keywords - day offset
+day_offsets = {
+    "yesterday": -1,
+    "today": 0,
+    "tomorrow": 1,
+}
+
+# day of the week, Sunday is 0 as in rrdtool
+weekdays = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+months = [
+    "jan",
+    "feb",
+    "mar",
+    "apr",
+    "may",
+    "jun",
+    "jul",
+    "aug",
+    "sep",
+    "oct",
+    "nov",
+    "dec",
+]
+
+# offset units - (unit, multiplier), m is resolved into minutes or months by context
+offset_units = {
+    "s": ("seconds", 1),
+    "sec": ("seconds", 1),
+    "secs": ("seconds", 1),
+    "second": ("seconds", 1),
+    "seconds": ("seconds", 1),
+    "min": ("seconds", 60),
+    "mins": ("seconds", 60),
+    "minute": ("seconds", 60),
+    "minutes": ("seconds", 60),
+    "h": ("seconds", 3600),
+    "hr": ("seconds", 3600),
+    "hrs": ("seconds", 3600),
+    "hour": ("seconds", 3600),
+    "hours": ("seconds", 3600),
+    "d": ("days", 1),
+    "day": ("days", 1),
+    "days": ("days", 1),
+    "w": ("days", 7),
+    "wk": ("days", 7),
+    "week": ("days", 7),
+    "weeks": ("days", 7),
+    "mon": ("months", 1),
+    "month": ("months", 1),
+    "months": ("months", 1),
+    "y": ("months", 12),
+    "yr": ("months", 12),
+    "year": ("months", 12),
+    "years": ("months", 12),
+}
+
+# smallest timestamp accepted as seconds since epoch instead of a date, same as rrdtool
+min_epoch = 10 * 365 * 24 * 60 * 60
+
+token_pattern = re.compile(r"\s*(?:(\d+)|([a-z]+)|([+\-:/.,]))")
+
+
+def tokenize(spec):
+    """
+    split time specification into number, word and symbol tokens
+    """
+    tokens = []
+    pos = 0
+    spec = spec.lower().strip()
+
+    while pos < len(spec):
+        match = token_pattern.match(spec, pos)
+        if not match:
+            raise ValueError(f"unparsable time: {spec}")
+        number, word, symbol = match.groups()
+        if number is not None:
+            tokens.append(int(number))
+        else:
+            tokens.append(word or symbol)
+        pos = match.end()
+
+    return tokens
+
+
+def get_year(year):
+    """
+    convert 2 digit year into 4 digit year as in rrdtool
+    """
+    if year < 38:
+        return 2000 + year
+    if year < 100:
+        return 1900 + year
+
+    return year
+
+
+def parse_date(tokens):
+    """
+    parse date from tokens - MM/DD/[YY]YY, DD.MM.[YY]YY, YYYYMMDD or month name DD [YYYY]
+
+    date operation is returned and tokens of the date are removed
+    """
+    if isinstance(tokens[0], str) and tokens[0][:3] in weekdays:
+        return ("weekday", weekdays.index(tokens.pop(0)[:3]))
+
+    if isinstance(tokens[0], str) and tokens[0][:3] in months:
+        month = months.index(tokens.pop(0)[:3]) + 1
+        if not tokens or not isinstance(tokens[0], int):
+            raise ValueError("day of month is missing")
+        day = tokens.pop(0)
+        year = None
+        if tokens and tokens[0] == ",":
+            tokens.pop(0)
+        if tokens and isinstance(tokens[0], int):
+            year = get_year(tokens.pop(0))
+        return ("date", year, month, day)
+
+    if not isinstance(tokens[0], int):
+        raise ValueError(f"unparsable time: {tokens[0]}")
+    number = tokens.pop(0)
+
+    # seconds since epoch
+    if number > min_epoch:
+        return ("epoch", number)
+
+    # YYYYMMDD
+    if 19700101 < number < 24000101:
+        return ("date", number // 10000, number // 100 % 100, number % 100)
+
+    if not tokens or tokens[0] not in ["/", "."]:
+        raise ValueError(f"unparsable date: {number}")
+
+    separator = tokens.pop(0)
+    if not tokens or not isinstance(tokens[0], int):
+        raise ValueError("incomplete date")
+    second_number = tokens.pop(0)
+    year = None
+    if tokens and tokens[0] == separator:
+        tokens.pop(0)
+        if not tokens or not isinstance(tokens[0], int):
+            raise ValueError("incomplete date")
+        year = get_year(tokens.pop(0))
+
+    if separator == "/":
+        month, day = number, second_number
+    else:
+        day, month = number, second_number
+
+    if not 1 <= month <= 12 or not 1 <= day <= 31:
+        raise ValueError("invalid date")
+
+    return ("date", year, month, day)
+
+
+def parse_offsets(tokens):
+    """
+    parse offsets from tokens - [+|-]number unit[number unit ...]
+
+    offset operations are returned
+    """
+    operations = []
+    sign = None
+    previous_unit = None
+    # a sign must be followed by a number
+    number_expected = False
+
+    while tokens:
+        token = tokens.pop(0)
+        if token in ["+", "-"]:
+            if number_expected:
+                raise ValueError(f"number is missing after {token} in time offset")
+            sign = 1 if token == "+" else -1
+            previous_unit = None
+            number_expected = True
+            continue
+        if sign is None or not isinstance(token, int):
+            raise ValueError(f"unexpected token in time offset: {token}")
+
+        number = token
+        number_expected = False
+        if not tokens or not isinstance(tokens[0], str) or tokens[0] in ["+", "-"]:
+            # number without unit is seconds
+            operations.append(("seconds", sign * number))
+            continue
+
+        unit = tokens.pop(0)
+        if unit == "m":
+            # m is months after years, months, weeks or days and minutes after hours,
+            # minutes or seconds. right after the sign it's months if the number is
+            # below 6, otherwise it's minutes as in rrdtool
+            if previous_unit is None:
+                unit = "mon" if number < 6 else "min"
+            else:
+                unit = "mon" if previous_unit in ["days", "months"] else "min"
+        if unit not in offset_units:
+            raise ValueError(f"unknown time unit: {unit}")
+
+        operation, multiplier = offset_units[unit]
+        operations.append((operation, sign * number * multiplier))
+        previous_unit = operation
+
+    if number_expected:
+        raise ValueError("number is missing at the end of time offset")
+
+    return operations
+
+
+@functools.lru_cache(maxsize=256)
+def parse_time_spec(spec):
+    """
+    parse AT-style time specification - (time reference, operations)
+
+    time reference is now, start, end or epoch. operations are applied to the time
+    reference in order when the time specification is resolved
+    """
+    tokens = tokenize(spec)
+    if not tokens:
+        raise ValueError("empty time")
+
+    reference = "now"
+    operations = []
+
+    if tokens and tokens[0] in references:
+        reference = tokens.pop(0)
+    elif tokens and tokens[0] in reference_abbreviations:
+        reference = reference_abbreviations[tokens.pop(0)]
+    else:
+        # time of day - midnight, noon, teatime, HH:MM[am|pm] or HH[am|pm]
+        if tokens and tokens[0] in time_of_day:
+            operations.append(("time", *time_of_day[tokens.pop(0)]))
+        elif (
+            len(tokens) > 1
+            and isinstance(tokens[0], int)
+            and (tokens[1] == ":" or tokens[1] in ["am", "pm"])
+        ):
+            hour = tokens.pop(0)
+            minute = 0
+            if tokens[0] == ":":
+                tokens.pop(0)
+                if not tokens or not isinstance(tokens[0], int):
+                    raise ValueError("incomplete time of day")
+                minute = tokens.pop(0)
+            if tokens and tokens[0] in ["am", "pm"]:
+                if not 1 <= hour <= 12:
+                    raise ValueError("invalid hour")
+                hour = hour % 12 + (12 if tokens.pop(0) == "pm" else 0)
+            if hour > 23 or minute > 59:
+                raise ValueError("invalid time of day")
+            operations.append(("time", hour, minute))
+
+        # day - yesterday, today, tomorrow, day of the week or date
+        if tokens and tokens[0] in day_offsets:
+            operations.append(("days", day_offsets[tokens.pop(0)]))
+        elif tokens and tokens[0] not in ["+", "-"]:
+            operations.append(parse_date(tokens))
+
+    operations += parse_offsets(tokens)
+
+    return reference, tuple(operations)
+
+
+def resolve_time_spec(spec, timestamp):
+    """
+    resolve time specification into timestamp, timestamp is the time of the time reference
+
+    ValueError is raised if the time is out of the range of the platform
+    """
+    _, operations = parse_time_spec(spec)
+
+    try:
+        timestamp = _resolve_operations(operations, timestamp)
+        # resolved timestamp must be representable as local time as well
+        time.localtime(timestamp)
+        return timestamp
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"time out of range: {spec}") from e
+
+
+def _resolve_operations(operations, timestamp):
+    """
+    apply operations of a time specification to timestamp
+    """
+
+    # calendar operations are applied to local time, seconds are added at the end
+    local_time = list(time.localtime(timestamp)[:6])
+    calendar = False
+    seconds = 0
+
+    for operation in operations:
+        if operation[0] == "epoch":
+            timestamp = operation[1]
+            local_time = list(time.localtime(timestamp)[:6])
+            continue
+        if operation[0] == "seconds":
+            seconds += operation[1]
+            continue
+
+        calendar = True
+        if operation[0] == "time":
+            local_time[3:6] = [operation[1], operation[2], 0]
+        elif operation[0] == "date":
+            if operation[1] is not None:
+                local_time[0] = operation[1]
+            local_time[1:3] = [operation[2], operation[3]]
+        elif operation[0] == "days":
+            local_time[2] += operation[1]
+        elif operation[0] == "months":
+            local_time[1] += operation[1]
+        elif operation[0] == "weekday":
+            weekday = (
+                time.localtime(time.mktime(tuple(local_time) + (0, 0, -1))).tm_wday + 1
+            ) % 7
+            local_time[2] += operation[1] - weekday
+
+    if calendar:
+        timestamp = time.mktime(tuple(local_time) + (0, 0, -1))
+
+    return int(timestamp) + seconds
+
+
+def resolve_time_range(start, end, now=None):
+    """
+    resolve start and end time specifications into timestamps - (start, end)
+
+    ValueError is raised if the time range is not valid
+    """
+    if now is None:
+        now = time.time()
+
+    start_reference, _ = parse_time_spec(start)
+    end_reference, _ = parse_time_spec(end)
+
+    if start_reference == "start" or end_reference == "end":
+        raise ValueError("time references itself")
+    if start_reference == "end" and end_reference == "start":
+        raise ValueError("start and end reference each other")
+
+    reference_times = {"now": now, "epoch": 0}
+
+    if start_reference == "end":
+        end_time = resolve_time_spec(end, reference_times[end_reference])
+        start_time = resolve_time_spec(start, end_time)
+    else:
+        start_time = resolve_time_spec(start, reference_times[start_reference])
+        end_time = resolve_time_spec(
+            end,
+            start_time if end_reference == "start" else reference_times[end_reference],
+        )
+
+    if start_time < min_epoch:
+        raise ValueError("the first entry to fetch should be after 1980")
+    if start_time >= end_time:
+        raise ValueError(f"start ({start_time}) should be less than end ({end_time})")
+
+    return start_time, end_time
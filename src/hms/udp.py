@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
+from . import procfs
+
 
 class UDP:
-    def __init__(self):
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot if snapshot is not None else procfs.Snapshot()
         self.udp = self._get_udp()
 
     def _get_udp(self):
@@ -16,16 +19,12 @@ class UDP:
             "NoPorts": None,
         }
 
-        try:
-            with open("/proc/net/snmp", "rt") as f:
-                udp_lines = f.readlines()
-        except:
-            pass
-        else:
+        udp_lines = self.snapshot.readlines("/proc/net/snmp")
+        if udp_lines:
             udp_metrics_bucket = []
             for line in udp_lines:
-                if line.startswith("Udp: "):
-                    output = line[5:].strip().split()
+                if line.startswith(b"Udp: "):
+                    output = line[5:].decode().split()
                     udp_metrics_bucket.append(output)
 
             udp_metrics = dict(zip(udp_metrics_bucket[0], udp_metrics_bucket[1]))
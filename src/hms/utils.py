@@ -3,9 +3,25 @@
 import glob
 import os
 import re
-import rrdtool
 import socket
+import struct
 import yaml
+from . import procfs
+from . import timespec
+
+# HTML templates of HMS web page and static export, installed as package data
+template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# default RRA tiers - resolution:retention
+rra_tiers = "1m:2d,5m:2w,1h:1y,1d:5y"
+
+# RRD database header structures in native format - stat_head and ds_def in rrd_format.h
+rrd_stat_head = struct.Struct("@4s5sdLLL10d")
+rrd_ds_def = struct.Struct("@20s20s10d")
+rrd_float_cookie = 8.642135e130
+
+# data sources cache - {RRD database filename: ((inode, size, header), data sources)}
+rrd_ds_cache = {}
 
 
 def get_hostname_fqdn():
@@ -22,7 +38,7 @@ def get_cpu():
     return sorted(
         [
             os.path.basename(dir)
-            for dir in glob.glob("/sys/devices/system/cpu/cpu[0-9]*")
+            for dir in glob.glob(procfs.get_path("/sys/devices/system/cpu/cpu[0-9]*"))
         ]
     )
 
@@ -31,7 +47,9 @@ def get_network_interfaces():
     """
     get network interface list
     """
-    return [os.path.basename(dir) for dir in glob.glob("/sys/class/net/*")]
+    return [
+        os.path.basename(dir) for dir in glob.glob(procfs.get_path("/sys/class/net/*"))
+    ]
 
 
 def get_disk_devices():
@@ -40,26 +58,131 @@ def get_disk_devices():
     """
     return [
         os.path.basename(dir)
-        for dir in glob.glob("/sys/class/block/*")
+        for dir in glob.glob(procfs.get_path("/sys/class/block/*"))
         if not re.match(r"^loop|^zram|^sr", os.path.basename(dir))
     ]
 
 
-def get_rrd_ds(rrd_filename):
+def read_rrd_header(rrd_filename):
     """
-    get data source list from RRD database. used for populating dynamic generating data sources
+    read RRD database header - (inode, size, header)
+
+    header includes stat_head and ds_def of all data sources, it's only changed if data
+    sources are changed
+    """
+    with open(rrd_filename, "rb") as f:
+        rrd_stat = os.fstat(f.fileno())
+        header = f.read(rrd_stat_head.size)
+
+        if len(header) == rrd_stat_head.size and header.startswith(b"RRD\0"):
+            ds_cnt = rrd_stat_head.unpack(header)[3]
+            if rrd_stat_head.size + ds_cnt * rrd_ds_def.size <= rrd_stat.st_size:
+                header += f.read(ds_cnt * rrd_ds_def.size)
+
+    return rrd_stat.st_ino, rrd_stat.st_size, header
+
+
+def parse_rrd_header_ds(header):
+    """
+    get data source list in the order of data source index from RRD database header
+
+    None is returned if the header is not in native format of the platform
     """
+    if len(header) < rrd_stat_head.size or not header.startswith(b"RRD\0"):
+        return None
+
+    float_cookie, ds_cnt = rrd_stat_head.unpack_from(header)[2:4]
+    if (
+        float_cookie != rrd_float_cookie
+        or len(header) != rrd_stat_head.size + ds_cnt * rrd_ds_def.size
+    ):
+        return None
+
     ds = []
+    for count in range(ds_cnt):
+        ds_nam = rrd_ds_def.unpack_from(
+            header, rrd_stat_head.size + count * rrd_ds_def.size
+        )[0]
+        ds.append(ds_nam.split(b"\0", 1)[0].decode())
 
-    rrd_info = rrdtool.info(rrd_filename)
+    return ds
 
-    for key in rrd_info:
-        if key.startswith("ds"):
-            device_name = re.search(r"^ds\[(.*)\].*", key).group(1)
-            if device_name not in ds:
-                ds.append(device_name)
 
-    return sorted(ds)
+def get_rrd_ds(rrd_filename, rrdcached_address=None):
+    """
+    get data source list from RRD database. used for populating dynamic generating data sources
+    """
+    return sorted(get_rrd_ds_index(rrd_filename, rrdcached_address))
+
+
+def get_rrd_ds_index(rrd_filename, rrdcached_address=None):
+    """
+    get data source list from RRD database in the order of data source index
+
+    data sources are parsed from the RRD database header and cached until inode, size or
+    header of the RRD database is changed. rrdtool info is used if the header is not in
+    native format, pending updates in rrdcached are flushed before reading if rrdcached
+    address is provided.
+    """
+    rrd_header = read_rrd_header(rrd_filename)
+
+    rrd_ds_cached = rrd_ds_cache.get(rrd_filename)
+    if rrd_ds_cached is not None and rrd_ds_cached[0] == rrd_header:
+        return list(rrd_ds_cached[1])
+
+    ds = parse_rrd_header_ds(rrd_header[2])
+
+    if ds is None:
+        # rrdtool is imported on demand, so collectors are loaded without rrdtool
+        import rrdtool
+
+        ds_index = {}
+
+        if rrdcached_address:
+            rrd_info = rrdtool.info("--daemon", rrdcached_address, rrd_filename)
+        else:
+            rrd_info = rrdtool.info(rrd_filename)
+
+        for key in rrd_info:
+            if key.startswith("ds") and key.endswith("].index"):
+                device_name = re.search(r"^ds\[(.*)\]\.index$", key).group(1)
+                ds_index[device_name] = rrd_info[key]
+
+        ds = sorted(ds_index, key=ds_index.get)
+
+    rrd_ds_cache[rrd_filename] = (rrd_header, ds)
+
+    return list(ds)
+
+
+def get_rrd_ds_types(rrd_filename):
+    """
+    get data source types from RRD database - {data source: type}
+
+    types are parsed from the RRD database header, rrdtool info is used if the header
+    is not in native format
+    """
+    header = read_rrd_header(rrd_filename)[2]
+    ds = parse_rrd_header_ds(header)
+
+    if ds is not None:
+        ds_types = {}
+        for count, ds_name in enumerate(ds):
+            dst = rrd_ds_def.unpack_from(
+                header, rrd_stat_head.size + count * rrd_ds_def.size
+            )[1]
+            ds_types[ds_name] = dst.split(b"\0", 1)[0].decode()
+        return ds_types
+
+    import rrdtool
+
+    rrd_info = rrdtool.info(rrd_filename)
+
+    return {
+        re.search(r"^ds\[(.*)\]\.type$", key).group(1): rrd_info[key]
+        for key in rrd_info
+        if key.startswith("ds") and key.endswith("].type")
+    }
 
 
 def test_rrd_time_range(start, end):
@@ -67,23 +190,95 @@ def test_rrd_time_range(start, end):
     test RRD graph time span range
     """
     try:
-        rrdtool.graph(
-            "--start",
-            start,
-            "--end",
-            end,
-        )
-    except rrdtool.OperationalError as e:
-        error_message = str(e)
-        if (
-            error_message.startswith("start ")
-            or error_message.startswith("end ")
-            or error_message.startswith("the start ")
-            or error_message.startswith("the end ")
-        ):
-            return False
-        else:
-            return True
+        timespec.resolve_time_range(start, end)
+    except ValueError:
+        return False
+
+    return True
+
+
+def parse_step(step):
+    """
+    convert RRD step string (e.g. 60, 60s, 1m, 1h) into seconds
+
+    M and y are 31 and 366 days as in rrdtool
+    """
+    units = {
+        "s": 1,
+        "m": 60,
+        "h": 3600,
+        "d": 86400,
+        "w": 604800,
+        "M": 2678400,
+        "y": 31622400,
+    }
+
+    step = str(step).strip()
+    if step[-1:] in units:
+        return int(step[:-1]) * units[step[-1]]
+    else:
+        return int(step)
+
+
+def get_rra_definitions(step, rra_tiers):
+    """
+    build RRA definitions from RRA tiers string (e.g. 1m:2d,5m:2w,1h:1y,1d:5y)
+
+    each tier is resolution:retention and has AVERAGE, MIN and MAX consolidation.
+    resolution is rounded up to a multiple of the step, tiers with the same resolution
+    keep the longest retention.
+    """
+    step = parse_step(step)
+    tiers = {}
+
+    for rra_tier in rra_tiers.split(","):
+        resolution, retention = rra_tier.strip().split(":")
+        steps = max(-(-parse_step(resolution) // step), 1)
+        rows = -(-parse_step(retention) // (steps * step))
+        tiers[steps] = max(tiers.get(steps, 0), rows)
+
+    return [
+        f"RRA:{cf}:0.5:{steps}:{rows}"
+        for steps, rows in sorted(tiers.items())
+        for cf in ["AVERAGE", "MIN", "MAX"]
+    ]
+
+
+def estimate_rrd_size(num_ds, rra_definitions):
+    """
+    estimate RRD database file size in bytes from number of data sources and RRA definitions
+
+    header structure sizes are taken from rrd_format.h on 64-bit platforms
+    """
+    rows = sum(int(rra.split(":")[-1]) for rra in rra_definitions)
+    num_rra = len(rra_definitions)
+
+    # stat_head + live_head + ds_def / pdp_prep per data source + rra_def / rra_ptr per
+    # RRA + cdp_prep per data source and RRA + one value per data source and row
+    return (
+        128
+        + 16
+        + num_ds * (120 + 112)
+        + num_rra * (120 + 8)
+        + num_ds * num_rra * 80
+        + num_ds * rows * 8
+    )
+
+
+def get_rrd_step(rrd_filename):
+    """
+    get step in seconds from RRD database
+
+    step is parsed from the RRD database header, rrdtool info is used if the header is
+    not in native format
+    """
+    header = read_rrd_header(rrd_filename)[2]
+    if parse_rrd_header_ds(header) is not None:
+        return int(rrd_stat_head.unpack_from(header)[5])
+
+    import rrdtool
+
+    return int(rrdtool.info(rrd_filename)["step"])
 
 
 def rotate_color_plate(items, color_plate):
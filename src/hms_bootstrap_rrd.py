@@ -1,22 +1,67 @@
 #!/usr/bin/env python3
 
 import argparse
-import importlib.util
 import os
 import rrdtool
-import sys
 
-# load host monitoring station module - hms
-spec = importlib.util.spec_from_file_location("hms", f"{os.getcwd()}/hms/__init__.py")
-hms = importlib.util.module_from_spec(spec)
-sys.modules[spec.name] = hms
-spec.loader.exec_module(hms)
+import hms
 
 
 class Bootstrap:
-    def __init__(self, rrd_dir, step):
+    def __init__(
+        self,
+        rrd_dir,
+        step,
+        layout="metric",
+        rra_tiers=hms.utils.rra_tiers,
+        dry_run=False,
+        high_frequency=False,
+    ):
         self.rrd_dir = rrd_dir
         self.rrd_step = step
+        # RRD databases layout of disk and network metrics - metric or device
+        self.rrd_layout = layout
+        self.rrd_rra = hms.utils.get_rra_definitions(step, rra_tiers)
+        self.dry_run = dry_run
+        # data sources of high frequency sampling aggregations are created if it's set
+        self.high_frequency = high_frequency
+        self.rrd_size = 0
+
+    def _create(self, rrd_filename, ds_definitions):
+        """
+        create RRD database with the RRA tiers, RRD database is not created in dry run
+
+        data sources of high frequency sampling aggregations are added to sampled data
+        sources if high frequency is enabled
+        """
+        if self.high_frequency:
+            ds_types = {
+                ds_definition.split(":")[1]: ds_definition.split(":")[2]
+                for ds_definition in ds_definitions
+            }
+            rrd_name = os.path.relpath(rrd_filename, self.rrd_dir)[: -len(".rrd")]
+            for ds_name, ds_type in hms.sampler.get_sampled_ds(
+                rrd_name, list(ds_types)
+            ).items():
+                ds_definitions = ds_definitions + hms.sampler.get_hf_ds_definitions(
+                    ds_name, ds_type
+                )
+
+        rrd_size = hms.utils.estimate_rrd_size(len(ds_definitions), self.rrd_rra)
+        self.rrd_size += rrd_size
+
+        if not self.dry_run:
+            rrdtool.create(
+                rrd_filename,
+                "--step",
+                self.rrd_step,
+                ds_definitions,
+                self.rrd_rra,
+            )
+
+        print(
+            f"RRD {rrd_filename} {'estimated' if self.dry_run else 'created'}, {rrd_size} bytes."
+        )
 
     def bootstrap_cpu(self):
         """
@@ -29,16 +74,11 @@ class Bootstrap:
 
         for metric, compute in metrics.items():
             rrd_filename = self.rrd_dir + f"/cpu-{metric}.rrd"
-            rrdtool.create(
+            self._create(
                 rrd_filename,
-                "--step",
-                self.rrd_step,
                 [f"DS:{cpu_name}:{compute}:300:0:U" for cpu_name in cpus],
-                f"RRA:AVERAGE:0.5:{self.rrd_step}:1y",
             )
 
-            print(f"RRD {rrd_filename} created.")
-
     def bootstrap_disk(self):
         """
         bootstrap disk stats information RRD databases
@@ -51,21 +91,42 @@ class Bootstrap:
             "write_merge": "COUNTER",
             "write_sector": "COUNTER",
             "in_flight": "GAUGE",
+            "read_ticks": "COUNTER",
+            "write_ticks": "COUNTER",
+            "io_ticks": "COUNTER",
+            "time_in_queue": "COUNTER",
+            "discard_io": "COUNTER",
+            "discard_merge": "COUNTER",
+            "discard_sector": "COUNTER",
+            "discard_ticks": "COUNTER",
+            "flush_io": "COUNTER",
+            "flush_ticks": "COUNTER",
         }
         disk_devices = hms.utils.get_disk_devices()
 
+        if self.rrd_layout == "device":
+            if not self.dry_run:
+                os.makedirs(self.rrd_dir + "/disk", exist_ok=True)
+
+            for disk_device in disk_devices:
+                rrd_filename = self.rrd_dir + f"/disk/{disk_device}.rrd"
+                self._create(
+                    rrd_filename,
+                    [
+                        f"DS:{metric}:{compute}:300:0:U"
+                        for metric, compute in metrics.items()
+                    ],
+                )
+
+            return
+
         for metric, compute in metrics.items():
             rrd_filename = self.rrd_dir + f"/disk-{metric}.rrd"
-            rrdtool.create(
+            self._create(
                 rrd_filename,
-                "--step",
-                self.rrd_step,
                 [f"DS:{disk_device}:{compute}:300:0:U" for disk_device in disk_devices],
-                f"RRA:AVERAGE:0.5:{self.rrd_step}:1y",
             )
 
-            print(f"RRD {rrd_filename} created.")
-
     def bootstrap_network(self):
         """
         bootstrap network stats information RRD databases
@@ -81,65 +142,67 @@ class Bootstrap:
         ]
         interfaces = hms.utils.get_network_interfaces()
 
+        if self.rrd_layout == "device":
+            if not self.dry_run:
+                os.makedirs(self.rrd_dir + "/network", exist_ok=True)
+
+            for interface in interfaces:
+                rrd_filename = self.rrd_dir + f"/network/{interface}.rrd"
+                self._create(
+                    rrd_filename,
+                    [f"DS:{metric}:COUNTER:300:0:U" for metric in metrics],
+                )
+
+            return
+
         for metric in metrics:
             rrd_filename = self.rrd_dir + f"/network-{metric}.rrd"
-            rrdtool.create(
+            self._create(
                 rrd_filename,
-                "--step",
-                self.rrd_step,
                 [f"DS:{interface}:COUNTER:300:0:U" for interface in interfaces],
-                f"RRA:AVERAGE:0.5:{self.rrd_step}:1y",
             )
 
-            print(f"RRD {rrd_filename} created.")
-
     def bootstrap_memory(self):
         """
         bootstrap memory information RRD database
         """
         rrd_filename = self.rrd_dir + "/memory.rrd"
-        rrdtool.create(
+        self._create(
             rrd_filename,
-            "--step",
-            self.rrd_step,
-            "DS:memory_total:GAUGE:300:0:U",
-            "DS:memory_free:GAUGE:300:0:U",
-            "DS:memory_avail:GAUGE:300:0:U",
-            "DS:buffer:GAUGE:300:0:U",
-            "DS:cache:GAUGE:300:0:U",
-            "DS:swap_total:GAUGE:300:0:U",
-            "DS:swap_free:GAUGE:300:0:U",
-            "DS:page_tables:GAUGE:300:0:U",
-            "DS:minor_page_faults:COUNTER:300:0:U",
-            "DS:major_page_faults:COUNTER:300:0:U",
-            f"RRA:AVERAGE:0.5:{self.rrd_step}:1y",
+            [
+                "DS:memory_total:GAUGE:300:0:U",
+                "DS:memory_free:GAUGE:300:0:U",
+                "DS:memory_avail:GAUGE:300:0:U",
+                "DS:buffer:GAUGE:300:0:U",
+                "DS:cache:GAUGE:300:0:U",
+                "DS:swap_total:GAUGE:300:0:U",
+                "DS:swap_free:GAUGE:300:0:U",
+                "DS:page_tables:GAUGE:300:0:U",
+                "DS:minor_page_faults:COUNTER:300:0:U",
+                "DS:major_page_faults:COUNTER:300:0:U",
+            ],
         )
 
-        print(f"RRD {rrd_filename} created.")
-
     def bootstrap_os(self):
         """
         bootstrap OS information RRD database
         """
         rrd_filename = self.rrd_dir + "/os.rrd"
-        rrdtool.create(
+        self._create(
             rrd_filename,
-            "--step",
-            self.rrd_step,
-            "DS:loadavg_1min:GAUGE:300:0:U",
-            "DS:loadavg_5min:GAUGE:300:0:U",
-            "DS:loadavg_15min:GAUGE:300:0:U",
-            "DS:num_used_fd:GAUGE:300:0:U",
-            "DS:num_total_procs:GAUGE:300:0:U",
-            "DS:num_running_procs:GAUGE:300:0:U",
-            "DS:num_blocked_procs:GAUGE:300:0:U",
-            "DS:num_zombie_procs:GAUGE:300:0:U",
-            "DS:num_context_switch:COUNTER:300:0:U",
-            f"RRA:AVERAGE:0.5:{self.rrd_step}:1y",
+            [
+                "DS:loadavg_1min:GAUGE:300:0:U",
+                "DS:loadavg_5min:GAUGE:300:0:U",
+                "DS:loadavg_15min:GAUGE:300:0:U",
+                "DS:num_used_fd:GAUGE:300:0:U",
+                "DS:num_total_procs:GAUGE:300:0:U",
+                "DS:num_running_procs:GAUGE:300:0:U",
+                "DS:num_blocked_procs:GAUGE:300:0:U",
+                "DS:num_zombie_procs:GAUGE:300:0:U",
+                "DS:num_context_switch:COUNTER:300:0:U",
+            ],
         )
 
-        print(f"RRD {rrd_filename} created.")
-
     def bootstrap_tcp(self):
         """
         bootstrap TCP information RRD database
@@ -165,34 +228,63 @@ class Bootstrap:
         ]
 
         for rrd_filename in rrd_filenames:
-            rrdtool.create(
+            self._create(
                 rrd_filename,
-                "--step",
-                self.rrd_step,
                 [f"DS:{metric}:GAUGE:300:0:U" for metric in metrics],
-                f"RRA:AVERAGE:0.5:{self.rrd_step}:1y",
             )
 
-            print(f"RRD {rrd_filename} created.")
-
     def bootstrap_udp(self):
         """
         bootstrap UDP information RRD database
         """
         rrd_filename = self.rrd_dir + "/udp.rrd"
 
-        rrdtool.create(
+        self._create(
             rrd_filename,
-            "--step",
-            self.rrd_step,
-            "DS:InDatagrams:COUNTER:300:0:U",
-            "DS:OutDatagrams:COUNTER:300:0:U",
-            "DS:InErrors:COUNTER:300:0:U",
-            "DS:NoPorts:COUNTER:300:0:U",
-            f"RRA:AVERAGE:0.5:{self.rrd_step}:1y",
+            [
+                "DS:InDatagrams:COUNTER:300:0:U",
+                "DS:OutDatagrams:COUNTER:300:0:U",
+                "DS:InErrors:COUNTER:300:0:U",
+                "DS:NoPorts:COUNTER:300:0:U",
+            ],
         )
 
-        print(f"RRD {rrd_filename} created.")
+    def bootstrap_sockstat(self):
+        """
+        bootstrap socket summary information RRD databases
+        """
+        rrd_metrics = {
+            self.rrd_dir
+            + "/sockstat.rrd": [
+                "sockets_used",
+                "tcp_inuse",
+                "tcp_orphan",
+                "tcp_tw",
+                "tcp_alloc",
+                "tcp_mem",
+                "udp_inuse",
+                "udp_mem",
+                "udplite_inuse",
+                "raw_inuse",
+                "frag_inuse",
+                "frag_memory",
+            ],
+            self.rrd_dir
+            + "/sockstat6.rrd": [
+                "tcp6_inuse",
+                "udp6_inuse",
+                "udplite6_inuse",
+                "raw6_inuse",
+                "frag6_inuse",
+                "frag6_memory",
+            ],
+        }
+
+        for rrd_filename, metrics in rrd_metrics.items():
+            self._create(
+                rrd_filename,
+                [f"DS:{metric}:GAUGE:300:0:U" for metric in metrics],
+            )
 
     def bootstrap_arp(self):
         """
@@ -200,20 +292,51 @@ class Bootstrap:
         """
         rrd_filename = self.rrd_dir + "/arp.rrd"
 
-        rrdtool.create(
+        self._create(
             rrd_filename,
-            "--step",
-            self.rrd_step,
-            "DS:arp_cache_entries:GAUGE:300:0:U",
-            f"RRA:AVERAGE:0.5:{self.rrd_step}:1y",
+            [
+                "DS:arp_cache_entries:GAUGE:300:0:U",
+            ],
         )
 
-        print(f"RRD {rrd_filename} created.")
+    def bootstrap_self(self):
+        """
+        bootstrap poller self metrics RRD database
+        """
+        rrd_filename = self.rrd_dir + "/hms_self.rrd"
+        collectors = [
+            "cpu",
+            "disk",
+            "memory",
+            "os",
+            "network",
+            "tcp",
+            "udp",
+            "arp",
+            "sockstat",
+        ]
+
+        self._create(
+            rrd_filename,
+            [f"DS:poll_{collector}:GAUGE:300:0:U" for collector in collectors]
+            + [
+                "DS:cycle_time:GAUGE:300:0:U",
+                "DS:schedule_lateness:GAUGE:300:0:U",
+                "DS:process_cpu_time:GAUGE:300:0:U",
+                "DS:peak_rss:GAUGE:300:0:U",
+                "DS:files_opened:GAUGE:300:0:U",
+                "DS:files_read:GAUGE:300:0:U",
+                "DS:rrd_update_time:GAUGE:300:0:U",
+            ],
+        )
 
 
-if __name__ == "__main__":
+def main():
+    """
+    entry point of the RRD database bootstrap tool
+    """
     # set up args
-    components = "os,cpu,memory,disk,network,tcp,udp,arp"
+    components = "os,cpu,memory,disk,network,tcp,udp,arp,sockstat,self"
 
     parser = argparse.ArgumentParser(
         description="Host Monitoring Station RRD Database Bootstrap Tool"
@@ -233,10 +356,37 @@ if __name__ == "__main__":
         default=components,
         help=f"Components to be bootstrapped (default: {components})",
     )
+    parser.add_argument(
+        "--layout",
+        type=str,
+        required=False,
+        default="metric",
+        choices=["metric", "device"],
+        help="RRD databases layout of disk and network metrics (default: metric)",
+    )
+    parser.add_argument(
+        "--rra",
+        type=str,
+        required=False,
+        default=hms.utils.rra_tiers,
+        help=f"RRA tiers in resolution:retention format (default: {hms.utils.rra_tiers})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print estimated RRD database sizes without creating RRD databases",
+    )
+    parser.add_argument(
+        "--high-frequency",
+        action="store_true",
+        help="create data sources of high frequency sampling aggregations",
+    )
     args = parser.parse_args()
 
     # create bootstrap object
-    bootstrap = Bootstrap(args.dir, args.step)
+    bootstrap = Bootstrap(
+        args.dir, args.step, args.layout, args.rra, args.dry_run, args.high_frequency
+    )
 
     for component in args.component.split(","):
         if component in "os":
@@ -255,3 +405,15 @@ if __name__ == "__main__":
             bootstrap.bootstrap_udp()
         if component in "arp":
             bootstrap.bootstrap_arp()
+        if component in "sockstat":
+            bootstrap.bootstrap_sockstat()
+        if component in "self":
+            bootstrap.bootstrap_self()
+
+    print(
+        f"RRD databases total {'estimated ' if args.dry_run else ''}size: {bootstrap.rrd_size} bytes."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+
+import hms
+
+
+def main():
+    """
+    entry point of the static export tool
+    """
+    # set up args
+    parser = argparse.ArgumentParser(
+        description="Host Monitoring Station Static Export Tool"
+    )
+    parser.add_argument(
+        "--config", type=str, required=True, help="Host Monitoring Station config file"
+    )
+    parser.add_argument(
+        "--dir",
+        type=str,
+        required=False,
+        default=None,
+        help="export directory (default: EXPORT_DIR in config file)",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="print export information"
+    )
+    args = parser.parse_args()
+
+    config = hms.utils.read_config(args.config)
+    export_dir = args.dir or config.get("EXPORT_DIR")
+    if not export_dir:
+        print("ERROR: export directory is not set", file=sys.stderr)
+        sys.exit(1)
+
+    export = hms.export.Export(
+        export_dir,
+        config["RRD_DB_PATH"],
+        config.get("EXPORT_VIEWS"),
+        hms.utils.template_dir,
+        config.get("RRDCACHED_ADDRESS"),
+        config.get("RRD_LAYOUT", "metric"),
+        config.get("EXPORT_KEEP_RELEASES", 3),
+    )
+
+    try:
+        export.export()
+    except Exception as e:
+        print(f"ERROR: failed to export: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.verbose:
+        print(
+            f"INFO: exported into {export.export_dir}, {export.rendered} graphs rendered, {export.reused} graphs reused"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,519 @@
 #!/usr/bin/env python3
 
 import argparse
-import importlib.util
+import glob
+import math
 import os
+import resource
 import rrdtool
+import signal
 import sys
+import threading
+import time
 
-# load host monitoring station module - hms
-spec = importlib.util.spec_from_file_location("hms", f"{os.getcwd()}/hms/__init__.py")
-hms = importlib.util.module_from_spec(spec)
-sys.modules[spec.name] = hms
-spec.loader.exec_module(hms)
+import hms
 
 
 class Metrics:
-    def __init__(self, config_file):
+    def __init__(self, config_file, verbose=False):
         self.config = hms.utils.read_config(config_file)
+        self.verbose = verbose
+        # procfs and sysfs mount points, e.g. a synthetic fixture or a host /proc mounted
+        # in a container
+        hms.procfs.set_root(self.config.get("PROC_ROOT"), self.config.get("SYS_ROOT"))
+        # RRD databases layout of disk and network metrics - metric or device
+        self.rrd_layout = self.config.get("RRD_LAYOUT", "metric")
+        self.fdpool = hms.procfs.FDPool()
+        self.snapshot = None
+        self.cycle = 0
+        self.timestamp = "N"
+        self.collector_times = {}
+        # format: [collector name: RRD database filename patterns]
+        self.collectors = {
+            "cpu": ["cpu-*.rrd"],
+            "disk": ["disk-*.rrd", "disk/*.rrd"],
+            "memory": ["memory.rrd"],
+            "os": ["os.rrd"],
+            "network": ["network-*.rrd", "network/*.rrd"],
+            "tcp": ["tcp.rrd", "tcp6.rrd"],
+            "udp": ["udp.rrd"],
+            "arp": ["arp.rrd"],
+            "sockstat": ["sockstat.rrd", "sockstat6.rrd"],
+        }
+        # collectors enabled in config, collector modules are only imported when they
+        # run, so disabled collectors are never loaded
+        if self.config.get("COLLECTORS"):
+            enabled_collectors = [
+                collector.strip() for collector in self.config["COLLECTORS"].split(",")
+            ]
+            for collector in enabled_collectors:
+                if collector not in self.collectors:
+                    print(
+                        f"WARNING: unknown collector {collector} in config",
+                        file=sys.stderr,
+                    )
+            self.collectors = {
+                collector: rrd_filename_patterns
+                for collector, rrd_filename_patterns in self.collectors.items()
+                if collector in enabled_collectors
+            }
+        # collector threads which are still running after timeout
+        self.overrun_collectors = {}
+        # RRD updates of the collector running in the current thread
+        self.local = threading.local()
+        # RRD updates are sent to rrdcached in one batch per cycle if it's configured
+        self.rrdcached = None
+        self.rrdcached_updates = []
+        self.rrd_ds_index = {}
+        if self.config.get("RRDCACHED_ADDRESS"):
+            self.rrdcached = hms.rrdcached.RRDCached(self.config["RRDCACHED_ADDRESS"])
+        # static export is run in a background thread after a polling cycle in which
+        # all collectors are completed, if export directory is configured
+        self.export = None
+        self.export_thread = None
+        if self.config.get("EXPORT_DIR"):
+            self.export = hms.export.Export(
+                self.config["EXPORT_DIR"],
+                self.config["RRD_DB_PATH"],
+                self.config.get("EXPORT_VIEWS"),
+                hms.utils.template_dir,
+                self.config.get("RRDCACHED_ADDRESS"),
+                self.rrd_layout,
+                self.config.get("EXPORT_KEEP_RELEASES", 3),
+            )
+        # poller self metrics are written into hms_self.rrd if it's bootstrapped, RRD
+        # update time of the current cycle and process CPU time at the previous cycle
+        self.self_rrd_filename = self.config["RRD_DB_PATH"] + "/hms_self.rrd"
+        self.rrd_update_time = 0.0
+        self.process_time = time.process_time()
+        # metrics are sampled at a sub-second interval between polling cycles in daemon
+        # mode, min / max / avg of each step are written into additional data sources
+        # - {RRD database filename: {data source: value}}
+        self.sampler = None
+        self.sampler_fdpool = hms.procfs.FDPool()
+        self.hf_values = {}
+        # recent samples are published into a shared memory ring buffer for live views
+        # if ring buffer path is configured - {metric name: value} of the current cycle
+        self.ring = None
+        self.ring_samples = {}
+        self.ring_metrics = {}
+        if self.config.get("RING_BUFFER_PATH"):
+            try:
+                step = hms.utils.get_rrd_step(self.config["RRD_DB_PATH"] + "/os.rrd")
+            except Exception:
+                step = 60
+            self.ring = hms.ring.RingBufferWriter(
+                self.config["RING_BUFFER_PATH"],
+                int(self.config.get("RING_BUFFER_SIZE", 60)),
+                step,
+            )
+
+    def start_sampler(self):
+        """
+        start high frequency sampling in a background thread if sampling interval is
+        configured. aggregations are written into RRD databases in each polling cycle
+        """
+        interval = float(self.config.get("HF_SAMPLING_INTERVAL") or 0)
+        if interval <= 0:
+            return
+
+        self.sampler = hms.sampler.Sampler(
+            interval, float(self.config.get("HF_CPU_BUDGET", 0.02)), self.verbose
+        )
+        self.sampler.start(self._sample_metrics)
+
+    def stop_sampler(self):
+        """
+        stop high frequency sampling
+        """
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def _sample_metrics(self, timestamp):
+        """
+        sample metrics of high frequency sampling into the sampler
+        """
+        # sampler thread has its own file descriptor pool
+        snapshot = hms.procfs.Snapshot(self.sampler_fdpool)
+        rrd_db_path = self.config["RRD_DB_PATH"]
+
+        # only subsystems of enabled collectors are sampled
+        if "cpu" in self.collectors:
+            cpu_obj = hms.cpu.CPU(snapshot)
+            for metric, ds_type in hms.sampler.sampled_metrics["cpu"].items():
+                self.sampler.add(
+                    timestamp,
+                    rrd_db_path + f"/cpu-{metric}.rrd",
+                    cpu_obj.cpus,
+                    [cpu_obj.cpu[metric][cpu_name] for cpu_name in cpu_obj.cpus],
+                    ds_type,
+                )
+
+        if "os" in self.collectors:
+            os_obj = hms.os.OS(snapshot, scan_procs=False)
+            os_values = {**os_obj.loadavg, **os_obj.context_switch}
+            for metric, ds_type in hms.sampler.sampled_metrics["os"].items():
+                self.sampler.add(
+                    timestamp,
+                    rrd_db_path + "/os.rrd",
+                    [metric],
+                    [os_values[metric]],
+                    ds_type,
+                )
+
+        if "network" in self.collectors:
+            network_obj = hms.network.Network(
+                snapshot, self.config.get("NETWORK_BACKEND", "sysfs")
+            )
+            interfaces = network_obj.interfaces
+            network = network_obj.network
+            for metric, ds_type in hms.sampler.sampled_metrics["network"].items():
+                if self.rrd_layout == "device":
+                    for interface in interfaces:
+                        self.sampler.add(
+                            timestamp,
+                            rrd_db_path + f"/network/{interface}.rrd",
+                            [metric],
+                            [network[metric][interface]],
+                            ds_type,
+                        )
+                    continue
+
+                self.sampler.add(
+                    timestamp,
+                    rrd_db_path + f"/network-{metric}.rrd",
+                    interfaces,
+                    [network[metric][interface] for interface in interfaces],
+                    ds_type,
+                )
+
+        self.sampler_fdpool.release_unused()
+
+    def _get_collector_timeout(self, collector):
+        """
+        get collector timeout in seconds from config
+        """
+        collector_timeouts = self.config.get("COLLECTOR_TIMEOUTS") or {}
+
+        return float(
+            collector_timeouts.get(collector, self.config.get("COLLECTOR_TIMEOUT", 30))
+        )
+
+    def _run_collector(self, collector, results):
+        """
+        run collector in a worker thread, RRD updates are kept in results
+        """
+        self.local.rrd_updates = []
+        start = time.monotonic()
+
+        try:
+            getattr(self, f"poll_{collector}_metrics")()
+        except Exception as e:
+            print(
+                f"ERROR: failed to poll {collector} metrics: {str(e)}",
+                file=sys.stderr,
+            )
+
+        results[collector] = (self.local.rrd_updates, time.monotonic() - start)
+
+    def _run_export(self):
+        """
+        run static export in a background thread
+        """
+        start = time.monotonic()
+
+        try:
+            self.export.export()
+        except Exception as e:
+            print(f"ERROR: failed to export: {str(e)}", file=sys.stderr)
+            return
+
+        if self.verbose:
+            print(
+                f"INFO: exported into {self.export.export_dir} in {time.monotonic() - start:.3f}s, {self.export.rendered} graphs rendered, {self.export.reused} graphs reused"
+            )
+
+    def _start_export(self):
+        """
+        start static export unless the previous export is still running
+        """
+        if self.export_thread is not None and self.export_thread.is_alive():
+            print(
+                "WARNING: export is still running from previous cycle",
+                file=sys.stderr,
+            )
+            return
+
+        self.export_thread = threading.Thread(
+            target=self._run_export, name="hms-export", daemon=True
+        )
+        self.export_thread.start()
+
+    def join_export(self):
+        """
+        wait for the running static export
+        """
+        if self.export_thread is not None:
+            self.export_thread.join()
+
+    def _rrd_update_unknown(self, collector):
+        """
+        update RRD databases of a collector with unknown values
+        """
+        for rrd_filename_pattern in self.collectors[collector]:
+            for rrd_filename in glob.glob(
+                self.config["RRD_DB_PATH"] + "/" + rrd_filename_pattern
+            ):
+                try:
+                    metrics_list = hms.utils.get_rrd_ds(rrd_filename)
+                except Exception as e:
+                    print(
+                        f"ERROR: failed to get data sources of the RRD database {rrd_filename}: {str(e)}",
+                        file=sys.stderr,
+                    )
+                else:
+                    self._rrd_write(
+                        metrics_list, [None] * len(metrics_list), rrd_filename
+                    )
+
+    def poll(self, lateness=None):
+        """
+        run one polling cycle across all components
+
+        collectors are running concurrently in worker threads. a collector which does
+        not finish within its timeout writes unknown values in this cycle, and is not
+        started again until the previous run is finished. file descriptors of the pool
+        are not released while it's running. lateness is the delay of the scheduler tick
+        in seconds in daemon mode.
+        """
+        # procfs / sysfs files are read once and shared by all components in a cycle.
+        # file descriptors are kept open in the pool and re-read in next cycles
+        self.snapshot = hms.procfs.Snapshot(self.fdpool)
+        # all RRD databases are updated with the timestamp of the cycle start
+        self.timestamp = str(int(time.time()))
+        self.collector_times = {}
+        self.ring_samples = {}
+        # aggregations of high frequency samples since the previous cycle
+        self.hf_values = self.sampler.collect() if self.sampler is not None else {}
+
+        cycle_start = time.monotonic()
+        fdpool_files_opened = self.fdpool.files_opened
+        self.rrd_update_time = 0.0
+        results = {}
+        threads = {}
+        completed = True
+
+        for collector in self.collectors:
+            if collector in self.overrun_collectors:
+                if self.overrun_collectors[collector].is_alive():
+                    print(
+                        f"WARNING: {collector} collector is still running from previous cycle",
+                        file=sys.stderr,
+                    )
+                    self._rrd_update_unknown(collector)
+                    completed = False
+                    continue
+                else:
+                    del self.overrun_collectors[collector]
+
+            threads[collector] = threading.Thread(
+                target=self._run_collector,
+                args=(collector, results),
+                name=f"hms-{collector}",
+                daemon=True,
+            )
+            threads[collector].start()
+
+        for collector, thread in threads.items():
+            timeout = self._get_collector_timeout(collector)
+            thread.join(max(0, cycle_start + timeout - time.monotonic()))
+
+            if thread.is_alive():
+                print(
+                    f"WARNING: {collector} collector timed out after {timeout}s",
+                    file=sys.stderr,
+                )
+                self.overrun_collectors[collector] = thread
+                self._rrd_update_unknown(collector)
+                completed = False
+                continue
+
+            rrd_updates, collector_time = results[collector]
+            self.collector_times[collector] = collector_time
+            for rrd_update in rrd_updates:
+                self._rrd_write(*rrd_update)
+
+        if self.rrdcached is not None:
+            self._rrdcached_flush_updates()
+
+        if self.verbose:
+            for collector, collector_time in self.collector_times.items():
+                print(f"INFO: {collector} collector completed in {collector_time:.3f}s")
+
+        # release file descriptors of removed devices. collectors which are still running
+        # after timeout keep reading from the pool, so nothing is released until they
+        # are finished
+        if not any(thread.is_alive() for thread in self.overrun_collectors.values()):
+            self.fdpool.release_unused()
+
+        if self.verbose:
+            print(
+                f"INFO: read {self.snapshot.files_read} procfs/sysfs files, {self.snapshot.bytes_read} bytes, {self.fdpool.opened()} file descriptors in pool"
+            )
+
+        self._rrd_write_self(cycle_start, lateness, fdpool_files_opened)
+
+        if self.ring is not None:
+            self._ring_write()
+
+        if self.export is not None and completed:
+            self._start_export()
+
+        self.cycle += 1
 
     def _rrd_update(self, metrics_list, metrics_values, rrd_filename):
         """
         update RRD database wrapper
+
+        updates from a collector running in a worker thread are deferred until the
+        collector is finished.
+        """
+        rrd_updates = getattr(self.local, "rrd_updates", None)
+        if rrd_updates is not None:
+            rrd_updates.append((metrics_list, metrics_values, rrd_filename))
+        else:
+            self._rrd_write(metrics_list, metrics_values, rrd_filename)
+
+    def _ring_write(self):
         """
+        write samples of the current cycle into ring buffer
+
+        metric types of new metrics are read from RRD databases, so readers can convert
+        counter values into rates
+        """
+        new_metrics = {}
+        for rrd_filename, (_, metric_types) in self.ring_metrics.items():
+            if None not in metric_types.values():
+                continue
+            try:
+                ds_types = hms.utils.get_rrd_ds_types(rrd_filename)
+            except Exception:
+                ds_types = {}
+            for metric, metric_type in metric_types.items():
+                if metric_type is None:
+                    metric_types[metric] = hms.ring.metric_types.get(
+                        ds_types.get(metric), hms.ring.metric_types["GAUGE"]
+                    )
+                    new_metrics[self._ring_metric_name(rrd_filename, metric)] = (
+                        metric_types[metric]
+                    )
+
+        try:
+            self.ring.write(float(self.timestamp), self.ring_samples, new_metrics)
+        except Exception as e:
+            print(
+                f"ERROR: failed to write the ring buffer {self.ring.path}: {str(e)}",
+                file=sys.stderr,
+            )
+
+    def _ring_metric_name(self, rrd_filename, metric):
+        """
+        get metric name in ring buffer, e.g. network/eth0:rx_bytes
+        """
+        prefix = self.ring_metrics[rrd_filename][0]
+        return f"{prefix}:{metric}"
+
+    def _ring_record(self, metrics_list, metrics_values, rrd_filename):
+        """
+        record values of the current cycle for ring buffer
+        """
+        # format: {RRD database filename: (metric name prefix, {metric: metric type})},
+        # metric type is None until it's read from the RRD database
+        if rrd_filename not in self.ring_metrics:
+            prefix = os.path.relpath(rrd_filename, self.config["RRD_DB_PATH"])[:-4]
+            self.ring_metrics[rrd_filename] = (prefix, {})
+        metric_types = self.ring_metrics[rrd_filename][1]
+
+        for metric, value in zip(metrics_list, metrics_values):
+            metric_types.setdefault(metric, None)
+            self.ring_samples[self._ring_metric_name(rrd_filename, metric)] = (
+                math.nan if value is None else float(value)
+            )
+
+    def _rrd_write_self(self, cycle_start, lateness, fdpool_files_opened):
+        """
+        write poller self metrics of the current cycle into hms_self.rrd
+
+        collector times are unknown if collectors are timed out. process CPU time
+        includes background threads, e.g. high frequency sampler and static export
+        """
+        if not os.path.exists(self.self_rrd_filename):
+            return
+
+        # files opened by the pool in this cycle and files opened outside of the pool,
+        # e.g. /proc/<pid>/stat files of the process scan
+        files_opened = (
+            self.fdpool.files_opened - fdpool_files_opened + self.snapshot.files_opened
+        )
+        process_time = time.process_time()
+        metrics_values = {
+            f"poll_{collector}": self.collector_times.get(collector)
+            for collector in self.collectors
+        }
+        metrics_values.update(
+            {
+                "cycle_time": time.monotonic() - cycle_start,
+                "schedule_lateness": lateness,
+                "process_cpu_time": process_time - self.process_time,
+                # ru_maxrss is in kilobytes on Linux
+                "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+                "files_opened": files_opened,
+                "files_read": self.snapshot.files_read,
+                "rrd_update_time": self.rrd_update_time,
+            }
+        )
+        self.process_time = process_time
+
+        self._rrd_write(
+            list(metrics_values), list(metrics_values.values()), self.self_rrd_filename
+        )
+        if self.rrdcached is not None:
+            self._rrdcached_flush_updates()
+
+    def _add_hf_values(self, metrics_list, metrics_values, rrd_filename):
+        """
+        add aggregations of high frequency samples to values of a RRD database update
+
+        aggregations are only written if their data sources are bootstrapped
+        """
+        try:
+            ds_index = hms.utils.get_rrd_ds_index(rrd_filename)
+        except Exception:
+            return metrics_list, metrics_values
+
+        hf_values = self.hf_values[rrd_filename]
+        hf_metrics = [
+            metric
+            for metric in hf_values
+            if metric in ds_index and metric not in metrics_list
+        ]
+
+        return list(metrics_list) + hf_metrics, list(metrics_values) + [
+            hf_values[metric] for metric in hf_metrics
+        ]
+
+    def _rrd_write(self, metrics_list, metrics_values, rrd_filename):
+        """
+        write values to RRD database
+        """
+        if rrd_filename in self.hf_values:
+            metrics_list, metrics_values = self._add_hf_values(
+                metrics_list, metrics_values, rrd_filename
+            )
+
+        if self.ring is not None:
+            self._ring_record(metrics_list, metrics_values, rrd_filename)
+
         # generating data source string
         rrd_ds = ":".join(metrics_list)
 
@@ -35,18 +528,101 @@ class Metrics:
 
         metrics_values_string = ":".join(metrics_values_bucket)
 
+        if self.rrdcached is not None:
+            self._rrdcached_queue_update(
+                metrics_list, metrics_values_bucket, rrd_filename
+            )
+            return
+
+        start = time.monotonic()
         try:
             rrdtool.update(
                 rrd_filename,
                 "--template",
                 rrd_ds,
-                f"N:{metrics_values_string}",
+                f"{self.timestamp}:{metrics_values_string}",
             )
         except Exception as e:
             print(
                 f"ERROR: failed to update the RRD database {rrd_filename}: {str(e)}",
                 file=sys.stderr,
             )
+        self.rrd_update_time += time.monotonic() - start
+
+    def _rrdcached_queue_update(self, metrics_list, metrics_values, rrd_filename):
+        """
+        queue RRD update for rrdcached
+
+        rrdcached does not support templates, so values are ordered by the data source
+        index of the RRD database and missing data sources are set to unknown.
+        """
+        try:
+            if rrd_filename not in self.rrd_ds_index or not set(metrics_list).issubset(
+                self.rrd_ds_index[rrd_filename]
+            ):
+                self.rrd_ds_index[rrd_filename] = hms.utils.get_rrd_ds_index(
+                    rrd_filename
+                )
+        except Exception as e:
+            print(
+                f"ERROR: failed to update the RRD database {rrd_filename}: {str(e)}",
+                file=sys.stderr,
+            )
+            return
+
+        ds_index = self.rrd_ds_index[rrd_filename]
+        unknown_ds = [metric for metric in metrics_list if metric not in ds_index]
+        if unknown_ds:
+            print(
+                f"ERROR: failed to update the RRD database {rrd_filename}: unknown data source {','.join(unknown_ds)}",
+                file=sys.stderr,
+            )
+            return
+
+        metrics_values_mapping = dict(zip(metrics_list, metrics_values))
+        metrics_values_bucket = []
+        for ds in ds_index:
+            metrics_values_bucket.append(metrics_values_mapping.get(ds, "U"))
+
+        self.rrdcached_updates.append(
+            (rrd_filename, f"{self.timestamp}:{':'.join(metrics_values_bucket)}")
+        )
+
+    def _rrdcached_flush_updates(self):
+        """
+        send queued RRD updates to rrdcached in one batch
+
+        RRD databases are updated directly if rrdcached is not available, values are
+        in the order of data sources so no template is needed
+        """
+        rrd_updates = self.rrdcached_updates
+        self.rrdcached_updates = []
+
+        start = time.monotonic()
+        try:
+            errors = self.rrdcached.update(rrd_updates)
+        except Exception as e:
+            print(
+                f"WARNING: failed to send updates to rrdcached {self.rrdcached.address}, updating RRD databases directly: {str(e)}",
+                file=sys.stderr,
+            )
+            for rrd_filename, values in rrd_updates:
+                try:
+                    rrdtool.update(rrd_filename, values)
+                except Exception as e:
+                    print(
+                        f"ERROR: failed to update the RRD database {rrd_filename}: {str(e)}",
+                        file=sys.stderr,
+                    )
+            return
+        finally:
+            self.rrd_update_time += time.monotonic() - start
+
+        for rrd_filename, error in errors:
+            print(
+                f"ERROR: rrdcached failed to update the RRD database {rrd_filename}: {error}",
+                file=sys.stderr,
+            )
 
     def poll_cpu_metrics(self):
         """
@@ -58,7 +634,7 @@ class Metrics:
         ]
 
         # populate metrics
-        cpu_obj = hms.cpu.CPU()
+        cpu_obj = hms.cpu.CPU(self.snapshot)
         cpus = cpu_obj.cpus
         cpu = cpu_obj.cpu
 
@@ -86,15 +662,50 @@ class Metrics:
             "write_sector",
             "in_flight",
         ]
+        # extended metrics are only updated if the RRD databases are bootstrapped
+        extended_metrics = [
+            "read_ticks",
+            "write_ticks",
+            "io_ticks",
+            "time_in_queue",
+            "discard_io",
+            "discard_merge",
+            "discard_sector",
+            "discard_ticks",
+            "flush_io",
+            "flush_ticks",
+        ]
 
         # populate metrics
-        disk_obj = hms.disk.Disk()
+        disk_obj = hms.disk.Disk(self.snapshot)
         disk_devices = disk_obj.disk_devices
         disk = disk_obj.disk
 
         # update RRD databases
-        for metric in metrics:
+        if self.rrd_layout == "device":
+            # one RRD database per disk device, devices which are not bootstrapped
+            # are skipped
+            for disk_device in disk_devices:
+                rrd_filename = self.config["RRD_DB_PATH"] + f"/disk/{disk_device}.rrd"
+                if not os.path.exists(rrd_filename):
+                    continue
+
+                metric_values = []
+                for metric in metrics + extended_metrics:
+                    metric_values.append(disk[metric][disk_device])
+
+                # update RRD database
+                self._rrd_update(
+                    metrics + extended_metrics, metric_values, rrd_filename
+                )
+
+            return
+
+        for metric in metrics + extended_metrics:
             rrd_filename = self.config["RRD_DB_PATH"] + f"/disk-{metric}.rrd"
+            if metric in extended_metrics and not os.path.exists(rrd_filename):
+                continue
+
             metric_values = []
             for disk_device in disk_devices:
                 metric_values.append(disk[metric][disk_device])
@@ -126,8 +737,9 @@ class Metrics:
         rrd_filename = self.config["RRD_DB_PATH"] + "/memory.rrd"
 
         # populate metrics
-        memory = hms.memory.Memory().memory
-        virtual_memory = hms.memory.Memory().virtual_memory
+        memory_obj = hms.memory.Memory(self.snapshot)
+        memory = memory_obj.memory
+        virtual_memory = memory_obj.virtual_memory
         metric_values = []
 
         for metric in memory_metrics:
@@ -154,11 +766,30 @@ class Metrics:
         ]
 
         # populate metrics
-        network_obj = hms.network.Network()
+        network_obj = hms.network.Network(
+            self.snapshot, self.config.get("NETWORK_BACKEND", "sysfs")
+        )
         interfaces = network_obj.interfaces
         network = network_obj.network
 
         # update RRD databases
+        if self.rrd_layout == "device":
+            # one RRD database per network interface, interfaces which are not
+            # bootstrapped are skipped
+            for interface in interfaces:
+                rrd_filename = self.config["RRD_DB_PATH"] + f"/network/{interface}.rrd"
+                if not os.path.exists(rrd_filename):
+                    continue
+
+                metric_values = []
+                for metric in metrics:
+                    metric_values.append(network[metric][interface])
+
+                # update RRD database
+                self._rrd_update(metrics, metric_values, rrd_filename)
+
+            return
+
         for metric in metrics:
             rrd_filename = self.config["RRD_DB_PATH"] + f"/network-{metric}.rrd"
             metric_values = []
@@ -186,10 +817,11 @@ class Metrics:
         rrd_filename = self.config["RRD_DB_PATH"] + "/os.rrd"
 
         # populate metrics
-        loadavg = hms.os.OS().loadavg
-        fd = hms.os.OS().fd
-        procs = hms.os.OS().procs
-        context_switch = hms.os.OS().context_switch
+        os_obj = hms.os.OS(self.snapshot)
+        loadavg = os_obj.loadavg
+        fd = os_obj.fd
+        procs = os_obj.procs
+        context_switch = os_obj.context_switch
         metric_values = []
 
         for metric in loadavg_metrics:
@@ -224,10 +856,27 @@ class Metrics:
             "NEW_SYN_RECV",
         ]
 
+        # throttle TCP socket states scan on busy hosts. the scan only runs every
+        # TCP_STATE_SCAN_INTERVAL cycles if the number of TCP sockets reaches
+        # TCP_STATE_SCAN_THRESHOLD
+        scan_interval = int(self.config.get("TCP_STATE_SCAN_INTERVAL", 1))
+        scan_threshold = int(self.config.get("TCP_STATE_SCAN_THRESHOLD", 0))
+
+        if scan_interval > 1 and self.cycle % scan_interval != 0:
+            sockstat_obj = hms.sockstat.Sockstat(self.snapshot)
+            sockets = 0
+            for metric in ["tcp_inuse", "tcp_tw"]:
+                sockets += int(sockstat_obj.sockstat[metric] or 0)
+            sockets += int(sockstat_obj.sockstat6["tcp6_inuse"] or 0)
+
+            if sockets >= scan_threshold:
+                return
+
         # populate metrics
-        tcp = hms.tcp.TCP().tcp
+        tcp_obj = hms.tcp.TCP(self.snapshot, self.config.get("TCP_BACKEND", "netlink"))
+        tcp = tcp_obj.tcp
         tcp_metric_values = []
-        tcp6 = hms.tcp.TCP().tcp6
+        tcp6 = tcp_obj.tcp6
         tcp6_metric_values = []
 
         for metric in metrics:
@@ -256,7 +905,7 @@ class Metrics:
         rrd_filename = self.config["RRD_DB_PATH"] + "/udp.rrd"
 
         # populate metrics
-        udp = hms.udp.UDP().udp
+        udp = hms.udp.UDP(self.snapshot).udp
         metric_values = []
 
         for metric in metrics:
@@ -276,7 +925,7 @@ class Metrics:
         rrd_filename = self.config["RRD_DB_PATH"] + "/arp.rrd"
 
         # populate metrics
-        arp = hms.arp.ARP().arp
+        arp = hms.arp.ARP(self.snapshot).arp
         metric_values = []
 
         for metric in metrics:
@@ -285,8 +934,140 @@ class Metrics:
         # update RRD database
         self._rrd_update(metrics, metric_values, rrd_filename)
 
+    def poll_sockstat_metrics(self):
+        """
+        populate socket summary information and write to sockstat RRD databases
+        """
+        # initialize environment variables
+        sockstat_metrics = [
+            "sockets_used",
+            "tcp_inuse",
+            "tcp_orphan",
+            "tcp_tw",
+            "tcp_alloc",
+            "tcp_mem",
+            "udp_inuse",
+            "udp_mem",
+            "udplite_inuse",
+            "raw_inuse",
+            "frag_inuse",
+            "frag_memory",
+        ]
+        sockstat6_metrics = [
+            "tcp6_inuse",
+            "udp6_inuse",
+            "udplite6_inuse",
+            "raw6_inuse",
+            "frag6_inuse",
+            "frag6_memory",
+        ]
+        rrd_filename = self.config["RRD_DB_PATH"] + "/sockstat.rrd"
+        rrd6_filename = self.config["RRD_DB_PATH"] + "/sockstat6.rrd"
 
-if __name__ == "__main__":
+        # sockstat RRD databases are only updated if they are bootstrapped
+        if not os.path.exists(rrd_filename) and not os.path.exists(rrd6_filename):
+            return
+
+        # populate metrics
+        sockstat_obj = hms.sockstat.Sockstat(self.snapshot)
+        sockstat = sockstat_obj.sockstat
+        sockstat_metric_values = []
+        sockstat6 = sockstat_obj.sockstat6
+        sockstat6_metric_values = []
+
+        for metric in sockstat_metrics:
+            sockstat_metric_values.append(sockstat[metric])
+        for metric in sockstat6_metrics:
+            sockstat6_metric_values.append(sockstat6[metric])
+
+        # update RRD databases, each of them is only updated if it's bootstrapped
+        if os.path.exists(rrd_filename):
+            self._rrd_update(sockstat_metrics, sockstat_metric_values, rrd_filename)
+        if os.path.exists(rrd6_filename):
+            self._rrd_update(sockstat6_metrics, sockstat6_metric_values, rrd6_filename)
+
+
+class Scheduler:
+    def __init__(self, step, verbose=False):
+        self.step = step
+        self.verbose = verbose
+        self.running = True
+
+    def stop(self, signum=None, frame=None):
+        """
+        stop the scheduler once the current cycle is completed
+        """
+        self.running = False
+
+    def _sleep_until(self, deadline):
+        """
+        sleep until the monotonic clock reaches the deadline
+        """
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 1.0))
+
+    def run(self, cycle):
+        """
+        run cycle on every step boundary until stopped
+
+        ticks are scheduled on the monotonic clock and aligned to the RRD step
+        boundary, so the polling period does not drift by the cycle duration.
+        cycles are executed one by one in this loop so they never overlap. cycle is
+        called with the lateness of the tick in seconds.
+        """
+        # align the first tick to the next step boundary of the wall clock
+        wall_now = time.time()
+        next_tick = time.monotonic() + (self.step - wall_now % self.step)
+
+        while self.running:
+            self._sleep_until(next_tick)
+            if not self.running:
+                break
+
+            # check whether the tick is fired late
+            lateness = time.monotonic() - next_tick
+            if lateness >= self.step:
+                missed_ticks = int(lateness // self.step)
+                print(
+                    f"WARNING: missed {missed_ticks} tick(s), {lateness:.3f}s behind schedule",
+                    file=sys.stderr,
+                )
+                next_tick += missed_ticks * self.step
+            elif lateness > self.step * 0.1:
+                print(
+                    f"WARNING: tick fired late by {lateness:.3f}s",
+                    file=sys.stderr,
+                )
+
+            # run polling cycle
+            cycle_start = time.monotonic()
+            try:
+                cycle(lateness)
+            except Exception as e:
+                print(f"ERROR: polling cycle failed: {str(e)}", file=sys.stderr)
+            cycle_time = time.monotonic() - cycle_start
+
+            if self.verbose:
+                print(f"INFO: polling cycle completed in {cycle_time:.3f}s")
+
+            # skip ticks which are already passed during the cycle
+            next_tick += self.step
+            if time.monotonic() >= next_tick:
+                overrun_ticks = int((time.monotonic() - next_tick) // self.step) + 1
+                print(
+                    f"WARNING: polling cycle took {cycle_time:.3f}s and overran {overrun_ticks} tick(s)",
+                    file=sys.stderr,
+                )
+                next_tick += overrun_ticks * self.step
+
+
+def main():
+    """
+    entry point of the metrics poller
+    """
     # set up args
     parser = argparse.ArgumentParser(
         description="Host Monitoring Station Metrics Poller"
@@ -294,17 +1075,51 @@ if __name__ == "__main__":
     parser.add_argument(
         "--config", type=str, required=True, help="Host Monitoring Station config file"
     )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and poll metrics on every RRD step",
+    )
+    parser.add_argument(
+        "--step",
+        type=str,
+        required=False,
+        default=None,
+        help="polling step in daemon mode (default: step of RRD databases)",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="print polling cycle information"
+    )
     args = parser.parse_args()
 
     # create metrics object
-    metrics = Metrics(args.config)
-
-    # populate memory metrics
-    metrics.poll_cpu_metrics()
-    metrics.poll_disk_metrics()
-    metrics.poll_memory_metrics()
-    metrics.poll_os_metrics()
-    metrics.poll_network_metrics()
-    metrics.poll_tcp_metrics()
-    metrics.poll_udp_metrics()
-    metrics.poll_arp_metrics()
+    metrics = Metrics(args.config, args.verbose)
+
+    if args.daemon:
+        # use the step of RRD databases if step is not provided
+        if args.step:
+            step = hms.utils.parse_step(args.step)
+        else:
+            try:
+                step = hms.utils.get_rrd_step(metrics.config["RRD_DB_PATH"] + "/os.rrd")
+            except Exception as e:
+                print(
+                    f"ERROR: failed to get step from the RRD database: {str(e)}",
+                    file=sys.stderr,
+                )
+                sys.exit(1)
+
+        scheduler = Scheduler(step, args.verbose)
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        metrics.start_sampler()
+        scheduler.run(metrics.poll)
+        metrics.stop_sampler()
+    else:
+        # populate metrics
+        metrics.poll()
+        metrics.join_export()
+
+
+if __name__ == "__main__":
+    main()
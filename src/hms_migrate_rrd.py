@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+
+import argparse
+import glob
+import os
+import re
+import rrdtool
+import sys
+
+import hms
+
+
+class Migration:
+    def __init__(
+        self, rrd_dir, layout=None, rra_tiers=hms.utils.rra_tiers, dry_run=False
+    ):
+        self.rrd_dir = rrd_dir
+        # target RRD databases layout of disk and network metrics - metric or device
+        self.rrd_layout = layout
+        self.rra_tiers = rra_tiers
+        self.dry_run = dry_run
+
+    def _get_rrd_schema(self, rrd_filename):
+        """
+        get step, data source definitions and RRA definitions from RRD database
+        """
+        rrd_info = rrdtool.info(rrd_filename)
+        ds = {}
+        rra = []
+
+        for ds_name in hms.utils.get_rrd_ds_index(rrd_filename):
+            ds_min = rrd_info[f"ds[{ds_name}].min"]
+            ds_max = rrd_info[f"ds[{ds_name}].max"]
+            ds[ds_name] = ":".join(
+                [
+                    rrd_info[f"ds[{ds_name}].type"],
+                    str(rrd_info[f"ds[{ds_name}].minimal_heartbeat"]),
+                    "U" if ds_min is None else str(ds_min),
+                    "U" if ds_max is None else str(ds_max),
+                ]
+            )
+
+        count = 0
+        while f"rra[{count}].cf" in rrd_info:
+            rra.append(
+                f"RRA:{rrd_info[f'rra[{count}].cf']}:{rrd_info[f'rra[{count}].xff']}"
+                + f":{rrd_info[f'rra[{count}].pdp_per_row']}:{rrd_info[f'rra[{count}].rows']}"
+            )
+            count += 1
+
+        return int(rrd_info["step"]), ds, rra
+
+    def _get_sources(self, subsystem):
+        """
+        get source RRD databases of a subsystem - {source name: RRD database filename}
+
+        source name is the metric name in metric layout, or the device name in device layout
+        """
+        if self.rrd_layout == "device":
+            rrd_filenames = glob.glob(self.rrd_dir + f"/{subsystem}-*.rrd")
+            prefix_length = len(subsystem) + 1
+        else:
+            rrd_filenames = glob.glob(self.rrd_dir + f"/{subsystem}/*.rrd")
+            prefix_length = 0
+
+        return {
+            os.path.basename(rrd_filename)[prefix_length : -len(".rrd")]: rrd_filename
+            for rrd_filename in sorted(rrd_filenames)
+        }
+
+    def migrate(self, subsystem):
+        """
+        migrate RRD databases of a subsystem into the target layout
+
+        data sources are copied with rrdtool create --source, so the history of existing
+        RRD databases is kept. existing RRD databases are not removed.
+        """
+        sources = self._get_sources(subsystem)
+        if not sources:
+            print(
+                f"WARNING: no {subsystem} RRD databases found to migrate",
+                file=sys.stderr,
+            )
+            return
+
+        # all source RRD databases share the same step and RRA definitions
+        schemas = {
+            source: self._get_rrd_schema(rrd_filename)
+            for source, rrd_filename in sources.items()
+        }
+        step, _, rra = next(iter(schemas.values()))
+
+        # data sources in the source RRD databases become RRD databases in the target
+        # layout, e.g. disk-read_io.rrd:sda is migrated into disk/sda.rrd:read_io
+        targets = []
+        for source, (_, ds, _) in schemas.items():
+            for ds_name in ds:
+                if ds_name not in targets:
+                    targets.append(ds_name)
+
+        if self.rrd_layout == "device":
+            os.makedirs(self.rrd_dir + f"/{subsystem}", exist_ok=True)
+
+        for target in targets:
+            if self.rrd_layout == "device":
+                rrd_filename = self.rrd_dir + f"/{subsystem}/{target}.rrd"
+            else:
+                rrd_filename = self.rrd_dir + f"/{subsystem}-{target}.rrd"
+
+            # source index of the mapped data source is 1-based in the order of --source
+            source_args = []
+            ds_args = []
+            for source, (_, ds, _) in schemas.items():
+                if target not in ds:
+                    continue
+                if not re.match(r"^[a-zA-Z0-9_]{1,19}$", source):
+                    print(
+                        f"WARNING: {source} is not a valid data source name, skipped in {rrd_filename}",
+                        file=sys.stderr,
+                    )
+                    continue
+
+                source_args += ["--source", sources[source]]
+                ds_args.append(f"DS:{source}={target}[{len(ds_args) + 1}]:{ds[target]}")
+
+            if not ds_args:
+                continue
+
+            if self.dry_run:
+                print(
+                    f"rrdtool create {rrd_filename} --no-overwrite --step {step} "
+                    + " ".join(source_args + ds_args + rra)
+                )
+                continue
+
+            try:
+                rrdtool.create(
+                    rrd_filename,
+                    "--no-overwrite",
+                    "--step",
+                    str(step),
+                    source_args,
+                    ds_args,
+                    rra,
+                )
+            except Exception as e:
+                print(
+                    f"ERROR: failed to create the RRD database {rrd_filename}: {str(e)}",
+                    file=sys.stderr,
+                )
+            else:
+                print(f"RRD {rrd_filename} created.")
+
+    def resample(self, rrd_filename):
+        """
+        rebuild RRAs of RRD database with the RRA tiers
+
+        the RRD database is re-created with rrdtool create --source, data of the existing
+        RRAs is consolidated into the new RRAs. the existing RRD database is kept as a
+        .bak file.
+        """
+        step, ds, _ = self._get_rrd_schema(rrd_filename)
+        rra = hms.utils.get_rra_definitions(str(step), self.rra_tiers)
+        ds_args = [
+            f"DS:{ds_name}:{ds_definition}" for ds_name, ds_definition in ds.items()
+        ]
+
+        if self.dry_run:
+            print(
+                f"rrdtool create {rrd_filename}.tmp --step {step} --source {rrd_filename} "
+                + " ".join(ds_args + rra)
+            )
+            return
+
+        try:
+            rrdtool.create(
+                rrd_filename + ".tmp",
+                "--step",
+                str(step),
+                "--source",
+                rrd_filename,
+                ds_args,
+                rra,
+            )
+            os.replace(rrd_filename, rrd_filename + ".bak")
+            os.replace(rrd_filename + ".tmp", rrd_filename)
+        except Exception as e:
+            print(
+                f"ERROR: failed to resample the RRD database {rrd_filename}: {str(e)}",
+                file=sys.stderr,
+            )
+            # the existing RRD database is kept if the new one is not in place
+            if not os.path.exists(rrd_filename):
+                os.replace(rrd_filename + ".bak", rrd_filename)
+            if os.path.exists(rrd_filename + ".tmp"):
+                os.remove(rrd_filename + ".tmp")
+        else:
+            print(
+                f"RRD {rrd_filename} resampled, {hms.utils.estimate_rrd_size(len(ds), rra)} bytes."
+            )
+
+    def add_hf_ds(self, rrd_filename):
+        """
+        add data sources of high frequency sampling aggregations into RRD database
+
+        data sources are added with rrdtool tune, existing data sources are kept
+        """
+        rrd_name = os.path.relpath(rrd_filename, self.rrd_dir)[: -len(".rrd")]
+        ds_names = hms.utils.get_rrd_ds_index(rrd_filename)
+        ds_args = [
+            ds_definition
+            for ds_name, ds_type in hms.sampler.get_sampled_ds(
+                rrd_name, ds_names
+            ).items()
+            for ds_definition in hms.sampler.get_hf_ds_definitions(ds_name, ds_type)
+            if ds_definition.split(":")[1] not in ds_names
+        ]
+
+        if not ds_args:
+            return
+
+        if self.dry_run:
+            print(f"rrdtool tune {rrd_filename} " + " ".join(ds_args))
+            return
+
+        try:
+            rrdtool.tune(rrd_filename, ds_args)
+        except Exception as e:
+            print(
+                f"ERROR: failed to add data sources into the RRD database {rrd_filename}: {str(e)}",
+                file=sys.stderr,
+            )
+        else:
+            print(f"RRD {rrd_filename} tuned, {len(ds_args)} data sources added.")
+
+
+def main():
+    """
+    entry point of the RRD databases migration tool
+    """
+    # set up args
+    components = "disk,network"
+
+    parser = argparse.ArgumentParser(
+        description="Host Monitoring Station RRD Database Migration Tool"
+    )
+    parser.add_argument("--dir", type=str, required=True, help="RRD database directory")
+    parser.add_argument(
+        "--layout",
+        type=str,
+        required=False,
+        choices=["metric", "device"],
+        help="target RRD databases layout of disk and network metrics",
+    )
+    parser.add_argument(
+        "--component",
+        type=str,
+        required=False,
+        default=components,
+        help=f"Components to be migrated (default: {components})",
+    )
+    parser.add_argument(
+        "--resample",
+        action="store_true",
+        help="rebuild RRAs of all RRD databases with the RRA tiers",
+    )
+    parser.add_argument(
+        "--high-frequency",
+        action="store_true",
+        help="add data sources of high frequency sampling aggregations into RRD databases",
+    )
+    parser.add_argument(
+        "--rra",
+        type=str,
+        required=False,
+        default=hms.utils.rra_tiers,
+        help=f"RRA tiers in resolution:retention format (default: {hms.utils.rra_tiers})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print rrdtool commands without creating RRD databases",
+    )
+    args = parser.parse_args()
+
+    if not args.layout and not args.resample and not args.high_frequency:
+        parser.error("one of --layout, --resample or --high-frequency is required")
+
+    # create migration object
+    migration = Migration(args.dir, args.layout, args.rra, args.dry_run)
+
+    if args.layout:
+        for component in args.component.split(","):
+            if component in ["disk", "network"]:
+                migration.migrate(component)
+
+    # RRD databases are resampled after the layout migration
+    if args.resample:
+        for rrd_filename in sorted(
+            glob.glob(args.dir + "/*.rrd") + glob.glob(args.dir + "/*/*.rrd")
+        ):
+            migration.resample(rrd_filename)
+
+    if args.high_frequency:
+        for rrd_filename in sorted(
+            glob.glob(args.dir + "/*.rrd") + glob.glob(args.dir + "/*/*.rrd")
+        ):
+            migration.add_hf_ds(rrd_filename)
+
+
+if __name__ == "__main__":
+    main()
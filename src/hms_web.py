@@ -1,24 +1,288 @@
 #!/usr/bin/env python3
 
-import importlib.util
+import concurrent.futures
+import hashlib
+import multiprocessing
 import os
+import re
+import socket
 import sys
+import threading
+import time
 import uuid
-from flask import Flask, render_template, request, g
+from flask import (
+    Flask,
+    Response,
+    abort,
+    g,
+    jsonify,
+    render_template,
+    request,
+    url_for,
+)
 from markupsafe import escape
 
-# load host monitoring station module - hms
-spec = importlib.util.spec_from_file_location("hms", f"{os.getcwd()}/hms/__init__.py")
-hms = importlib.util.module_from_spec(spec)
-sys.modules[spec.name] = hms
-spec.loader.exec_module(hms)
+import hms
 
-app = Flask(__name__)
+app = Flask(__name__, template_folder=hms.utils.template_dir)
 
+# configuration is loaded once in the process, it's reloaded if the configuration file
+# is modified. SIGHUP is not handled as uWSGI uses it for graceful reloads
+config_file = "static/config/hms.yaml"
+config = None
+config_mtime = None
 
-@app.route("/hms", methods=["GET"])
-def hms_load_graphs():
-    # process query parameters
+# hostname FQDN is resolved in a background thread and refreshed periodically, the
+# previous value is used while it's being resolved
+hostname = socket.gethostname()
+hostname_resolved = None
+hostname_thread = None
+hostname_refresh_interval = 300
+hostname_timeout = 1
+
+
+def get_config():
+    """
+    get cached configuration, reload the configuration file if it's changed
+    """
+    global config, config_mtime
+
+    try:
+        mtime = os.stat(config_file).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    if config is None or mtime != config_mtime:
+        config_mtime = mtime
+        new_config = hms.utils.read_config(config_file)
+        # keep the previous configuration if the configuration file is not valid, e.g.
+        # it's being written
+        if new_config or config is None:
+            config = new_config or {}
+        else:
+            print(
+                f"WARNING: failed to reload {config_file}, previous configuration is used",
+                file=sys.stderr,
+            )
+
+    return config
+
+
+def resolve_hostname():
+    """
+    resolve hostname FQDN, it's run in a background thread
+    """
+    global hostname, hostname_resolved
+
+    try:
+        hostname = hms.utils.get_hostname_fqdn()
+    except Exception as e:
+        print(f"WARNING: failed to resolve hostname FQDN: {str(e)}", file=sys.stderr)
+    hostname_resolved = time.monotonic()
+
+
+def get_hostname():
+    """
+    get cached hostname FQDN and refresh it in the background if it's expired
+
+    only the first request waits for the hostname FQDN, up to hostname_timeout seconds
+    """
+    global hostname_thread
+
+    if hostname_thread is None or (
+        not hostname_thread.is_alive()
+        and time.monotonic() - hostname_resolved > hostname_refresh_interval
+    ):
+        hostname_thread = threading.Thread(
+            target=resolve_hostname, name="hms-hostname", daemon=True
+        )
+        hostname_thread.start()
+        if hostname_resolved is None:
+            hostname_thread.join(hostname_timeout)
+
+    return hostname
+
+
+# render cache is shared by all requests in the process
+render_cache = None
+
+
+def get_render_cache(config):
+    """
+    get render cache, None is returned if render cache is disabled
+    """
+    global render_cache
+
+    max_bytes = int(config.get("RENDER_CACHE_MAX_BYTES", 104857600))
+    if max_bytes <= 0:
+        return None
+
+    if render_cache is None or render_cache.max_bytes != max_bytes:
+        render_cache = hms.cache.RenderCache("static/rrd_graph", max_bytes)
+
+    return render_cache
+
+
+# render pool is shared by all requests in the process
+render_pool = None
+
+
+def get_render_python(config):
+    """
+    get Python interpreter of render worker processes
+
+    RENDER_PYTHON is used if it's set. sys.executable is the uWSGI binary in uWSGI, so
+    the interpreter is looked up in sys.prefix, which is the virtualenv if uWSGI runs
+    in one. RuntimeError is raised if the interpreter is not found
+    """
+    render_python = config.get("RENDER_PYTHON")
+    if render_python:
+        if not os.access(render_python, os.X_OK):
+            raise RuntimeError(
+                f"RENDER_PYTHON {render_python} is not an executable Python interpreter"
+            )
+        return render_python
+
+    if os.path.basename(sys.executable).startswith("python"):
+        return sys.executable
+
+    candidates = [
+        os.path.join(
+            sys.prefix,
+            "bin",
+            f"python{sys.version_info.major}.{sys.version_info.minor}",
+        ),
+        os.path.join(sys.prefix, "bin", f"python{sys.version_info.major}"),
+    ]
+    for candidate in candidates:
+        if os.access(candidate, os.X_OK):
+            return candidate
+
+    raise RuntimeError(
+        f"Python interpreter is not found in {', '.join(candidates)}, please set RENDER_PYTHON"
+    )
+
+
+def get_render_pool_context(config):
+    """
+    get multiprocessing context of render pool
+
+    the web application process is multithreaded (uWSGI threads, hostname resolver), so
+    worker processes are forked from a single-threaded fork server instead of the web
+    application process, which could deadlock on locks held by other threads
+    """
+    mp_context = multiprocessing.get_context("forkserver")
+    # the fork server is a Python process, not the uWSGI binary
+    mp_context.set_executable(get_render_python(config))
+    # graph module is imported once in the fork server instead of in each worker
+    mp_context.set_forkserver_preload(["hms.graph"])
+
+    return mp_context
+
+
+def get_web_processes():
+    """
+    get number of web application processes, it's 1 if not running in uWSGI
+    """
+    try:
+        import uwsgi
+    except ImportError:
+        return 1
+
+    return max(getattr(uwsgi, "numproc", 1), 1)
+
+
+def get_render_workers(config):
+    """
+    get number of worker processes of the render pool of this web application process
+
+    CPUs are shared by the pools of all web application processes, so the number of
+    workers is capped at the share of CPUs of each process. the share is used if
+    RENDER_WORKERS is 0
+    """
+    cpu_share = max((os.cpu_count() or 1) // get_web_processes(), 1)
+    render_workers = int(config.get("RENDER_WORKERS", 2) or cpu_share)
+
+    return min(render_workers, cpu_share)
+
+
+# render pool settings which failed to start - (Python interpreter, number of workers)
+render_pool_failed = None
+
+
+def get_render_pool(config):
+    """
+    get render pool, None is returned if graphs are rendered one after another
+
+    the pool is created on the first request, so each web application process has its
+    own pool with a fixed number of worker processes. graphs are rendered one after
+    another if the pool cannot be started
+    """
+    global render_pool, render_pool_failed
+
+    render_workers = get_render_workers(config)
+    if render_workers <= 1:
+        return None
+
+    render_pool_settings = (config.get("RENDER_PYTHON"), render_workers)
+    if render_pool_settings == render_pool_failed:
+        return None
+
+    if render_pool is None or render_pool._max_workers != render_workers:
+        if render_pool is not None:
+            render_pool.shutdown(wait=False)
+            render_pool = None
+        try:
+            render_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=render_workers,
+                mp_context=get_render_pool_context(config),
+            )
+        except RuntimeError as e:
+            print(
+                f"ERROR: failed to start render pool, graphs are rendered one after another: {str(e)}",
+                file=sys.stderr,
+            )
+            render_pool_failed = render_pool_settings
+            return None
+
+    return render_pool
+
+
+def reset_render_pool():
+    """
+    shut down broken render pool, a new pool is created in the next request
+    """
+    global render_pool
+
+    if render_pool is not None:
+        render_pool.shutdown(wait=False)
+    render_pool = None
+
+
+# ring buffer reader is shared by all requests in the process
+ring_reader = None
+
+
+def get_ring_reader(config):
+    """
+    get ring buffer reader, None is returned if ring buffer is disabled
+    """
+    global ring_reader
+
+    ring_buffer_path = config.get("RING_BUFFER_PATH")
+    if not ring_buffer_path:
+        return None
+
+    if ring_reader is None or ring_reader.path != ring_buffer_path:
+        ring_reader = hms.ring.RingBufferReader(ring_buffer_path)
+
+    return ring_reader
+
+
+def get_graph_query():
+    """
+    get graph size and time range from query parameters - (size, start, end)
+    """
     start = request.args.get("start")
     end = request.args.get("end")
     size = request.args.get("size")
@@ -35,62 +299,339 @@ def hms_load_graphs():
         start = "end-8h"
         end = "now"
 
+    return str(escape(size)), str(escape(start)), str(escape(end))
+
+
+@app.route("/hms", methods=["GET"])
+def hms_load_graphs():
+    # process query parameters
+    size, start, end = get_graph_query()
+
+    subsystems = [
+        "cpu",
+        "disk",
+        "memory",
+        "network",
+        "tcp",
+        "udp",
+        "os",
+        "arp",
+        "sockstat",
+        "hms",
+    ]
+
+    # graphs are rendered by the graph endpoint when the browser loads them, the page
+    # only links graphs whose RRD databases are bootstrapped
+    if g.config.get("GRAPH_RENDERING", "endpoint") == "endpoint":
+        hms_graph = hms.graph.Graph(
+            g.config["RRD_DB_PATH"],
+            "static/rrd_graph",
+            size,
+            start,
+            end,
+            g.uuid,
+            g.config.get("RRDCACHED_ADDRESS"),
+            g.config.get("RRD_LAYOUT", "metric"),
+        )
+        graph_urls = {
+            f"{subsystem}_{graph_name}": (
+                url_for(
+                    "hms_load_graph",
+                    subsystem=subsystem,
+                    graph_name=graph_name,
+                    start=start,
+                    end=end,
+                    size=size,
+                )
+                if hms_graph.is_bootstrapped(subsystem, graph_name)
+                else None
+            )
+            for subsystem in subsystems
+            for graph_name in hms.graph.graph_definitions[subsystem]
+        }
+
+        # render HMS web page
+        return render_template("hms.html", hostname=g.hostname, **graph_urls)
+
+    # graphs are cached by size and time range if render cache is enabled, otherwise
+    # graphs are rendered into new files in every request
+    graph_key = g.uuid
+    hms_render_cache = get_render_cache(g.config)
+    if hms_render_cache is not None:
+        try:
+            step = hms.utils.get_rrd_step(g.config["RRD_DB_PATH"] + "/os.rrd")
+        except Exception:
+            step = 60
+        # time range is resolved into timestamps snapped to the RRD step, graphs are
+        # rendered with the same time range as the cache key
+        try:
+            time_range = hms.timespec.resolve_time_range(start, end)
+        except ValueError:
+            abort(400)
+        start, end = (timestamp - timestamp % step for timestamp in time_range)
+        graph_key = hms_render_cache.get_key(size, start, end)
+
     # construct graph object
     hms_graph = hms.graph.Graph(
         g.config["RRD_DB_PATH"],
         "static/rrd_graph",
-        str(escape(size)),
-        str(escape(start)),
-        str(escape(end)),
-        g.uuid,
+        size,
+        start,
+        end,
+        graph_key,
+        g.config.get("RRDCACHED_ADDRESS"),
+        g.config.get("RRD_LAYOUT", "metric"),
+        hms_render_cache,
+        get_render_pool(g.config),
     )
 
     # plot graphs and retrieve graph filename mappings
-    g.cpu_graph_filename = hms_graph.plot_cpu_graph()
-    g.disk_graph_filename = hms_graph.plot_disk_graph()
-    g.memory_swap_graph_filename = hms_graph.plot_memory_graph()
-    g.network_graph_filename = hms_graph.plot_network_graph()
-    g.tcp_graph_filename = hms_graph.plot_tcp_graph()
-    g.udp_graph_filename = hms_graph.plot_udp_graph()
-    g.os_graph_filename = hms_graph.plot_os_graph()
-    g.arp_graph_filename = hms_graph.plot_arp_graph()
+    try:
+        graph_filenames = hms_graph.plot_all_graphs(subsystems)
+    except concurrent.futures.process.BrokenProcessPool as e:
+        print(
+            f"ERROR: render pool is broken, rendering graphs one after another: {str(e)}",
+            file=sys.stderr,
+        )
+        reset_render_pool()
+        hms_graph.render_pool = None
+        graph_filenames = hms_graph.plot_all_graphs(subsystems)
+
+    graph_urls = {
+        f"{subsystem}_{graph_name}": (
+            url_for("static", filename="rrd_graph/" + graph_filename)
+            if graph_filename
+            else None
+        )
+        for subsystem in subsystems
+        for graph_name, graph_filename in graph_filenames[subsystem].items()
+    }
 
     # render HMS web page
+    return render_template("hms.html", hostname=g.hostname, **graph_urls)
+
+
+@app.route("/hms/graph/<subsystem>/<graph_name>.png", methods=["GET"])
+def hms_load_graph(subsystem, graph_name):
+    if graph_name not in hms.graph.graph_definitions.get(subsystem, {}):
+        abort(404)
+
+    # process query parameters
+    size, start, end = get_graph_query()
 
-    return render_template(
-        "hms.html",
-        hostname=g.hostname,
-        cpu_cpu_freq=g.cpu_graph_filename["cpu_freq"],
-        disk_read_io=g.disk_graph_filename["read_io"],
-        disk_write_io=g.disk_graph_filename["write_io"],
-        disk_read_sector=g.disk_graph_filename["read_sector"],
-        disk_write_sector=g.disk_graph_filename["write_sector"],
-        disk_read_merge=g.disk_graph_filename["read_merge"],
-        disk_write_merge=g.disk_graph_filename["write_merge"],
-        disk_in_flight=g.disk_graph_filename["in_flight"],
-        memory_memory=g.memory_swap_graph_filename["memory"],
-        memory_swap=g.memory_swap_graph_filename["swap"],
-        memory_virtual=g.memory_swap_graph_filename["virtual"],
-        network_rx_bytes=g.network_graph_filename["rx_bytes"],
-        network_tx_bytes=g.network_graph_filename["tx_bytes"],
-        network_rx_dropped=g.network_graph_filename["rx_dropped"],
-        network_tx_dropped=g.network_graph_filename["tx_dropped"],
-        network_rx_errors=g.network_graph_filename["rx_errors"],
-        network_tx_errors=g.network_graph_filename["tx_errors"],
-        network_collisions=g.network_graph_filename["collisions"],
-        tcp_tcp=g.tcp_graph_filename["tcp"],
-        tcp_tcp6=g.tcp_graph_filename["tcp6"],
-        udp_udp=g.udp_graph_filename["udp"],
-        arp_arp=g.arp_graph_filename["arp"],
-        os_loadavg=g.os_graph_filename["loadavg"],
-        os_fd=g.os_graph_filename["fd"],
-        os_procs=g.os_graph_filename["procs"],
-        os_context_switch=g.os_graph_filename["context_switch"],
+    hms_graph = hms.graph.Graph(
+        g.config["RRD_DB_PATH"],
+        "static/rrd_graph",
+        size,
+        start,
+        end,
+        g.uuid,
+        g.config.get("RRDCACHED_ADDRESS"),
+        g.config.get("RRD_LAYOUT", "metric"),
     )
+    if not hms_graph.is_bootstrapped(subsystem, graph_name):
+        abort(404)
+
+    # graph only changes when RRD databases are updated, so the ETag is built from the
+    # graph, size, time range and last update time of RRD databases
+    try:
+        last_update = hms_graph.get_last_update(subsystem, graph_name)
+    except Exception as e:
+        print(
+            f"ERROR: failed to get last update time of {subsystem} {graph_name} graph: {str(e)}",
+            file=sys.stderr,
+        )
+        abort(500)
+
+    etag = hashlib.sha1(
+        f"{subsystem}|{graph_name}|{size}|{start}|{end}|{last_update}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()[:16]
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        try:
+            image = hms_graph.render_graph_image(subsystem, graph_name)
+        except Exception as e:
+            print(
+                f"ERROR: failed to render {subsystem} {graph_name} graph: {str(e)}",
+                file=sys.stderr,
+            )
+            abort(500)
+        response = Response(image, mimetype="image/png")
+
+    # browser revalidates graphs on every page load
+    response.set_etag(etag)
+    response.last_modified = last_update
+    response.cache_control.no_cache = True
+
+    return response
+
+
+@app.route("/hms/api/series", methods=["GET"])
+def hms_load_series():
+    # process query parameters
+    rrd = request.args.get("rrd", "")
+    ds = request.args.get("ds")
+    start = request.args.get("start") or "end-8h"
+    end = request.args.get("end") or "now"
+    cf = request.args.get("cf", "AVERAGE").upper()
+    max_points = request.args.get("max_points")
+    algorithm = request.args.get("algorithm", "lttb")
+    series_format = request.args.get("format", "json")
+
+    # RRD database name is relative to RRD_DB_PATH without .rrd, e.g. os, disk-read_io
+    # or disk/sda
+    if not re.fullmatch(r"[A-Za-z0-9_\-]+(/[A-Za-z0-9_\-][A-Za-z0-9_.\-]*)?", rrd):
+        return jsonify({"error": "invalid RRD database name"}), 400
+    rrd_filename = g.config["RRD_DB_PATH"] + f"/{rrd}.rrd"
+    if not os.path.isfile(rrd_filename):
+        return jsonify({"error": f"RRD database {rrd} not found"}), 404
+
+    if cf not in hms.series.consolidation_functions:
+        return jsonify({"error": f"invalid consolidation function {cf}"}), 400
+    if algorithm not in hms.series.algorithms:
+        return jsonify({"error": f"invalid downsampling algorithm {algorithm}"}), 400
+    if series_format not in ["json", "binary"]:
+        return jsonify({"error": f"invalid format {series_format}"}), 400
+
+    try:
+        start, end = hms.timespec.resolve_time_range(start, end)
+    except ValueError as e:
+        return jsonify({"error": f"invalid time range: {str(e)}"}), 400
+
+    if max_points is not None:
+        try:
+            max_points = int(max_points)
+        except ValueError:
+            max_points = 0
+        if max_points < 2:
+            return jsonify({"error": "max_points must be an integer above 1"}), 400
+
+    rrdcached_address = g.config.get("RRDCACHED_ADDRESS")
+    try:
+        rrd_ds_names = hms.utils.get_rrd_ds(rrd_filename, rrdcached_address)
+    except FileNotFoundError:
+        return jsonify({"error": f"RRD database {rrd} not found"}), 404
+    except Exception as e:
+        print(f"ERROR: failed to read {rrd} RRD database: {str(e)}", file=sys.stderr)
+        return jsonify({"error": f"{rrd} is not a valid RRD database"}), 404
+    ds_names = ds.split(",") if ds else rrd_ds_names
+    for ds_name in ds_names:
+        if ds_name not in rrd_ds_names:
+            return jsonify({"error": f"data source {ds_name} not found in {rrd}"}), 404
+
+    # rrdtool reads the RRA closest to the resolution of max_points, the series are
+    # downsampled to max_points afterwards
+    resolution = (end - start) // max_points if max_points else None
+
+    try:
+        step, series = hms.series.fetch_series(
+            rrd_filename,
+            ds_names,
+            start,
+            end,
+            cf,
+            resolution,
+            rrdcached_address,
+        )
+    except Exception as e:
+        print(f"ERROR: failed to fetch {rrd} RRD database: {str(e)}", file=sys.stderr)
+        return jsonify({"error": f"failed to fetch {rrd} RRD database"}), 500
+
+    if max_points:
+        series = {
+            ds_name: hms.series.downsample(timestamps, values, max_points, algorithm)
+            for ds_name, (timestamps, values) in series.items()
+        }
+
+    if series_format == "binary":
+        response = Response(
+            hms.series.pack_series(series.values()),
+            mimetype="application/octet-stream",
+        )
+        response.headers["X-HMS-Series"] = ",".join(series)
+        response.headers["X-HMS-Step"] = str(step)
+        return response
+
+    return jsonify(
+        {
+            "rrd": rrd,
+            "start": start,
+            "end": end,
+            "step": step,
+            "cf": cf,
+            "series": {
+                ds_name: {
+                    "timestamps": [int(timestamp) for timestamp in timestamps],
+                    "values": hms.series.to_list(values),
+                }
+                for ds_name, (timestamps, values) in series.items()
+            },
+        }
+    )
+
+
+@app.route("/hms/api/live", methods=["GET"])
+def hms_load_live():
+    # recent samples are read from the ring buffer published by the poller, RRD
+    # databases are not accessed
+    hms_ring_reader = get_ring_reader(g.config)
+    if hms_ring_reader is None:
+        return jsonify({"error": "ring buffer is disabled"}), 404
+
+    metrics = request.args.get("metrics")
+    window = request.args.get("window")
+
+    if window is not None:
+        try:
+            window = int(window)
+        except ValueError:
+            window = -1
+        if window < 0:
+            return jsonify({"error": "window must be a non-negative integer"}), 400
+
+    try:
+        timestamps, series = hms_ring_reader.read(
+            metrics.split(",") if metrics else None, window
+        )
+    except Exception as e:
+        print(f"ERROR: failed to read ring buffer: {str(e)}", file=sys.stderr)
+        return jsonify({"error": "failed to read ring buffer"}), 500
+
+    if metrics:
+        for metric in metrics.split(","):
+            if metric not in series:
+                return jsonify({"error": f"metric {metric} not found"}), 404
+
+    return jsonify(
+        {
+            "step": hms_ring_reader.step,
+            "timestamps": [int(timestamp) for timestamp in timestamps],
+            "series": {
+                metric: hms.series.to_list(values) for metric, values in series.items()
+            },
+            "latest": {
+                metric: hms.series.to_list(values[-1:])[0] if values else None
+                for metric, values in series.items()
+            },
+        }
+    )
+
+
+@app.route("/hms/cache", methods=["GET"])
+def hms_render_cache_stats():
+    # render cache counters of the current process
+    hms_render_cache = get_render_cache(g.config)
+    if hms_render_cache is None:
+        return jsonify({"enabled": False})
+
+    return jsonify({"enabled": True, **hms_render_cache.stats()})
 
 
 @app.before_request
 def before_request():
     g.uuid = str(uuid.uuid4())
-    g.config = hms.utils.read_config("static/config/hms.yaml")
-    g.hostname = hms.utils.get_hostname_fqdn()
+    g.config = get_config()
+    g.hostname = get_hostname()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+import sys
+import types
+
+import pytest
+
+from hms import utils
+
+# graphs and the metrics poller import rrdtool, rrdtool functions are replaced in the
+# tests which call them
+try:
+    import rrdtool
+except ImportError:
+    sys.modules["rrdtool"] = types.ModuleType("rrdtool")
+
+
+def _write_rrd_header(rrd_filename, ds_names, step=60):
+    """
+    write a RRD database header in native format with GAUGE data sources
+    """
+    header = utils.rrd_stat_head.pack(
+        b"RRD\0", b"0003\0", utils.rrd_float_cookie, len(ds_names), 1, step, *[0.0] * 10
+    )
+    for ds_name in ds_names:
+        header += utils.rrd_ds_def.pack(ds_name.encode(), b"GAUGE", *[0.0] * 10)
+
+    with open(rrd_filename, "wb") as f:
+        f.write(header)
+
+
+@pytest.fixture
+def write_rrd_header():
+    return _write_rrd_header
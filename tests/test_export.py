@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import json
+import os
+
+import pytest
+
+from hms import export
+from hms import graph
+from hms import utils
+
+
+@pytest.fixture
+def rrd_last_updates(monkeypatch):
+    """
+    last update timestamps of graphs - {(subsystem, graph name): timestamp}
+
+    graphs are plotted into <subsystem>-<graph name>.png of the graph directory
+    """
+    last_updates = {}
+
+    def get_last_update(self, subsystem, graph_name):
+        return last_updates.get((subsystem, graph_name), 1000)
+
+    def plot_graph(self, subsystem, graph_name):
+        graph_filename = f"{subsystem}-{graph_name}.png"
+        with open(self.rrd_graph_dir + f"/{graph_filename}", "wb") as f:
+            f.write(b"\x89PNG")
+        return graph_filename
+
+    monkeypatch.setattr(graph.Graph, "get_last_update", get_last_update)
+    monkeypatch.setattr(graph.Graph, "plot_graph", plot_graph)
+    monkeypatch.setattr(utils, "get_hostname_fqdn", lambda: "localhost")
+
+    return last_updates
+
+
+def get_releases(export_dir):
+    return sorted(os.listdir(export_dir + ".releases"))
+
+
+def test_export_reuses_graphs(tmp_path, rrd_last_updates):
+    export_dir = str(tmp_path / "export")
+    hms_export = export.Export(export_dir, str(tmp_path))
+
+    hms_export.export()
+
+    first_release = os.path.realpath(export_dir)
+    assert os.path.islink(export_dir)
+    assert hms_export.rendered > 0
+    assert hms_export.reused == 0
+    assert os.path.isfile(export_dir + "/index.html")
+    with open(export_dir + "/manifest.json", "rt") as f:
+        manifest = json.load(f)
+    assert manifest["default/os/loadavg"] == {
+        "start": "end-8h",
+        "end": "now",
+        "size": "medium",
+        "last_update": 1000,
+        "filename": "os-loadavg.png",
+    }
+
+    # only the graph of the updated RRD database is rendered, other graphs are hard
+    # links to the graphs of the previous release
+    rendered = hms_export.rendered
+    rrd_last_updates[("os", "loadavg")] = 2000
+    hms_export.export()
+
+    assert os.path.realpath(export_dir) != first_release
+    assert hms_export.rendered == 1
+    assert hms_export.reused == rendered - 1
+    assert (
+        os.stat(export_dir + "/default/os-context_switch.png").st_ino
+        == os.stat(first_release + "/default/os-context_switch.png").st_ino
+    )
+    assert (
+        os.stat(export_dir + "/default/os-loadavg.png").st_ino
+        != os.stat(first_release + "/default/os-loadavg.png").st_ino
+    )
+
+
+def test_export_changed_view_is_rendered(tmp_path, rrd_last_updates):
+    export_dir = str(tmp_path / "export")
+    export.Export(export_dir, str(tmp_path)).export()
+
+    hms_export = export.Export(
+        export_dir,
+        str(tmp_path),
+        {"default": {"start": "end-1d", "end": "now", "size": "medium"}},
+    )
+    hms_export.export()
+
+    assert hms_export.reused == 0
+
+
+def test_export_switches_symlink(tmp_path, rrd_last_updates):
+    export_dir = str(tmp_path / "export")
+    hms_export = export.Export(export_dir, str(tmp_path), keep_releases=3)
+    # a stale temporary symlink of an interrupted export is replaced
+    os.symlink(str(tmp_path / "missing"), export_dir + ".tmp")
+
+    releases = []
+    for _ in range(4):
+        hms_export.export()
+        releases.append(os.path.realpath(export_dir))
+        # the export directory always points to a complete release
+        assert os.path.isfile(export_dir + "/manifest.json")
+
+    assert not os.path.lexists(export_dir + ".tmp")
+    # releases are sorted by age, the newest releases are kept
+    assert [
+        os.path.realpath(export_dir + ".releases/" + release)
+        for release in get_releases(export_dir)
+    ] == releases[1:]
+
+
+def test_export_keeps_current_and_previous_releases(tmp_path, rrd_last_updates):
+    export_dir = str(tmp_path / "export")
+    hms_export = export.Export(export_dir, str(tmp_path), keep_releases=1)
+
+    releases = []
+    for _ in range(3):
+        hms_export.export()
+        releases.append(os.path.realpath(export_dir))
+
+    # the previous release may still be read after the symlink is switched
+    assert [
+        os.path.realpath(export_dir + ".releases/" + release)
+        for release in get_releases(export_dir)
+    ] == releases[1:]
+
+
+def test_export_directory_is_not_replaced(tmp_path, rrd_last_updates):
+    export_dir = tmp_path / "export"
+    export_dir.mkdir()
+
+    with pytest.raises(RuntimeError, match="not a symlink"):
+        export.Export(str(export_dir), str(tmp_path)).export()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import os
+
+from hms import graph
+
+
+def get_graph_commands(rrd_db_dir, subsystem, graph_name, rrd_layout="metric"):
+    """
+    get DEF / CDEF / LINE / AREA commands of a graph
+    """
+    g = graph.Graph(
+        str(rrd_db_dir), "", "medium", "end-8h", "now", "uuid", rrd_layout=rrd_layout
+    )
+
+    return [
+        command
+        for command in g._get_graph_args(subsystem, graph_name)
+        if command.split(":", 1)[0] in ["DEF", "CDEF", "LINE1", "AREA"]
+    ]
+
+
+def test_metric_graph_without_aggregations(tmp_path, write_rrd_header):
+    write_rrd_header(str(tmp_path / "os.rrd"), ["loadavg_1min", "num_context_switch"])
+
+    assert get_graph_commands(tmp_path, "os", "context_switch") == [
+        f"DEF:num_context_switch={tmp_path}/os.rrd:num_context_switch:AVERAGE",
+        "LINE1:num_context_switch#FF0000:Number of Context Switches",
+    ]
+
+
+def test_metric_graph_gauge_envelope(tmp_path, write_rrd_header):
+    rrd_filename = f"{tmp_path}/os.rrd"
+    write_rrd_header(
+        rrd_filename,
+        [
+            "loadavg_1min",
+            "loadavg_5min",
+            "loadavg_15min",
+            "loadavg_1min_min",
+            "loadavg_1min_max",
+            "loadavg_1min_avg",
+        ],
+    )
+
+    commands = get_graph_commands(tmp_path, "os", "loadavg")
+
+    assert commands[:6] == [
+        f"DEF:loadavg_1min={rrd_filename}:loadavg_1min:AVERAGE",
+        f"DEF:loadavg_1min_min={rrd_filename}:loadavg_1min_min:MIN",
+        f"DEF:loadavg_1min_max={rrd_filename}:loadavg_1min_max:MAX",
+        "CDEF:loadavg_1min_range=loadavg_1min_max,loadavg_1min_min,-",
+        "LINE1:loadavg_1min_min",
+        "AREA:loadavg_1min_range#FF000040:LoadAvg 1min min/max envelope:STACK",
+    ]
+    # other load averages are not sampled
+    assert commands[7:] == [
+        f"DEF:loadavg_5min={rrd_filename}:loadavg_5min:AVERAGE",
+        "LINE1:loadavg_5min#00FF00:LoadAvg 5min",
+        f"DEF:loadavg_15min={rrd_filename}:loadavg_15min:AVERAGE",
+        "LINE1:loadavg_15min#0000FF:LoadAvg 15min",
+    ]
+
+
+def test_metric_graph_counter_max(tmp_path, write_rrd_header):
+    rrd_filename = f"{tmp_path}/os.rrd"
+    write_rrd_header(rrd_filename, ["num_context_switch", "num_context_swi_max"])
+
+    assert get_graph_commands(tmp_path, "os", "context_switch") == [
+        f"DEF:num_context_switch={rrd_filename}:num_context_switch:AVERAGE",
+        f"DEF:num_context_switch_max={rrd_filename}:num_context_swi_max:MAX",
+        "LINE1:num_context_switch_max#FF000080:Number of Context Switches max:dashes",
+        "LINE1:num_context_switch#FF0000:Number of Context Switches",
+    ]
+
+
+def test_device_graph_metric_layout_envelope(tmp_path, write_rrd_header):
+    rrd_filename = f"{tmp_path}/cpu-cpu_freq.rrd"
+    write_rrd_header(rrd_filename, ["cpu0", "cpu0_min", "cpu0_max", "cpu0_avg"])
+
+    commands = get_graph_commands(tmp_path, "cpu", "cpu_freq")
+
+    # aggregations are not plotted as devices
+    assert [command for command in commands if command.startswith("LINE1")] == [
+        "LINE1:cpu0_min",
+        "LINE1:cpu0#191970:cpu0",
+    ]
+    assert f"DEF:cpu0_min={rrd_filename}:cpu0_min:MIN" in commands
+    assert f"DEF:cpu0_max={rrd_filename}:cpu0_max:MAX" in commands
+    assert "AREA:cpu0_range#19197040:cpu0 min/max envelope:STACK" in commands
+
+
+def test_device_graph_device_layout_envelope(tmp_path, write_rrd_header):
+    os.mkdir(tmp_path / "network")
+    eth0_rrd = f"{tmp_path}/network/eth0.rrd"
+    lo_rrd = f"{tmp_path}/network/lo.rrd"
+    write_rrd_header(eth0_rrd, ["rx_bytes", "rx_errors", "rx_bytes_max"])
+    write_rrd_header(lo_rrd, ["rx_bytes", "rx_errors"])
+
+    assert get_graph_commands(tmp_path, "network", "rx_bytes", "device") == [
+        f"DEF:eth0={eth0_rrd}:rx_bytes:AVERAGE",
+        f"DEF:eth0_max={eth0_rrd}:rx_bytes_max:MAX",
+        "LINE1:eth0_max#19197080:eth0 max:dashes",
+        "LINE1:eth0#191970:eth0",
+        f"DEF:lo={lo_rrd}:rx_bytes:AVERAGE",
+        "LINE1:lo#FF0000:lo",
+    ]
+    # rx_errors is not sampled
+    assert get_graph_commands(tmp_path, "network", "rx_errors", "device") == [
+        f"DEF:eth0={eth0_rrd}:rx_errors:AVERAGE",
+        "LINE1:eth0#191970:eth0",
+        f"DEF:lo={lo_rrd}:rx_errors:AVERAGE",
+        "LINE1:lo#FF0000:lo",
+    ]
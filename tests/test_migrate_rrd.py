@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+import types
+
+import pytest
+
+import hms_migrate_rrd
+
+
+@pytest.fixture
+def fake_rrdtool(monkeypatch, write_rrd_header):
+    """
+    rrdtool which reads GAUGE data sources from the header and records created RRD
+    databases - [(RRD database filename, args)]
+    """
+    created = []
+    failures = []
+
+    def info(rrd_filename):
+        rrd_info = {"step": 60, "rra[0].cf": "AVERAGE"}
+        rrd_info.update({"rra[0].xff": 0.5, "rra[0].pdp_per_row": 1})
+        rrd_info["rra[0].rows"] = 525600
+        for ds_name in hms_migrate_rrd.hms.utils.get_rrd_ds_index(rrd_filename):
+            rrd_info[f"ds[{ds_name}].type"] = "GAUGE"
+            rrd_info[f"ds[{ds_name}].minimal_heartbeat"] = 120
+            rrd_info[f"ds[{ds_name}].min"] = 0.0
+            rrd_info[f"ds[{ds_name}].max"] = None
+
+        return rrd_info
+
+    def create(rrd_filename, *args):
+        flat_args = []
+        for arg in args:
+            flat_args += arg if isinstance(arg, list) else [arg]
+        ds_names = [
+            arg.split(":")[1].split("=")[0]
+            for arg in flat_args
+            if arg.startswith("DS:")
+        ]
+        write_rrd_header(rrd_filename, ds_names)
+        if failures:
+            raise failures.pop(0)
+        created.append((rrd_filename, flat_args))
+
+    monkeypatch.setattr(
+        hms_migrate_rrd,
+        "rrdtool",
+        types.SimpleNamespace(info=info, create=create),
+    )
+
+    return types.SimpleNamespace(created=created, failures=failures)
+
+
+def test_resample_swaps_rrd_database(tmp_path, write_rrd_header, fake_rrdtool):
+    rrd_filename = str(tmp_path / "os.rrd")
+    write_rrd_header(rrd_filename, ["loadavg_1min"])
+    original = open(rrd_filename, "rb").read()
+
+    hms_migrate_rrd.Migration(str(tmp_path), rra_tiers="1m:1d,5m:1w").resample(
+        rrd_filename
+    )
+
+    ((created_filename, args),) = fake_rrdtool.created
+    assert created_filename == rrd_filename + ".tmp"
+    assert args[:4] == ["--step", "60", "--source", rrd_filename]
+    assert args[4] == "DS:loadavg_1min:GAUGE:120:0.0:U"
+    assert args[5:] == [
+        "RRA:AVERAGE:0.5:1:1440",
+        "RRA:MIN:0.5:1:1440",
+        "RRA:MAX:0.5:1:1440",
+        "RRA:AVERAGE:0.5:5:2016",
+        "RRA:MIN:0.5:5:2016",
+        "RRA:MAX:0.5:5:2016",
+    ]
+    # the original RRD database is kept as .bak
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["os.rrd", "os.rrd.bak"]
+    assert open(rrd_filename + ".bak", "rb").read() == original
+
+
+def test_resample_failure_keeps_rrd_database(
+    tmp_path, write_rrd_header, fake_rrdtool, capsys
+):
+    rrd_filename = str(tmp_path / "os.rrd")
+    write_rrd_header(rrd_filename, ["loadavg_1min"])
+    original = open(rrd_filename, "rb").read()
+    fake_rrdtool.failures.append(RuntimeError("disk full"))
+
+    hms_migrate_rrd.Migration(str(tmp_path)).resample(rrd_filename)
+
+    assert "failed to resample the RRD database" in capsys.readouterr().err
+    # the partial .tmp file is removed
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["os.rrd"]
+    assert open(rrd_filename, "rb").read() == original
+
+
+def test_resample_swap_failure_restores_rrd_database(
+    tmp_path, write_rrd_header, fake_rrdtool, monkeypatch
+):
+    rrd_filename = str(tmp_path / "os.rrd")
+    write_rrd_header(rrd_filename, ["loadavg_1min"])
+    original = open(rrd_filename, "rb").read()
+    replace = hms_migrate_rrd.os.replace
+
+    def failed_replace(src, dst):
+        if src.endswith(".tmp"):
+            raise OSError("read-only file system")
+        replace(src, dst)
+
+    monkeypatch.setattr(hms_migrate_rrd.os, "replace", failed_replace)
+
+    hms_migrate_rrd.Migration(str(tmp_path)).resample(rrd_filename)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["os.rrd"]
+    assert open(rrd_filename, "rb").read() == original
+
+
+@pytest.fixture
+def rrd_history(monkeypatch, write_rrd_header):
+    """
+    create RRD databases with history and fetch it - (create, fetch)
+
+    rrdtool is used if it's installed, otherwise a stub keeps the history of each RRD
+    database in memory and copies it in rrdtool create --source as rrdtool does
+    """
+    rrdtool = hms_migrate_rrd.rrdtool
+    start = 1700000000
+
+    if hasattr(rrdtool, "fetch"):
+
+        def create(rrd_filename, history):
+            rrdtool.create(
+                rrd_filename,
+                "--start",
+                str(start),
+                "--step",
+                "60",
+                [f"DS:{ds_name}:GAUGE:120:0:U" for ds_name in history],
+                "RRA:AVERAGE:0.5:1:10",
+            )
+            for count, values in enumerate(zip(*history.values()), 1):
+                rrdtool.update(
+                    rrd_filename, f"{start + 60 * count}:" + ":".join(map(str, values))
+                )
+
+        def fetch(rrd_filename):
+            _, ds_names, rows = rrdtool.fetch(
+                rrd_filename,
+                "AVERAGE",
+                "--start",
+                str(start),
+                "--end",
+                str(start + 180),
+            )
+            return {
+                ds_name: [row[count] for row in rows[:3]]
+                for count, ds_name in enumerate(ds_names)
+            }
+
+        return create, fetch
+
+    histories = {}
+
+    def create(rrd_filename, history):
+        write_rrd_header(rrd_filename, list(history))
+        histories[rrd_filename] = history
+
+    def info(rrd_filename):
+        rrd_info = {"step": 60}
+        rrd_info.update({"rra[0].cf": "AVERAGE", "rra[0].xff": 0.5})
+        rrd_info.update({"rra[0].pdp_per_row": 1, "rra[0].rows": 10})
+        for ds_name in histories[rrd_filename]:
+            rrd_info[f"ds[{ds_name}].type"] = "GAUGE"
+            rrd_info[f"ds[{ds_name}].minimal_heartbeat"] = 120
+            rrd_info[f"ds[{ds_name}].min"] = 0.0
+            rrd_info[f"ds[{ds_name}].max"] = None
+
+        return rrd_info
+
+    def rrdtool_create(rrd_filename, *args):
+        flat_args = []
+        for arg in args:
+            flat_args += arg if isinstance(arg, list) else [arg]
+        if "--no-overwrite" in flat_args and rrd_filename in histories:
+            raise RuntimeError(f"{rrd_filename} exists")
+        sources = [
+            flat_args[count + 1]
+            for count, arg in enumerate(flat_args)
+            if arg == "--source"
+        ]
+
+        # DS:new=old[N] copies data source old of the Nth source
+        history = {}
+        for arg in flat_args:
+            if not arg.startswith("DS:"):
+                continue
+            ds_name, mapping = arg.split(":")[1].split("=")
+            source_ds_name, source = mapping[:-1].split("[")
+            history[ds_name] = histories[sources[int(source) - 1]][source_ds_name]
+        create(rrd_filename, history)
+
+    monkeypatch.setattr(
+        hms_migrate_rrd,
+        "rrdtool",
+        types.SimpleNamespace(info=info, create=rrdtool_create),
+    )
+
+    return create, lambda rrd_filename: histories[rrd_filename]
+
+
+def test_migrate_metric_to_device_layout(tmp_path, rrd_history):
+    create, fetch = rrd_history
+    create(str(tmp_path / "disk-read_io.rrd"), {"sda": [1, 2, 3], "sdb": [4, 5, 6]})
+    create(str(tmp_path / "disk-write_io.rrd"), {"sda": [7, 8, 9]})
+
+    hms_migrate_rrd.Migration(str(tmp_path), "device").migrate("disk")
+
+    # each device RRD database keeps the history of its data sources
+    assert fetch(str(tmp_path / "disk" / "sda.rrd")) == {
+        "read_io": [1, 2, 3],
+        "write_io": [7, 8, 9],
+    }
+    assert fetch(str(tmp_path / "disk" / "sdb.rrd")) == {"read_io": [4, 5, 6]}
+    # source RRD databases are kept
+    assert fetch(str(tmp_path / "disk-read_io.rrd"))["sdb"] == [4, 5, 6]
+
+
+def test_migrate_device_to_metric_layout(tmp_path, rrd_history, capsys):
+    create, fetch = rrd_history
+    (tmp_path / "network").mkdir()
+    create(str(tmp_path / "network" / "eth0.rrd"), {"rx_bytes": [1, 2, 3]})
+    create(str(tmp_path / "network" / "lo.rrd"), {"rx_bytes": [4, 5, 6]})
+    # device names which are not valid data source names are skipped
+    create(str(tmp_path / "network" / "br-lan.1.rrd"), {"rx_bytes": [7, 8, 9]})
+
+    hms_migrate_rrd.Migration(str(tmp_path), "metric").migrate("network")
+
+    assert fetch(str(tmp_path / "network-rx_bytes.rrd")) == {
+        "eth0": [1, 2, 3],
+        "lo": [4, 5, 6],
+    }
+    assert "br-lan.1 is not a valid data source name" in capsys.readouterr().err
+
+    # existing RRD databases are not overwritten
+    hms_migrate_rrd.Migration(str(tmp_path), "metric").migrate("network")
+    assert "failed to create the RRD database" in capsys.readouterr().err
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+import types
+
+import pytest
+
+import hms
+import hms_metrics_poller
+
+
+@pytest.fixture
+def rrd_updates(monkeypatch):
+    """
+    RRD updates written by rrdtool.update - [(RRD database filename, template, values)]
+    """
+    updates = []
+    monkeypatch.setattr(
+        hms_metrics_poller,
+        "rrdtool",
+        types.SimpleNamespace(
+            update=lambda rrd_filename, _, template, values: updates.append(
+                (rrd_filename, template, values)
+            )
+        ),
+        raising=False,
+    )
+
+    return updates
+
+
+def test_collector_timeout(tmp_path, write_rrd_header, rrd_updates, capsys):
+    udp_rrd = str(tmp_path / "udp.rrd")
+    write_rrd_header(udp_rrd, ["InDatagrams", "OutDatagrams"])
+    config_file = tmp_path / "hms.yaml"
+    config_file.write_text(
+        f"RRD_DB_PATH: '{tmp_path}'\nCOLLECTORS: 'udp'\nCOLLECTOR_TIMEOUT: 0.1\n"
+    )
+    metrics = hms_metrics_poller.Metrics(str(config_file))
+
+    # file in the pool which is not read by the collector
+    unused_file = tmp_path / "unused"
+    unused_file.write_bytes(b"1")
+    metrics.fdpool.read(str(unused_file))
+
+    collector_release = threading.Event()
+    collector_runs = []
+
+    def poll_udp_metrics():
+        collector_runs.append(metrics.snapshot)
+        collector_release.wait(5)
+        metrics._rrd_update(["InDatagrams"], [7], udp_rrd)
+
+    metrics.poll_udp_metrics = poll_udp_metrics
+
+    # the collector times out and unknown values are written
+    metrics.poll()
+    assert rrd_updates == [
+        (udp_rrd, "InDatagrams:OutDatagrams", f"{metrics.timestamp}:U:U")
+    ]
+    assert "udp collector timed out after 0.1s" in capsys.readouterr().err
+    assert "udp" in metrics.overrun_collectors
+
+    # the collector is not started again while it's still running, and file
+    # descriptors of the pool are not released
+    metrics.poll()
+    assert len(collector_runs) == 1
+    assert rrd_updates[-1] == (
+        udp_rrd,
+        "InDatagrams:OutDatagrams",
+        f"{metrics.timestamp}:U:U",
+    )
+    assert "udp collector is still running" in capsys.readouterr().err
+    assert metrics.fdpool.opened() == 1
+
+    # late updates of the overrun collector are dropped, the collector runs again in
+    # the next cycle once it's finished
+    collector_release.set()
+    metrics.overrun_collectors["udp"].join(5)
+    metrics.poll()
+    assert len(collector_runs) == 2
+    assert rrd_updates[-1] == (udp_rrd, "InDatagrams", f"{metrics.timestamp}:7")
+    assert len(rrd_updates) == 3
+    assert "udp" not in metrics.overrun_collectors
+
+    # unused file descriptors are released once no collector is running, the file was
+    # read before the first release, so it's released in the next cycle
+    metrics.poll()
+    assert metrics.fdpool.opened() == 0
+
+
+def test_sockstat_rrd_databases_checked_separately(
+    tmp_path, write_rrd_header, rrd_updates
+):
+    sockstat_rrd = str(tmp_path / "sockstat.rrd")
+    write_rrd_header(sockstat_rrd, ["sockets_used"])
+    config_file = tmp_path / "hms.yaml"
+    config_file.write_text(f"RRD_DB_PATH: '{tmp_path}'\nCOLLECTORS: 'sockstat'\n")
+    metrics = hms_metrics_poller.Metrics(str(config_file))
+    metrics.snapshot = hms.procfs.Snapshot()
+
+    # sockstat6.rrd is not bootstrapped, so only sockstat.rrd is updated
+    metrics.poll_sockstat_metrics()
+    assert [rrd_update[0] for rrd_update in rrd_updates] == [sockstat_rrd]
+
+    rrd_updates.clear()
+    os.remove(sockstat_rrd)
+    metrics.poll_sockstat_metrics()
+    assert rrd_updates == []
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+import errno
+import os
+import threading
+
+import pytest
+
+from hms import os as hms_os
+from hms import procfs
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    """
+    procfs tree with 2 running processes, a zombie process and a sleeping process, the
+    processes have 7 threads in total
+    """
+    proc = tmp_path / "proc"
+    proc.mkdir()
+    (proc / "loadavg").write_text("0.50 0.40 0.30 2/7 300\n")
+    (proc / "stat").write_text("ctxt 1000\nprocs_running 2\nprocs_blocked 0\n")
+    for pid, state in [(1, "R"), (2, "R"), (30, "Z"), (31, "S")]:
+        (proc / str(pid)).mkdir()
+        (proc / str(pid) / "stat").write_text(f"{pid} (cmd (x)) {state} 1 1 1\n")
+
+    procfs.set_root(str(proc), str(tmp_path / "sys"))
+    yield proc
+    procfs.set_root()
+
+
+def test_process_scan_opens_are_counted(proc_root):
+    fdpool = procfs.FDPool()
+    snapshot = procfs.Snapshot(fdpool)
+
+    procs = hms_os.OS(snapshot).procs
+
+    # total is the number of processes in the process table, not threads in loadavg
+    assert procs == {
+        "num_total_procs": 4,
+        "num_running_procs": "2",
+        "num_blocked_procs": "0",
+        "num_zombie_procs": 1,
+        "num_other_procs": 1,
+    }
+    # /proc/<pid>/stat files are opened outside of the pool for one read
+    assert snapshot.files_opened == 4
+    assert fdpool.files_opened == 2
+    assert snapshot.files_read == 6
+    fdpool.close_all()
+
+
+def test_process_scan_skipped(proc_root):
+    snapshot = procfs.Snapshot(procfs.FDPool())
+
+    procs = hms_os.OS(snapshot, scan_procs=False).procs
+
+    # total and running tasks are read from loadavg without the process table scan
+    assert procs == {
+        "num_total_procs": "7",
+        "num_running_procs": "2",
+        "num_blocked_procs": "0",
+        "num_zombie_procs": None,
+        "num_other_procs": None,
+    }
+    assert snapshot.files_opened == 0
+    snapshot.fdpool.close_all()
+
+
+def test_snapshot_without_pool_counts_opens(proc_root):
+    snapshot = procfs.Snapshot()
+
+    assert snapshot.readlines("/proc/loadavg") == [b"0.50 0.40 0.30 2/7 300"]
+    assert snapshot.readlines("/proc/loadavg") == [b"0.50 0.40 0.30 2/7 300"]
+    assert snapshot.readlines("/proc/missing") == []
+
+    assert snapshot.files_opened == 1
+    assert snapshot.files_read == 1
+
+
+def test_fdpool_buffer_growth(tmp_path):
+    path = str(tmp_path / "stat")
+    with open(path, "wb") as f:
+        f.write(b"x" * 100)
+    fdpool = procfs.FDPool(buffer_size=16, max_buffer_size=128)
+
+    assert fdpool.read(path) == b"x" * 100
+    # the grown buffer is kept and re-read from offset 0
+    assert len(fdpool._buffers[path]) == 128
+    with open(path, "wb") as f:
+        f.write(b"y" * 10)
+    assert fdpool.read(path) == b"y" * 10
+    assert fdpool.files_opened == 1
+
+    # buffers above max_buffer_size are not kept
+    with open(path, "wb") as f:
+        f.write(b"z" * 200)
+    assert fdpool.read(path) == b"z" * 200
+    assert path not in fdpool._buffers
+    fdpool.close_all()
+
+
+@pytest.mark.parametrize("error", [errno.ENODEV, errno.ENOENT])
+def test_fdpool_device_disappeared(tmp_path, monkeypatch, error):
+    path = str(tmp_path / "statistics")
+    with open(path, "wb") as f:
+        f.write(b"1\n")
+    fdpool = procfs.FDPool()
+    assert fdpool.read(path) == b"1\n"
+
+    preadv = os.preadv
+
+    def failed_preadv(*args):
+        raise OSError(error, os.strerror(error))
+
+    # the file descriptor is dropped if the file cannot be read any more
+    monkeypatch.setattr(os, "preadv", failed_preadv)
+    assert fdpool.read(path) is None
+    assert fdpool.opened() == 0
+
+    # the file is opened again if the device comes back
+    monkeypatch.setattr(os, "preadv", preadv)
+    assert fdpool.read(path) == b"1\n"
+    assert fdpool.files_opened == 2
+
+    # nothing is kept if the file is removed
+    fdpool.close(path)
+    os.remove(path)
+    assert fdpool.read(path) is None
+    assert fdpool.opened() == 0
+
+
+def test_fdpool_release_unused(tmp_path):
+    paths = []
+    for name in ["a", "b"]:
+        paths.append(str(tmp_path / name))
+        with open(paths[-1], "wb") as f:
+            f.write(name.encode())
+    fdpool = procfs.FDPool()
+
+    fdpool.read(paths[0])
+    fdpool.read(paths[1])
+    fdpool.release_unused()
+    assert fdpool.opened() == 2
+
+    fdpool.read(paths[0])
+    fdpool.release_unused()
+    assert fdpool.opened() == 1
+    assert paths[0] in fdpool._fds
+
+    fdpool.release_unused()
+    assert fdpool.opened() == 0
+
+
+def test_fdpool_close_waits_for_read(tmp_path, monkeypatch):
+    path = str(tmp_path / "stat")
+    with open(path, "wb") as f:
+        f.write(b"content")
+    fdpool = procfs.FDPool()
+    fdpool.read(path)
+
+    preadv = os.preadv
+    read_started = threading.Event()
+    read_release = threading.Event()
+
+    def blocked_preadv(*args):
+        read_started.set()
+        read_release.wait(5)
+        return preadv(*args)
+
+    monkeypatch.setattr(os, "preadv", blocked_preadv)
+    results = []
+    reader = threading.Thread(target=lambda: results.append(fdpool.read(path)))
+    reader.start()
+    read_started.wait(5)
+
+    # release_unused of another thread closes the file after the read only
+    closer = threading.Thread(target=fdpool.close, args=(path,))
+    closer.start()
+    closer.join(0.1)
+    assert closer.is_alive()
+    assert fdpool.opened() == 1
+
+    read_release.set()
+    reader.join(5)
+    closer.join(5)
+
+    assert results == [b"content"]
+    assert fdpool.opened() == 0
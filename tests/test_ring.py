@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import math
+
+import pytest
+
+from hms import ring
+
+
+@pytest.fixture
+def writer(tmp_path):
+    return ring.RingBufferWriter(str(tmp_path / "hms.ring"), capacity=4, step=60)
+
+
+def is_nan_list(values):
+    return [math.isnan(value) for value in values]
+
+
+def test_gauge_samples(writer):
+    writer.write(60, {"load": 0.5}, {"load": ring.metric_types["GAUGE"]})
+    reader = ring.RingBufferReader(writer.path)
+
+    assert reader.read() == ([60], {"load": [0.5]})
+    assert reader.names == ["load"]
+    assert reader.step == 60
+
+    # only the last capacity samples are kept
+    for timestamp in range(120, 420, 60):
+        writer.write(timestamp, {"load": timestamp / 100})
+    assert reader.read() == (
+        [180, 240, 300, 360],
+        {"load": [1.8, 2.4, 3.0, 3.6]},
+    )
+
+
+def test_counter_rates(writer):
+    metrics = {
+        "bytes": ring.metric_types["COUNTER"],
+        "events": ring.metric_types["ABSOLUTE"],
+        "delta": ring.metric_types["DERIVE"],
+    }
+    samples = [
+        (0, {"bytes": 100, "events": 0, "delta": 50}),
+        (60, {"bytes": 160, "events": 120, "delta": 20}),
+        # counter reset
+        (120, {"bytes": 10, "events": 60, "delta": 80}),
+    ]
+    for timestamp, values in samples:
+        writer.write(timestamp, values, metrics)
+    reader = ring.RingBufferReader(writer.path)
+
+    timestamps, series = reader.read()
+
+    assert timestamps == [0, 60, 120]
+    assert is_nan_list(series["bytes"]) == [True, False, True]
+    assert series["bytes"][1] == 1.0
+    assert series["events"][1:] == [2.0, 1.0]
+    assert series["delta"][1:] == [-0.5, 1.0]
+
+
+def test_counter_rates_in_window(writer):
+    metrics = {"bytes": ring.metric_types["COUNTER"]}
+    for timestamp, value in [(0, 0), (60, 60), (120, 180), (180, 360)]:
+        writer.write(timestamp, {"bytes": value}, metrics)
+    reader = ring.RingBufferReader(writer.path)
+
+    # the rate of the first sample in the window is calculated from the sample before
+    assert reader.read(["bytes", "missing"], window=60) == (
+        [120, 180],
+        {"bytes": [2.0, 3.0]},
+    )
+
+
+class FakeSequence:
+    """
+    ring sequence struct returning the given sequence values in order
+    """
+
+    def __init__(self, sequences):
+        self.sequences = list(sequences)
+        self.reads = 0
+
+    def unpack_from(self, buffer, offset):
+        self.reads += 1
+        return (self.sequences.pop(0),)
+
+
+@pytest.mark.parametrize(
+    "sequences, reads",
+    [
+        # consistent on the first attempt
+        ([2, 2], 2),
+        # a sample is being written, the reader waits for the even sequence
+        ([3, 3, 4, 4], 4),
+        # a sample is written while samples are copied
+        ([2, 4, 4, 4], 4),
+    ],
+)
+def test_seqlock_retry(writer, monkeypatch, sequences, reads):
+    writer.write(60, {"load": 0.5}, {"load": ring.metric_types["GAUGE"]})
+    reader = ring.RingBufferReader(writer.path)
+    reader._map()
+
+    sequence = FakeSequence(sequences)
+    monkeypatch.setattr(ring, "ring_sequence", sequence)
+
+    assert reader.read() == ([60], {"load": [0.5]})
+    assert sequence.reads == reads
+
+
+def test_seqlock_retries_exhausted(writer, monkeypatch):
+    writer.write(60, {"load": 0.5}, {"load": ring.metric_types["GAUGE"]})
+    reader = ring.RingBufferReader(writer.path, retries=3)
+    reader._map()
+
+    monkeypatch.setattr(ring, "ring_sequence", FakeSequence([1, 1, 1]))
+
+    assert reader.read() == ([], {})
+
+
+def test_remap_keeps_mapping_of_readers(writer):
+    writer.write(60, {"load": 0.5}, {"load": ring.metric_types["GAUGE"]})
+    reader = ring.RingBufferReader(writer.path)
+    reader.read()
+    old_mapping = reader.mapping
+
+    # a new metric replaces the ring buffer file
+    writer.write(120, {"load": 0.6, "fd": 10}, {"fd": ring.metric_types["GAUGE"]})
+
+    timestamps, series = reader.read()
+
+    assert timestamps == [60, 120]
+    assert series["load"] == [0.5, 0.6]
+    assert is_nan_list(series["fd"]) == [True, False]
+    assert reader.mapping is not old_mapping
+    assert reader.names == ["load", "fd"]
+    # the old mapping is still readable by a request which holds it
+    assert old_mapping.ring[:8] == ring.ring_magic
+
+
+def test_missing_or_invalid_file(tmp_path):
+    reader = ring.RingBufferReader(str(tmp_path / "missing.ring"))
+    assert reader.read() == ([], {})
+
+    invalid = tmp_path / "invalid.ring"
+    invalid.write_bytes(b"x" * ring.ring_header.size)
+    reader = ring.RingBufferReader(str(invalid))
+    assert reader.read() == ([], {})
+    assert reader.names == []
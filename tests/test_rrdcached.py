@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+import socket
+import threading
+import types
+
+import pytest
+
+from hms import rrdcached
+
+import hms_metrics_poller
+
+batch_greeting = "0 Go ahead.  End with dot '.' on its own line."
+
+
+class StubRRDCached:
+    """
+    rrdcached stub server on a unix socket, it records received lines and answers
+    BATCH commands with the configured error lines
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lines = []
+        self.errors = []
+        self.batch_status = batch_greeting
+        self.close_after_batch = False
+        self.connections = 0
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(path)
+        self.sock.listen(4)
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            with conn, conn.makefile("rwb") as f:
+                self._handle(f)
+
+    def _handle(self, f):
+        for line in f:
+            line = line.decode().rstrip("\n")
+            self.lines.append(line)
+            if line != "BATCH":
+                f.write(b"0 OK\n")
+                f.flush()
+                continue
+
+            f.write(self.batch_status.encode() + b"\n")
+            f.flush()
+            if not self.batch_status.startswith("0 "):
+                continue
+
+            for line in f:
+                line = line.decode().rstrip("\n")
+                self.lines.append(line)
+                if line == ".":
+                    break
+
+            f.write(
+                "\n".join([f"{len(self.errors)} errors"] + self.errors).encode() + b"\n"
+            )
+            f.flush()
+            if self.close_after_batch:
+                return
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def stub(tmp_path):
+    server = StubRRDCached(str(tmp_path / "rrdcached.sock"))
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_metrics(tmp_path):
+    def _make_metrics(address):
+        config_file = tmp_path / "hms.yaml"
+        config_file.write_text(
+            f"RRD_DB_PATH: '{tmp_path}'\nRRDCACHED_ADDRESS: '{address}'\n"
+        )
+        return hms_metrics_poller.Metrics(str(config_file))
+
+    return _make_metrics
+
+
+def test_batch_framing(stub):
+    client = rrdcached.RRDCached(f"unix:{stub.path}")
+
+    errors = client.update([("/rrd/a.rrd", "100:1:2"), ("/rrd/b.rrd", "100:U")])
+
+    assert errors == []
+    assert stub.lines == [
+        "BATCH",
+        "UPDATE /rrd/a.rrd 100:1:2",
+        "UPDATE /rrd/b.rrd 100:U",
+        ".",
+    ]
+    client.close()
+
+
+def test_empty_batch_is_not_sent(stub):
+    client = rrdcached.RRDCached(stub.path)
+
+    assert client.update([]) == []
+    assert stub.lines == []
+
+
+def test_batch_error_lines(stub):
+    stub.errors = [
+        "2 illegal attempt to update using time 100 when last update time is 200",
+        "unexpected error line",
+    ]
+    client = rrdcached.RRDCached(stub.path)
+
+    errors = client.update([("/rrd/a.rrd", "200:1"), ("/rrd/b.rrd", "100:1")])
+
+    assert errors == [
+        (
+            "/rrd/b.rrd",
+            "illegal attempt to update using time 100 when last update time is 200",
+        ),
+        (None, "unexpected error line"),
+    ]
+    client.close()
+
+
+def test_batch_refused(stub):
+    stub.batch_status = "-1 Batch mode is not allowed"
+    client = rrdcached.RRDCached(stub.path)
+
+    with pytest.raises(rrdcached.RRDCachedError, match="Batch mode is not allowed"):
+        client.update([("/rrd/a.rrd", "100:1")])
+    client.close()
+
+
+def test_reconnect_after_connection_closed(stub):
+    stub.close_after_batch = True
+    client = rrdcached.RRDCached(stub.path)
+
+    assert client.update([("/rrd/a.rrd", "100:1")]) == []
+    assert client.update([("/rrd/a.rrd", "160:2")]) == []
+
+    assert stub.connections == 2
+    assert stub.lines[-2:] == ["UPDATE /rrd/a.rrd 160:2", "."]
+    client.close()
+
+
+def test_daemon_down(tmp_path):
+    client = rrdcached.RRDCached(f"unix:{tmp_path}/missing.sock")
+
+    with pytest.raises(OSError):
+        client.update([("/rrd/a.rrd", "100:1")])
+
+
+def test_queue_order(stub, tmp_path, make_metrics, write_rrd_header):
+    os_rrd = str(tmp_path / "os.rrd")
+    udp_rrd = str(tmp_path / "udp.rrd")
+    write_rrd_header(os_rrd, ["loadavg_1min", "num_used_fd", "num_total_procs"])
+    write_rrd_header(udp_rrd, ["InDatagrams", "OutDatagrams"])
+
+    metrics = make_metrics(f"unix:{stub.path}")
+    metrics.timestamp = "100"
+    # values are ordered by data source index and missing data sources are unknown
+    metrics._rrd_write(["num_total_procs", "loadavg_1min"], [300, "0.5"], os_rrd)
+    metrics._rrd_write(["OutDatagrams", "InDatagrams"], [None, 7], udp_rrd)
+
+    assert metrics.rrdcached_updates == [
+        (os_rrd, "100:0.5:U:300"),
+        (udp_rrd, "100:7:U"),
+    ]
+
+    metrics._rrdcached_flush_updates()
+
+    assert metrics.rrdcached_updates == []
+    assert stub.lines == [
+        "BATCH",
+        f"UPDATE {os_rrd} 100:0.5:U:300",
+        f"UPDATE {udp_rrd} 100:7:U",
+        ".",
+    ]
+
+
+def test_queue_unknown_data_source(
+    stub, tmp_path, make_metrics, write_rrd_header, capsys
+):
+    udp_rrd = str(tmp_path / "udp.rrd")
+    write_rrd_header(udp_rrd, ["InDatagrams"])
+
+    metrics = make_metrics(f"unix:{stub.path}")
+    metrics._rrd_write(["NoPorts"], [1], udp_rrd)
+
+    assert metrics.rrdcached_updates == []
+    assert "unknown data source NoPorts" in capsys.readouterr().err
+
+
+def test_fallback_when_daemon_down(
+    tmp_path, make_metrics, write_rrd_header, monkeypatch, capsys
+):
+    os_rrd = str(tmp_path / "os.rrd")
+    udp_rrd = str(tmp_path / "udp.rrd")
+    write_rrd_header(os_rrd, ["loadavg_1min", "num_used_fd"])
+    write_rrd_header(udp_rrd, ["InDatagrams"])
+
+    updates = []
+    monkeypatch.setattr(
+        hms_metrics_poller,
+        "rrdtool",
+        types.SimpleNamespace(update=lambda *args: updates.append(args)),
+        raising=False,
+    )
+
+    metrics = make_metrics(f"unix:{tmp_path}/missing.sock")
+    metrics.timestamp = "100"
+    metrics._rrd_write(["num_used_fd"], [42], os_rrd)
+    metrics._rrd_write(["InDatagrams"], [7], udp_rrd)
+    metrics._rrdcached_flush_updates()
+
+    assert updates == [(os_rrd, "100:U:42"), (udp_rrd, "100:7")]
+    assert metrics.rrdcached_updates == []
+    assert "updating RRD databases directly" in capsys.readouterr().err
+
+
+def test_batch_errors_are_reported(
+    stub, tmp_path, make_metrics, write_rrd_header, capsys
+):
+    udp_rrd = str(tmp_path / "udp.rrd")
+    write_rrd_header(udp_rrd, ["InDatagrams"])
+    stub.errors = ["1 illegal attempt to update using time 100"]
+
+    metrics = make_metrics(f"unix:{stub.path}")
+    metrics.timestamp = "100"
+    metrics._rrd_write(["InDatagrams"], [7], udp_rrd)
+    metrics._rrdcached_flush_updates()
+
+    assert (
+        f"rrdcached failed to update the RRD database {udp_rrd}: illegal attempt"
+        in capsys.readouterr().err
+    )
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import math
+import struct
+
+import pytest
+
+from hms import series
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """
+    run with numpy if it's installed and in pure Python
+    """
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(series, "numpy", None)
+
+    return request.param
+
+
+def get_series(length):
+    """
+    time series with a spike in the middle and unknown values
+    """
+    timestamps = [60 * count for count in range(length)]
+    values = [float(count % 7) for count in range(length)]
+    values[length // 2] = 100.0
+    values[3] = math.nan
+
+    return timestamps, values
+
+
+@pytest.mark.parametrize("algorithm", series.algorithms)
+def test_downsample_keeps_endpoints(backend, algorithm):
+    timestamps, values = get_series(1000)
+
+    for max_points in [2, 3, 4, 10, 101]:
+        sampled_timestamps, sampled_values = series.downsample(
+            timestamps, values, max_points, algorithm
+        )
+        sampled_timestamps = list(sampled_timestamps)
+
+        assert 2 <= len(sampled_timestamps) <= max_points
+        assert sampled_timestamps[0] == timestamps[0]
+        assert sampled_timestamps[-1] == timestamps[-1]
+        assert sampled_timestamps == sorted(sampled_timestamps)
+        assert len(sampled_values) == len(sampled_timestamps)
+
+    # the spike is never lost
+    _, sampled_values = series.downsample(timestamps, values, 10, algorithm)
+    assert 100.0 in list(sampled_values)
+
+
+@pytest.mark.parametrize("algorithm", series.algorithms)
+def test_downsample_short_series(backend, algorithm):
+    timestamps, values = get_series(10)
+
+    assert series.downsample(timestamps, values, 10, algorithm) == (
+        timestamps,
+        values,
+    )
+
+
+def test_downsample_backends_select_same_points(monkeypatch):
+    pytest.importorskip("numpy")
+    timestamps, values = get_series(1000)
+
+    for algorithm in series.algorithms:
+        numpy_timestamps, _ = series.downsample(timestamps, values, 50, algorithm)
+        with monkeypatch.context() as m:
+            m.setattr(series, "numpy", None)
+            python_timestamps, _ = series.downsample(timestamps, values, 50, algorithm)
+
+        assert list(numpy_timestamps) == python_timestamps
+
+
+def test_downsample_lttb_unknown_bucket(backend):
+    timestamps = list(range(12))
+    values = [1.0] + [math.nan] * 10 + [2.0]
+
+    sampled_timestamps, sampled_values = series.downsample_lttb(timestamps, values, 4)
+
+    assert len(sampled_timestamps) == 4
+    assert series.to_list(sampled_values) == [1.0, None, None, 2.0]
+
+
+def test_pack_series(backend):
+    packed = series.pack_series(
+        [([60, 120], [1.5, math.nan]), ([60, 120, 180], [1.0, 2.0, 3.0])]
+    )
+
+    assert len(packed) == (8 + 16 * 2) + (8 + 16 * 3)
+    assert struct.unpack_from("<II2d2d", packed, 0)[:5] == (2, 0, 60.0, 120.0, 1.5)
+    assert math.isnan(struct.unpack_from("<d", packed, 32)[0])
+    assert struct.unpack_from("<II3d3d", packed, 40) == (
+        3,
+        0,
+        60.0,
+        120.0,
+        180.0,
+        1.0,
+        2.0,
+        3.0,
+    )
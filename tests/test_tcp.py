@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import errno
+import socket
+import struct
+
+import pytest
+
+from hms import procfs
+from hms import tcp
+
+NLM_F_MULTI = 0x2
+
+
+def diag_message(state):
+    """
+    inet_diag_msg of a socket in state
+    """
+    # inet_diag_msg is 72 bytes, family and state are the first 2 bytes
+    return (
+        tcp.nlmsghdr.pack(
+            tcp.nlmsghdr.size + 72, tcp.SOCK_DIAG_BY_FAMILY, NLM_F_MULTI, 1, 0
+        )
+        + bytes([socket.AF_INET, state])
+        + bytes(70)
+    )
+
+
+def done_message():
+    return tcp.nlmsghdr.pack(tcp.nlmsghdr.size + 4, tcp.NLMSG_DONE, NLM_F_MULTI, 1, 0)
+
+
+def error_message(error):
+    return (
+        tcp.nlmsghdr.pack(tcp.nlmsghdr.size * 2 + 4, tcp.NLMSG_ERROR, 0, 1, 0)
+        + struct.pack("=i", -error)
+        + tcp.nlmsghdr.pack(0, 0, 0, 0, 0)
+    )
+
+
+class FakeNetlinkSocket:
+    """
+    netlink socket receiving the given datagrams
+    """
+
+    def __init__(self, datagrams):
+        self.datagrams = list(datagrams)
+
+    def __call__(self, family, type, proto):
+        assert (family, proto) == (socket.AF_NETLINK, tcp.NETLINK_SOCK_DIAG)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def sendto(self, data, address):
+        pass
+
+    def recv_into(self, buffer):
+        if not self.datagrams:
+            return 0
+        datagram = self.datagrams.pop(0)
+        buffer[: len(datagram)] = datagram
+        return len(datagram)
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    """
+    procfs tree with 2 established and 1 listening IPv4 sockets, no IPv6 sockets
+    """
+    net = tmp_path / "proc" / "net"
+    net.mkdir(parents=True)
+    (net / "tcp").write_text(
+        "  sl  local_address rem_address   st tx_queue rx_queue\n"
+        + "   0: 0100007F:0016 00000000:0000 0A 00000000:00000000\n"
+        + "   1: 0100007F:0016 0100007F:A000 01 00000000:00000000\n"
+        + "   2: 0100007F:0016 0100007F:A001 01 00000000:00000000\n"
+    )
+
+    procfs.set_root(str(tmp_path / "proc"), str(tmp_path / "sys"))
+    yield net
+    procfs.set_root()
+
+
+def test_count_netlink_socket_states():
+    state_counts = [0] * 256
+    buffer = bytearray(4096)
+    datagram = diag_message(1) + diag_message(10) + diag_message(1)
+    buffer[: len(datagram)] = datagram
+
+    assert not tcp.count_netlink_socket_states(buffer, len(datagram), state_counts)
+    assert state_counts[1] == 2
+    assert state_counts[10] == 1
+
+    # messages after NLMSG_DONE are not counted
+    datagram = done_message() + diag_message(1)
+    buffer[: len(datagram)] = datagram
+    assert tcp.count_netlink_socket_states(buffer, len(datagram), state_counts)
+    assert state_counts[1] == 2
+
+
+def test_count_netlink_socket_states_error():
+    buffer = bytearray(error_message(errno.EPERM))
+
+    with pytest.raises(OSError) as e:
+        tcp.count_netlink_socket_states(buffer, len(buffer), [0] * 256)
+    assert e.value.errno == errno.EPERM
+
+    # truncated message
+    buffer = bytearray(diag_message(1))
+    with pytest.raises(OSError, match="truncated"):
+        tcp.count_netlink_socket_states(buffer, len(buffer) - 1, [0] * 256)
+
+
+def test_netlink_multipart_dump(proc_root, monkeypatch):
+    monkeypatch.setattr(
+        socket,
+        "socket",
+        FakeNetlinkSocket(
+            [
+                diag_message(1) + diag_message(6),
+                diag_message(1) + diag_message(10),
+                done_message(),
+            ]
+        ),
+    )
+
+    states = tcp.TCP(backend="netlink").tcp
+
+    assert states["ESTABLISHED"] == 2
+    assert states["TIME_WAIT"] == 1
+    assert states["LISTEN"] == 1
+    assert states["CLOSE"] == 0
+
+
+def test_netlink_error_falls_back_to_procfs(proc_root, monkeypatch):
+    monkeypatch.setattr(
+        socket, "socket", FakeNetlinkSocket([error_message(errno.EPERM)] * 2)
+    )
+
+    tcp_info = tcp.TCP(backend="netlink")
+
+    assert tcp_info.tcp["ESTABLISHED"] == 2
+    assert tcp_info.tcp["LISTEN"] == 1
+    # /proc/net/tcp6 is missing
+    assert tcp_info.tcp6["ESTABLISHED"] is None
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import calendar
+import time
+
+import pytest
+
+from hms import timespec
+
+# Wed Jan 10 2024 15:30:00 UTC
+now = calendar.timegm((2024, 1, 10, 15, 30, 0))
+
+
+@pytest.fixture(autouse=True)
+def utc(monkeypatch):
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def utc_time(*local_time):
+    return calendar.timegm(local_time + (0,) * (6 - len(local_time)))
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        # examples of TIME SPECIFICATION in the rrdfetch manual
+        ("end-8h", "now", (now - 8 * 3600, now)),
+        ("-1d", "now", (now - 86400, now)),
+        ("noon yesterday -3hours", "now", (utc_time(2024, 1, 9, 9), now)),
+        ("end-24h", "00:00", (utc_time(2024, 1, 9), utc_time(2024, 1, 10))),
+        (
+            "noon yesterday",
+            "start+6h",
+            (utc_time(2024, 1, 9, 12), utc_time(2024, 1, 9, 18)),
+        ),
+        ("12am yesterday", "12am today", (utc_time(2024, 1, 9), utc_time(2024, 1, 10))),
+        ("-1h30m", "now", (now - 5400, now)),
+        ("-1y6m", "now", (utc_time(2022, 7, 10, 15, 30), now)),
+        # m right after the sign is months below 6 and minutes from 6
+        ("end-15m", "now", (now - 15 * 60, now)),
+        ("-10m", "now", (now - 10 * 60, now)),
+        ("-20m", "now", (now - 20 * 60, now)),
+        ("-6m", "now", (now - 6 * 60, now)),
+        ("-5m", "now", (utc_time(2023, 8, 10, 15, 30), now)),
+        ("-1m", "now", (utc_time(2023, 12, 10, 15, 30), now)),
+        # abbreviations of now, start and end
+        ("e-1h", "now", (now - 3600, now)),
+        ("n-2h", "n", (now - 7200, now)),
+        ("-2d", "s+1d", (now - 2 * 86400, now - 86400)),
+        ("e-1w", "now", (now - 7 * 86400, now)),
+    ],
+)
+def test_resolve_time_range(start, end, expected):
+    assert timespec.resolve_time_range(start, end, now) == expected
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        ("end-1h", "end"),
+        ("end-1h", "start+1h"),
+        ("e-1h", "s+1h"),
+        ("now", "end-1h"),
+        ("now", "now"),
+        ("bogus", "now"),
+        ("-1x", "now"),
+        # empty time and signs without number
+        ("", "now"),
+        ("-1h", ""),
+        ("+", "now"),
+        ("now-", "now"),
+        ("-1h", "now+"),
+        ("now-1h+-1h", "now"),
+        # times out of the range of the platform
+        ("99999999999999999999", "now"),
+        ("now-99999999999y", "now"),
+        ("now+99999999999y", "now"),
+        ("-1d", "now+99999999999999999999999999999s"),
+    ],
+)
+def test_invalid_time_range(start, end):
+    with pytest.raises(ValueError):
+        timespec.resolve_time_range(start, end, now)
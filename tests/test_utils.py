@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+from hms import utils
+
+
+def test_rra_definitions_default_tiers():
+    assert utils.get_rra_definitions("60", utils.rra_tiers) == [
+        f"RRA:{cf}:0.5:{steps}:{rows}"
+        for steps, rows in [(1, 2880), (5, 4032), (60, 8784), (1440, 1830)]
+        for cf in ["AVERAGE", "MIN", "MAX"]
+    ]
+
+
+def test_rra_definitions_rounded_to_step():
+    # 90s is rounded up to 2 steps, tiers with the same resolution keep the longest
+    # retention
+    assert utils.get_rra_definitions("1m", "90s:1h, 1m:1d,60s:2d") == [
+        "RRA:AVERAGE:0.5:1:2880",
+        "RRA:MIN:0.5:1:2880",
+        "RRA:MAX:0.5:1:2880",
+        "RRA:AVERAGE:0.5:2:30",
+        "RRA:MIN:0.5:2:30",
+        "RRA:MAX:0.5:2:30",
+    ]
+    # resolution below the step is the step
+    assert utils.get_rra_definitions("300", "1m:1d")[0] == "RRA:AVERAGE:0.5:1:288"
+
+
+def test_estimate_rrd_size():
+    rra = ["RRA:AVERAGE:0.5:1:10"]
+
+    # headers, ds_def / pdp_prep, rra_def / rra_ptr, cdp_prep and 10 rows
+    assert utils.estimate_rrd_size(1, rra) == 128 + 16 + 232 + 128 + 80 + 80
+    # each row has one value per data source
+    assert (
+        utils.estimate_rrd_size(2, ["RRA:AVERAGE:0.5:1:11"])
+        - utils.estimate_rrd_size(2, ["RRA:AVERAGE:0.5:1:10"])
+        == 16
+    )
+    assert utils.estimate_rrd_size(
+        20, utils.get_rra_definitions("60", utils.rra_tiers)
+    ) < utils.estimate_rrd_size(20, ["RRA:AVERAGE:0.5:1:525600"])
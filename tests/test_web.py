@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+import pytest
+
+import hms
+import hms_web
+
+
+@pytest.fixture
+def uwsgi_python(tmp_path, monkeypatch):
+    """
+    run as uWSGI binary in a Python installation under tmp_path
+    """
+    monkeypatch.setattr(sys, "executable", "/usr/sbin/uwsgi")
+    monkeypatch.setattr(sys, "prefix", str(tmp_path))
+    (tmp_path / "bin").mkdir()
+
+    return tmp_path
+
+
+def test_render_python_configured(tmp_path):
+    with pytest.raises(RuntimeError, match="RENDER_PYTHON"):
+        hms_web.get_render_python({"RENDER_PYTHON": str(tmp_path / "python3")})
+
+    assert (
+        hms_web.get_render_python({"RENDER_PYTHON": sys.executable}) == sys.executable
+    )
+
+
+def test_render_python_in_prefix(uwsgi_python):
+    with pytest.raises(RuntimeError, match="please set RENDER_PYTHON"):
+        hms_web.get_render_python({})
+
+    python = uwsgi_python / "bin" / f"python{sys.version_info.major}"
+    python.write_text("")
+    python.chmod(0o755)
+
+    assert hms_web.get_render_python({}) == str(python)
+
+
+def test_render_pool_not_started(uwsgi_python, monkeypatch, capsys):
+    monkeypatch.setattr(hms_web, "render_pool", None)
+    monkeypatch.setattr(hms_web, "render_pool_failed", None)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+
+    assert hms_web.get_render_pool({"RENDER_WORKERS": 2}) is None
+    assert "graphs are rendered one after another" in capsys.readouterr().err
+
+    # the failure is only reported once
+    assert hms_web.get_render_pool({"RENDER_WORKERS": 2}) is None
+    assert capsys.readouterr().err == ""
+
+
+@pytest.mark.parametrize(
+    "render_workers, web_processes, expected",
+    [
+        (None, 1, 2),
+        (2, 4, 2),
+        (16, 4, 2),
+        (0, 4, 2),
+        (0, 1, 8),
+        (4, 16, 1),
+    ],
+)
+def test_render_workers_capped(render_workers, web_processes, expected, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(hms_web, "get_web_processes", lambda: web_processes)
+
+    config = {} if render_workers is None else {"RENDER_WORKERS": render_workers}
+
+    assert hms_web.get_render_workers(config) == expected
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, write_rrd_header):
+    """
+    web application test client with os.rrd in RRD_DB_PATH
+    """
+    config_file = tmp_path / "hms.yaml"
+    config_file.write_text(f"RRD_DB_PATH: '{tmp_path}'\n")
+    monkeypatch.setattr(hms_web, "config_file", str(config_file))
+    monkeypatch.setattr(hms_web, "config", None)
+    monkeypatch.setattr(hms_web, "get_hostname", lambda: "localhost")
+    write_rrd_header(str(tmp_path / "os.rrd"), ["loadavg_1min", "loadavg_5min"])
+
+    return hms_web.app.test_client()
+
+
+@pytest.fixture
+def fetched_series(monkeypatch):
+    """
+    fetch 100 points of each data source - [fetch_series args]
+    """
+    fetches = []
+
+    def fetch_series(rrd_filename, ds_names, start, end, cf, resolution, daemon):
+        fetches.append((ds_names, cf, resolution))
+        timestamps = [end - 60 * (100 - count) for count in range(100)]
+        return 60, {
+            ds_name: (timestamps, [float(count) for count in range(100)])
+            for ds_name in ds_names
+        }
+
+    monkeypatch.setattr(hms.series, "fetch_series", fetch_series)
+
+    return fetches
+
+
+@pytest.mark.parametrize(
+    "query, status",
+    [
+        ("rrd=../os", 400),
+        ("rrd=missing", 404),
+        ("rrd=os&ds=missing", 404),
+        ("rrd=os&cf=LAST", 400),
+        ("rrd=os&algorithm=average", 400),
+        ("rrd=os&format=csv", 400),
+        ("rrd=os&max_points=1", 400),
+        ("rrd=os&max_points=x", 400),
+        ("rrd=os&start=now-", 400),
+        ("rrd=os&start=99999999999999999999", 400),
+    ],
+)
+def test_series_api_invalid_query(client, fetched_series, query, status):
+    response = client.get(f"/hms/api/series?{query}")
+
+    assert response.status_code == status
+    assert "error" in response.get_json()
+    assert fetched_series == []
+
+
+def test_series_api_invalid_rrd(client, tmp_path, monkeypatch, capsys):
+    (tmp_path / "corrupt.rrd").write_bytes(b"not a RRD database")
+
+    def rrd_info(*args):
+        raise RuntimeError("not a RRD file")
+
+    monkeypatch.setattr(hms.series.rrdtool, "info", rrd_info, raising=False)
+
+    response = client.get("/hms/api/series?rrd=corrupt")
+
+    assert response.status_code == 404
+    assert "failed to read corrupt RRD database" in capsys.readouterr().err
+
+
+def test_series_api(client, fetched_series):
+    response = client.get(
+        "/hms/api/series?rrd=os&ds=loadavg_1min&cf=max&start=end-1d&max_points=10"
+    )
+
+    assert response.status_code == 200
+    series = response.get_json()
+    assert series["cf"] == "MAX"
+    assert series["end"] - series["start"] == 86400
+    assert len(series["series"]["loadavg_1min"]["values"]) == 10
+    assert fetched_series == [(["loadavg_1min"], "MAX", 8640)]
+
+    response = client.get("/hms/api/series?rrd=os&format=binary")
+
+    assert response.status_code == 200
+    assert response.headers["X-HMS-Series"] == "loadavg_1min,loadavg_5min"
+    assert len(response.data) == 2 * (8 + 16 * 100)
+
+
+def test_config_reloaded_on_modification(tmp_path, monkeypatch, capsys):
+    config_file = tmp_path / "hms.yaml"
+    config_file.write_text("RENDER_WORKERS: 2\n")
+    monkeypatch.setattr(hms_web, "config_file", str(config_file))
+    monkeypatch.setattr(hms_web, "config", None)
+
+    assert hms_web.get_config() == {"RENDER_WORKERS": 2}
+
+    config_file.write_text("RENDER_WORKERS: 4\n")
+    os.utime(config_file, ns=(0, 1))
+    assert hms_web.get_config() == {"RENDER_WORKERS": 4}
+
+    # the previous configuration is kept while the file is not valid
+    config_file.write_text("")
+    os.utime(config_file, ns=(0, 2))
+    assert hms_web.get_config() == {"RENDER_WORKERS": 4}
+    assert "failed to reload" in capsys.readouterr().err